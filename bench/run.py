@@ -0,0 +1,535 @@
+"""
+Offline benchmarks for the LinkedIn, Brave, OpenAI and database paths.
+
+    python -m bench.run                        # every scenario, JSON to stdout
+    python -m bench.run --quick -o run.json    # small sizes, for a smoke run
+    python -m bench.run -s text_posts search_burst --latency-ms 50
+    python -m bench.run -o new.json --compare old.json --max-regression 10
+    python -m bench.run -s startup --compare old.json --max-regression 20
+
+The stand-in server (bench/stubs.py) runs in this process; each scenario
+runs in its own child process against it, so peak RSS is per scenario and
+the stub doesn't compete with the client for the GIL.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from bench.stubs import StubConfig, start_stub_server
+
+DEFAULTS = {
+    "text_posts": 200,
+    "concurrency": 8,
+    "image_posts": 10,
+    "images_per_post": 9,
+    "image_kb": 300,
+    "video_mb": 1024,
+    "video_workers": 4,
+    "search_queries": 200,
+    "generations": 20,
+    "rows": 1_000_000,
+    "page_size": 10_000,
+    "startups": 10,
+    "feed_posts": 5000,
+}
+QUICK = {
+    "text_posts": 20,
+    "image_posts": 2,
+    "video_mb": 32,
+    "search_queries": 20,
+    "generations": 4,
+    "rows": 50_000,
+    "page_size": 5_000,
+    "startups": 3,
+    "feed_posts": 500,
+}
+
+
+# ─── Measurement ──────────────────────────────────────────────────────────────
+
+class Recorder:
+    """Collects per-operation latencies, errors and bytes for one scenario."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = {}
+        self.bytes = 0
+        self.extra = {}
+        self.started = self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def ok(self, seconds: float, nbytes: int = 0):
+        self.latencies.append(seconds)
+        self.bytes += nbytes
+
+    def error(self, exc: Exception):
+        name = type(exc).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    async def time_async(self, coro, nbytes: int = 0):
+        started = time.perf_counter()
+        try:
+            result = await coro
+        except Exception as e:
+            self.error(e)
+            return None
+        self.ok(time.perf_counter() - started, nbytes)
+        return result
+
+    def result(self) -> dict:
+        elapsed = self.finished - self.started
+        ops = len(self.latencies)
+        ordered = sorted(self.latencies)
+
+        def pct(q):
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        rss_mb = rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+        return {
+            "ops": ops,
+            "errors": self.errors,
+            "seconds": round(elapsed, 3),
+            "throughput_ops_s": round(ops / elapsed, 2) if elapsed else 0.0,
+            "bytes": self.bytes,
+            "throughput_mb_s": round(self.bytes / elapsed / 1e6, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99),
+                "mean": round(sum(ordered) / ops * 1000, 2) if ops else 0.0,
+                "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+            },
+            "peak_rss_mb": round(rss_mb, 1),
+            **self.extra,
+        }
+
+
+def _random_file(path: str, size: int):
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+
+
+# ─── Scenarios (run in the child process) ─────────────────────────────────────
+
+async def text_posts(p: dict, rec: Recorder):
+    """Text posts through AsyncLinkedInClient, `concurrency` at a time."""
+    from utils.async_client import AsyncLinkedInClient
+    client = AsyncLinkedInClient()
+    client.API_BASE = p["linkedin_base"]
+    limit = asyncio.Semaphore(p["concurrency"])
+
+    async def one(i):
+        async with limit:
+            await rec.time_async(client.post_text(p["author"], f"benchmark post {i}"))
+
+    rec.start()
+    await asyncio.gather(*(one(i) for i in range(p["text_posts"])))
+    rec.stop()
+    await client.close()
+
+
+async def image_posts(p: dict, rec: Recorder):
+    """Posts with images_per_post distinct images each, one post at a time."""
+    from utils.async_client import AsyncLinkedInClient
+    client = AsyncLinkedInClient()
+    client.API_BASE = p["linkedin_base"]
+    size = p["image_kb"] * 1024
+    names = []
+    for i in range(p["images_per_post"]):
+        names.append(f"bench_image_{i}.jpg")
+        _random_file(os.path.join(client.folder_path, names[-1]), size)
+
+    rec.start()
+    for i in range(p["image_posts"]):
+        await rec.time_async(
+            client.post_image(p["author"], f"benchmark images {i}", names),
+            size * len(names),
+        )
+    rec.stop()
+    await client.close()
+
+
+async def video_upload(p: dict, rec: Recorder):
+    """One video_mb multipart video upload and post."""
+    from utils.async_client import AsyncLinkedInClient
+    client = AsyncLinkedInClient()
+    client.API_BASE = p["linkedin_base"]
+    size = p["video_mb"] * 1024 * 1024
+    path = os.path.join(client.folder_path, "bench_video.mp4")
+    # sparse: no time spent writing the file, reads still go through the kernel
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+    rec.start()
+    await rec.time_async(
+        client.post_video(p["author"], "benchmark video", "bench_video.mp4",
+                          multipart=True, max_workers=p["video_workers"]),
+        size,
+    )
+    rec.stop()
+    await client.close()
+
+
+async def search_burst(p: dict, rec: Recorder):
+    """search_queries distinct Brave searches fired at once (cache misses)."""
+    from utils import brave
+    brave.BRAVE_SEARCH_URL = p["brave_url"]
+
+    async def one(i):
+        data = await rec.time_async(brave.cached_brave_search(f"benchmark query {i}", count=20))
+        if data is not None:
+            brave.extract_titles_and_descriptions(data[0])
+
+    rec.start()
+    await asyncio.gather(*(one(i) for i in range(p["search_queries"])))
+    rec.stop()
+
+
+async def image_generation(p: dict, rec: Recorder):
+    """OpenAI image generations decoded to disk, `concurrency` at a time."""
+    from utils.gpt_image import async_generate_and_save_image
+    save_dir = os.path.join(p["workdir"], "generated")
+    limit = asyncio.Semaphore(p["concurrency"])
+
+    async def one(i):
+        async with limit:
+            path = await rec.time_async(async_generate_and_save_image(
+                f"benchmark prompt {i}", save_dir=save_dir, force_regenerate=True
+            ))
+            if path:
+                rec.bytes += os.path.getsize(path)
+
+    rec.start()
+    await asyncio.gather(*(one(i) for i in range(p["generations"])))
+    rec.stop()
+
+
+def select_rows(p: dict, rec: Recorder):
+    """Page through, then export, a `rows`-row SELECT (each page is one op)."""
+    from utils.db import Database, OpenCursors, fetch_page, decode_page_token, write_columnar_json
+    db = Database(os.path.join(p["workdir"], "bench.db"))
+    cursors = OpenCursors(db)
+    with db.writer() as conn:
+        conn.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, author TEXT, body TEXT, likes INTEGER)")
+        conn.executemany(
+            "INSERT INTO posts (author, body, likes) VALUES (?, ?, ?)",
+            ((f"urn:li:person:{i % 97}", f"post body {i} " * 4, i % 1000)
+             for i in range(p["rows"]))
+        )
+    query = "SELECT id, author, body, likes FROM posts ORDER BY id"
+
+    rec.start()
+    offset, cursor_id, rows = 0, None, 0
+    with db.reader() as conn:
+        while True:
+            started = time.perf_counter()
+            entry = cursors.take(cursor_id, query, offset)
+            page = fetch_page(entry.conn if entry else conn, query, offset,
+                              p["page_size"], cursors, entry)
+            cursors.release(entry)
+            rec.ok(time.perf_counter() - started)
+            rows += len(page["rows"])
+            if not page["next_token"]:
+                break
+            _, offset, _, cursor_id = decode_page_token(page["next_token"])
+    paged = time.perf_counter()
+
+    export_path = os.path.join(p["workdir"], "export.json")
+    with db.reader() as conn, open(export_path, "w") as f:
+        exported = write_columnar_json(conn.execute(query), f)
+    rec.stop()
+    rec.bytes = os.path.getsize(export_path)
+    rec.extra = {
+        "rows_paged": rows,
+        "rows_paged_per_s": round(rows / (paged - rec.started), 1),
+        "rows_exported": exported,
+        "rows_exported_per_s": round(exported / (rec.finished - paged), 1),
+    }
+    cursors.close()
+    db.close()
+
+
+def engagement_sync(p: dict, rec: Recorder):
+    """
+    Sync feed_posts posts and their stats into SQLite: the first backfill,
+    an incremental run (nothing new since the high-water mark) and a full
+    stats refresh. Each run is one op.
+    """
+    from utils.client import LinkedInClient
+    from utils.db import Database
+    from utils.engagement import EngagementSync
+    client = LinkedInClient()
+    client.API_BASE = p["linkedin_base"]
+    db = Database(os.path.join(p["workdir"], "bench.db"))
+    sync = EngagementSync(db, client, p["author"], rate=100_000, burst=100_000)
+
+    rec.start()
+    runs = {}
+    for name, full in (("backfill", None), ("incremental", None), ("full", True)):
+        started = time.perf_counter()
+        result = sync.sync(full)
+        rec.ok(time.perf_counter() - started)
+        runs[name] = {k: result[k] for k in ("seconds", "requests", "posts_fetched",
+                                             "stats_checked", "stats_changed",
+                                             "failed_batches")}
+    rec.stop()
+    rec.extra = {"runs": runs}
+    db.close()
+
+
+# Run by each `startup` server process: time the import, report which heavy
+# dependencies it pulled in, then serve MCP over stdio
+_STARTUP_CODE = """
+import json, sys, time
+started = time.perf_counter()
+import server
+print("startup " + json.dumps({
+    "import_s": time.perf_counter() - started,
+    "modules": [m for m in ("openai", "requests", "PIL", "utils.client",
+                            "utils.brave", "utils.publish_queue") if m in sys.modules],
+}), file=sys.stderr, flush=True)
+server.mcp.run()
+"""
+
+_INITIALIZE = json.dumps({
+    "jsonrpc": "2.0", "id": 1, "method": "initialize",
+    "params": {"protocolVersion": "2024-11-05", "capabilities": {},
+               "clientInfo": {"name": "bench", "version": "0"}},
+}) + "\n"
+
+
+def startup(p: dict, rec: Recorder):
+    """
+    Fresh server processes from spawn to the MCP initialize response (each
+    one is an op). Also reports the median import time of server.py and any
+    heavy dependency loaded before the first tool call.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    imports, loaded = [], set()
+    rec.start()
+    for _ in range(p["startups"]):
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-c", _STARTUP_CODE], cwd=root, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        proc.stdin.write(_INITIALIZE)
+        proc.stdin.flush()
+        reply = proc.stdout.readline()
+        elapsed = time.perf_counter() - started
+        try:
+            # closes stdin; EOF ends the stdio server
+            _, stderr = proc.communicate(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            _, stderr = proc.communicate()
+        if '"result"' not in reply:
+            rec.error(RuntimeError(stderr.strip().splitlines()[-1:] or "no reply"))
+            continue
+        rec.ok(elapsed)
+        for line in stderr.splitlines():
+            if line.startswith("startup "):
+                info = json.loads(line[len("startup "):])
+                imports.append(info["import_s"])
+                loaded.update(info["modules"])
+    rec.stop()
+    imports.sort()
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    rec.extra = {
+        "import_ms_p50": round(imports[len(imports) // 2] * 1000, 2) if imports else None,
+        "loaded_at_startup": sorted(loaded),
+        "server_peak_rss_mb": round(rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024, 1),
+    }
+
+
+SCENARIOS = {
+    "text_posts": text_posts,
+    "image_posts": image_posts,
+    "video_upload": video_upload,
+    "search_burst": search_burst,
+    "image_generation": image_generation,
+    "select_rows": select_rows,
+    "startup": startup,
+    "engagement_sync": engagement_sync,
+}
+
+
+def run_child(name: str, params: dict) -> dict:
+    rec = Recorder()
+    scenario = SCENARIOS[name]
+    if asyncio.iscoroutinefunction(scenario):
+        asyncio.run(scenario(params, rec))
+    else:
+        scenario(params, rec)
+    return rec.result()
+
+
+# ─── Parent: stand-ins, child processes, report ───────────────────────────────
+
+def child_env(base_url: str, workdir: str, metrics: bool) -> dict:
+    """Environment pointing the server's modules at the stand-ins."""
+    env = dict(os.environ)
+    env.update({
+        "CLIENT_ID": "bench", "CLIENT_SECRET": "bench",
+        "REDIRECT_URI": "http://localhost/callback",
+        "ACCESS_TOKEN": "bench", "AUTHOR_URN": "urn:li:person:bench",
+        "BRAVE_API_KEY": "bench", "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "FOLDER_PATH": workdir,
+        "STATE_DIR": os.path.join(workdir, "state"),
+        # measure the clients, not the caches or the production quotas
+        "ASSET_CACHE_ENABLED": "0",
+        "SEARCH_CACHE_PERSIST": "0",
+        "BRAVE_RATE_LIMIT": "100000", "BRAVE_RATE_BURST": "100000",
+        "METRICS_ENABLED": "1" if metrics else "0",
+        "METRICS_EXPORT_PATH": "",
+    })
+    return env
+
+
+def run_scenario(name: str, params: dict, base_url: str, metrics: bool) -> dict:
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as workdir:
+        params = {
+            **params,
+            "workdir": workdir,
+            "author": "urn:li:person:bench",
+            "linkedin_base": f"{base_url}/v2",
+            "brave_url": f"{base_url}/res/v1/web/search",
+        }
+        proc = subprocess.run(
+            [sys.executable, "-m", "bench.run", "--child", name, "--params", json.dumps(params)],
+            env=child_env(base_url, workdir, metrics),
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+        )
+    if proc.returncode != 0:
+        return {"failed": proc.stderr.strip().splitlines()[-1:] or ["unknown error"]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current: dict, baseline: dict, max_regression: float = None) -> bool:
+    """
+    Print throughput and p95 changes per scenario against baseline.
+    Returns False if any scenario regressed by more than max_regression %.
+    """
+    ok = True
+    print(f"{'scenario':<18}{'ops/s':>12}{'change':>9}{'p95 ms':>12}{'change':>9}", file=sys.stderr)
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or "failed" in now or "failed" in before:
+            continue
+        tput = (now["throughput_ops_s"] / before["throughput_ops_s"] - 1) * 100 \
+            if before["throughput_ops_s"] else 0.0
+        p95 = (now["latency_ms"]["p95"] / before["latency_ms"]["p95"] - 1) * 100 \
+            if before["latency_ms"]["p95"] else 0.0
+        print(f"{name:<18}{now['throughput_ops_s']:>12}{tput:>+8.1f}%"
+              f"{now['latency_ms']['p95']:>12}{p95:>+8.1f}%", file=sys.stderr)
+        if max_regression is not None and (tput < -max_regression or p95 > max_regression):
+            ok = False
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-s", "--scenarios", nargs="+", choices=list(SCENARIOS),
+                        default=list(SCENARIOS))
+    parser.add_argument("-o", "--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--quick", action="store_true", help="small sizes for a smoke run")
+    parser.add_argument("--no-metrics", action="store_true",
+                        help="run with METRICS_ENABLED=0 (instrumentation off)")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--max-regression", type=float,
+                        help="exit 1 if throughput drops or p95 grows by more than this %%")
+    for name, value in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=None)
+    stub = parser.add_argument_group("stand-in server")
+    stub.add_argument("--latency-ms", type=float, default=StubConfig.latency_ms)
+    stub.add_argument("--jitter-ms", type=float, default=StubConfig.jitter_ms)
+    stub.add_argument("--error-rate", type=float, default=StubConfig.error_rate)
+    stub.add_argument("--brave-results", type=int, default=StubConfig.brave_results)
+    stub.add_argument("--openai-image-kb", type=int, default=StubConfig.openai_image_bytes // 1024)
+    stub.add_argument("--part-mb", type=int, default=StubConfig.part_bytes // (1024 * 1024))
+    stub.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--params", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.child, json.loads(args.params))))
+        return 0
+
+    params = {**DEFAULTS, **(QUICK if args.quick else {})}
+    for name in DEFAULTS:
+        if getattr(args, name) is not None:
+            params[name] = getattr(args, name)
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        brave_results=args.brave_results,
+        openai_image_bytes=args.openai_image_kb * 1024,
+        part_bytes=args.part_mb * 1024 * 1024,
+        feed_posts=params["feed_posts"],
+        seed=args.seed,
+    )
+    server, base_url = start_stub_server(config)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "metrics": not args.no_metrics,
+            "params": params,
+            "stub": vars(config),
+        },
+        "scenarios": {},
+    }
+    for name in args.scenarios:
+        print(f"running {name}…", file=sys.stderr)
+        report["scenarios"][name] = run_scenario(name, params, base_url, not args.no_metrics)
+    server.shutdown()
+
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+
+    if args.compare:
+        with open(args.compare) as f:
+            if not compare(report, json.load(f), args.max_regression):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
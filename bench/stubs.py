@@ -0,0 +1,261 @@
+"""
+Local stand-ins for the LinkedIn, Brave and OpenAI endpoints the server
+calls, so the benchmarks run offline and repeatably.
+
+One HTTP server answers all three APIs:
+  /v2/...                    LinkedIn assets, ugcPosts, upload URLs and
+                             post statistics
+  /res/v1/web/search         Brave web search
+  /v1/images/generations     OpenAI image generation
+"""
+import base64
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+@dataclass
+class StubConfig:
+    # added to every response: latency_ms + uniform(0, jitter_ms)
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    # share of requests answered with 503 + Retry-After: 0
+    error_rate: float = 0.0
+    # Brave: results per response and description length
+    brave_results: int = 20
+    brave_description_bytes: int = 300
+    # OpenAI: decoded size of each generated image
+    openai_image_bytes: int = 1536 * 1024
+    # LinkedIn multipart upload part size
+    part_bytes: int = 4 * 1024 * 1024
+    # LinkedIn: posts in the author's feed (one every 6 hours, newest first)
+    feed_posts: int = 0
+    seed: int = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes; without this, Nagle plus
+    # the client's delayed ACK adds ~40 ms to every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    # ─── Helpers ──────────────────────────────────────────────────────────────
+
+    @property
+    def config(self) -> StubConfig:
+        return self.server.config
+
+    def _base(self) -> str:
+        return f"http://{self.server.server_address[0]}:{self.server.server_port}"
+
+    def _read_body(self) -> bytes:
+        """Read the request body; large uploads are drained, not kept."""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 1024 * 1024:
+            return self.rfile.read(length)
+        while length:
+            length -= len(self.rfile.read(min(length, 1024 * 1024)))
+        return b""
+
+    def _send(self, status: int, body=None, headers=()):
+        data = body if isinstance(body, bytes) else json.dumps(body or {}).encode()
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _delay_or_fail(self) -> bool:
+        """Simulate latency; answer 503 and return True for injected errors."""
+        cfg = self.config
+        time.sleep((cfg.latency_ms + self.server.rng.uniform(0, cfg.jitter_ms)) / 1000)
+        if cfg.error_rate and self.server.rng.random() < cfg.error_rate:
+            self._send(503, {"message": "injected error"}, [("Retry-After", "0")])
+            return True
+        return False
+
+    def _next_id(self) -> int:
+        with self.server.lock:
+            self.server.counter += 1
+            return self.server.counter
+
+    # ─── Routes ───────────────────────────────────────────────────────────────
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if self._delay_or_fail():
+            return
+        if url.path == "/res/v1/web/search":
+            return self._brave(parse_qs(url.query))
+        if url.path.startswith("/v2/assets/"):
+            return self._send(200, {"recipes": [{"status": "AVAILABLE"}]})
+        if url.path == "/v2/ugcPosts":
+            return self._feed(parse_qs(url.query))
+        if url.path == "/v2/socialActions":
+            return self._social_actions(parse_qs(url.query))
+        if url.path == "/v2/organizationalEntityShareStatistics":
+            return self._share_statistics(parse_qs(url.query))
+        self._send(404)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self._read_body()
+        if self._delay_or_fail():
+            return
+        if url.path == "/v2/assets":
+            action = parse_qs(url.query).get("action", [""])[0]
+            if action == "registerUpload":
+                return self._register(json.loads(body))
+            if action == "completeMultiPartUpload":
+                return self._send(200, {})
+        if url.path == "/v2/ugcPosts":
+            return self._send(201, {"id": f"urn:li:share:{self._next_id()}"})
+        if url.path == "/v1/images/generations":
+            return self._openai(json.loads(body))
+        self._send(404)
+
+    def do_PUT(self):
+        self._read_body()
+        if self._delay_or_fail():
+            return
+        self._send(201, b"", [("ETag", f'"{self._next_id()}"')])
+
+    def _register(self, body: dict):
+        request = body["registerUploadRequest"]
+        asset_id = self._next_id()
+        base = self._base()
+        value = {"asset": f"urn:li:digitalmediaAsset:B{asset_id}"}
+        if "MULTIPART_UPLOAD" in request["supportedUploadMechanism"]:
+            size, part = request["fileSize"], self.config.part_bytes
+            value["mediaArtifact"] = f"urn:li:digitalmediaMediaArtifact:{asset_id}"
+            value["uploadMechanism"] = {
+                "com.linkedin.digitalmedia.uploading.MultipartUpload": {
+                    "metadata": f"meta-{asset_id}",
+                    "partUploadRequests": [
+                        {
+                            "url": f"{base}/v2/upload/{asset_id}/{i}",
+                            "byteRange": {"firstByte": first,
+                                          "lastByte": min(first + part, size) - 1},
+                            "headers": {"Content-Type": "application/octet-stream"},
+                            "urlExpiresAt": int((time.time() + 86400) * 1000),
+                        }
+                        for i, first in enumerate(range(0, size, part))
+                    ],
+                }
+            }
+        else:
+            value["uploadMechanism"] = {
+                "com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": {
+                    "uploadUrl": f"{base}/v2/upload/{asset_id}",
+                }
+            }
+        self._send(200, {"value": value})
+
+    def _feed(self, params: dict):
+        start = int(params.get("start", ["0"])[0])
+        count = int(params.get("count", ["20"])[0])
+        epoch_ms = int(self.server.feed_epoch * 1000)
+        elements = []
+        for i in range(start, min(start + count, self.config.feed_posts)):
+            at = epoch_ms - i * 6 * 3600 * 1000
+            elements.append({
+                "id": f"urn:li:share:{10 ** 9 + i}",
+                "author": params.get("authors", [""])[0][5:-1],
+                "lifecycleState": "PUBLISHED",
+                "created": {"time": at},
+                "firstPublishedAt": at,
+                "lastModified": {"time": at},
+                "specificContent": {"com.linkedin.ugc.ShareContent": {
+                    "shareCommentary": {"text": f"post {i}"},
+                    "shareMediaCategory": "NONE",
+                }},
+                "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
+            })
+        self._send(200, {"elements": elements,
+                         "paging": {"start": start, "count": count,
+                                    "total": self.config.feed_posts}})
+
+    @staticmethod
+    def _urns(params: dict, name: str) -> list:
+        value = params.get(name, [""])[0]
+        return value[5:-1].split(",") if value.startswith("List(") else []
+
+    def _social_actions(self, params: dict):
+        results = {}
+        for urn in self._urns(params, "ids"):
+            n = zlib.crc32(urn.encode())
+            results[urn] = {
+                "likesSummary": {"totalLikes": n % 500},
+                "commentsSummary": {"aggregatedTotalComments": n % 40,
+                                    "totalFirstLevelComments": n % 30},
+            }
+        self._send(200, {"results": results, "statuses": {}, "errors": {}})
+
+    def _share_statistics(self, params: dict):
+        elements = []
+        for param, key in (("shares", "share"), ("ugcPosts", "ugcPost")):
+            for urn in self._urns(params, param):
+                n = zlib.crc32(urn.encode())
+                elements.append({key: urn, "totalShareStatistics": {
+                    "impressionCount": n % 20000, "uniqueImpressionsCount": n % 15000,
+                    "clickCount": n % 700, "shareCount": n % 25,
+                    "likeCount": n % 500, "commentCount": n % 40,
+                    "engagement": round(n % 1000 / 10000, 4),
+                }})
+        self._send(200, {"elements": elements})
+
+    def _brave(self, params: dict):
+        query = params.get("q", [""])[0]
+        count = min(int(params.get("count", ["5"])[0]), self.config.brave_results)
+        description = "x" * self.config.brave_description_bytes
+        self._send(200, {
+            "type": "search",
+            "query": {"original": query},
+            "web": {"results": [
+                {"title": f"{query} result {i}",
+                 "url": f"https://example.com/{zlib.crc32(query.encode())}/{i}",
+                 "description": description}
+                for i in range(count)
+            ]},
+        })
+
+    def _openai(self, body: dict):
+        image = self.server.image_b64
+        self._send(200, {
+            "created": int(time.time()),
+            "data": [{"b64_json": image} for _ in range(body.get("n") or 1)],
+        })
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # room for request bursts without refused connections
+    request_queue_size = 512
+
+
+def start_stub_server(config: StubConfig = None, host: str = "127.0.0.1"):
+    """
+    Start the stand-in server on a free port in a daemon thread.
+    Returns (server, base_url); stop it with server.shutdown().
+    """
+    config = config or StubConfig()
+    server = _Server((host, 0), _Handler)
+    server.config = config
+    server.rng = random.Random(config.seed)
+    server.lock = threading.Lock()
+    server.counter = 0
+    server.feed_epoch = time.time()
+    server.image_b64 = base64.b64encode(os.urandom(config.openai_image_bytes)).decode()
+    threading.Thread(target=server.serve_forever, name="bench-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
@@ -1,27 +1,172 @@
 # server.py
 from mcp.server.fastmcp import FastMCP
-from utils.client import LinkedInClient
-from utils.config import AUTHOR_URN
+from utils.config import (
+    AUTHOR_URN,
+    FOLDER_PATH,
+    BACKGROUND_START_DELAY,
+    SEARCH_ARCHIVE_ENABLED,
+    ENGAGEMENT_SYNC_INTERVAL,
+)
 import os
-from utils.gpt_image import generate_and_save_image
-from utils.brave import brave_search, extract_titles_and_descriptions
-import sqlite3
+from utils.image_cache import image_cache_stats
+from utils.asset_cache import get_asset_cache
+from utils.db import (
+    Database,
+    OpenCursors,
+    fetch_page,
+    decode_page_token,
+    write_columnar_json,
+    execute_batch,
+)
+from utils.query_cache import QueryCache, normalize_sql, table_write
+from utils.query_profiler import QueryProfiler, LOG_TABLE
+from utils.tokens import get_token_manager
+from utils.metrics import metrics
+from utils.lazy import Lazy
+import asyncio
 import json
+import threading
+import time
+from contextlib import asynccontextmanager
+
+# The LinkedIn clients, Brave, OpenAI and Pillow (and the httpx / requests /
+# openai imports behind them) are loaded the first time a tool needs them,
+# so the server answers the MCP handshake without paying for any of them.
 
 BASE_DIR = os.path.dirname(__file__)
 DB_PATH  = os.path.join(BASE_DIR, "data.db")
 
+# Pooled, WAL-mode connections to data.db shared by every DB tool
+db = Database(DB_PATH)
+# SELECTs left open between pages, continued by fetch_db_page
+cursors = OpenCursors(db)
+# Results of read queries, invalidated per table by writes
+query_cache = QueryCache()
+# Statement timeouts and the slow-query log behind db_advise
+profiler = QueryProfiler(
+    db, on_change=lambda: query_cache.invalidate(table_write(LOG_TABLE))
+)
+
+class InstrumentedFastMCP(FastMCP):
+    """FastMCP that times every tool call into metrics."""
+
+    async def call_tool(self, name, arguments):
+        if not metrics.enabled:
+            return await super().call_tool(name, arguments)
+        started = time.perf_counter()
+        try:
+            result = await super().call_tool(name, arguments)
+        except Exception as e:
+            metrics.observe("tool", name, time.perf_counter() - started, type(e).__name__)
+            raise
+        metrics.observe(
+            "tool", name, time.perf_counter() - started,
+            received=len(json.dumps(arguments, default=str)),
+            sent=sum(len(getattr(c, "text", "")) for c in result),
+        )
+        return result
+
+
+# Timer that runs _start_background, once the server is up
+_background = None
+
+
+@asynccontextmanager
+async def _lifespan(server):
+    """
+    Start the background work once the server is running rather than when
+    server.py is imported, BACKGROUND_START_DELAY seconds later so it
+    doesn't compete with the handshake. HTTP transports enter this once per
+    session, so only the first one starts it; it is left running when
+    sessions end (scheduled posts still have to go out) and, being daemon
+    threads, stops with the process.
+    """
+    global _background
+    if _background is None:
+        _background = threading.Timer(BACKGROUND_START_DELAY, _start_background)
+        _background.daemon = True
+        _background.start()
+    yield {}
+
+
 # Create an MCP server
-mcp = FastMCP("LinkedIn MCP Server")
+mcp = InstrumentedFastMCP("LinkedIn MCP Server", lifespan=_lifespan)
 
 AUTHOR_URN   = os.getenv("AUTHOR_URN")
 
-#Creating a LinkedIn client instance
-client = LinkedInClient()
+
+def _make_client():
+    from utils.async_client import AsyncLinkedInClient
+    # get_token_manager() hands renewed access tokens to registered clients
+    return get_token_manager().register(AsyncLinkedInClient())
+
+
+def _make_publish_queue():
+    from utils.client import LinkedInClient
+    from utils.publish_queue import PublishQueue, TABLE
+    return PublishQueue(
+        db,
+        get_token_manager().register(LinkedInClient()),
+        AUTHOR_URN,
+        on_change=lambda: query_cache.invalidate(table_write(TABLE)),
+    )
+
+
+def _make_archive():
+    from utils.search_archive import SearchArchive, TABLE, FTS_TABLE
+    return SearchArchive(
+        db, on_change=lambda: query_cache.invalidate(table_write(TABLE, FTS_TABLE))
+    )
+
+
+def _make_engagement():
+    from utils.engagement import EngagementSync, TABLES
+    # shares the publish queue's client, and with it its connection pool
+    return EngagementSync(
+        db,
+        publish_queue().client,
+        AUTHOR_URN,
+        on_change=lambda: query_cache.invalidate(table_write(*TABLES)),
+    )
+
+
+# LinkedIn client shared by every tool call on the event loop
+client = Lazy(_make_client)
+# Scheduled / retried posts, stored in data.db and sent by background threads
+publish_queue = Lazy(_make_publish_queue)
+# Every Brave result, full-text indexed in data.db (written in the background)
+archive = Lazy(_make_archive)
+# Our posts and their engagement, pulled into data.db on a schedule
+engagement = Lazy(_make_engagement)
+
+
+def _archive_results(query, results):
+    if SEARCH_ARCHIVE_ENABLED:
+        archive().add(query, results)
+
+
+def _start_background():
+    """
+    Start the publish worker, token refresh, engagement sync, search archive
+    upkeep and metrics export (from _lifespan, shortly after startup).
+    Without LinkedIn settings there is nothing to publish, refresh or sync.
+    """
+    # Periodic metrics file for scrapers, if METRICS_EXPORT_PATH is set
+    metrics.start_exporter()
+    if SEARCH_ARCHIVE_ENABLED:
+        archive().start()
+    try:
+        publish_queue().start()
+    except EnvironmentError:
+        return
+    get_token_manager().start()
+    if ENGAGEMENT_SYNC_INTERVAL:
+        engagement().start()
+
 
 # LinkedIn Post tool
 @mcp.tool()
-def create_post(content:str) -> str:
+async def create_post(content:str) -> str:
     """Create a text-only LinkedIn post.
     Returns the new post's URL (e.g. 'urn:li:share:12345').
     """
@@ -30,7 +175,7 @@ def create_post(content:str) -> str:
         raise ValueError("Content cannot be empty")
 
     # Call the LinkedIn API to create a post
-    new_urn = client.post_text(AUTHOR_URN, content)
+    new_urn = await client().post_text(AUTHOR_URN, content)
     
     URL = f"https://www.linkedin.com/feed/update/{new_urn}"
     # Return the new post's URN
@@ -38,26 +183,38 @@ def create_post(content:str) -> str:
 
 # LinkedIn Image Post tool
 @mcp.tool()
-def create_image_post(content:str, image_path:str) -> str:
-    """Create a LinkedIn post with an image.
+async def create_image_post(content:str, image_paths:list[str], optimize:bool = False) -> str:
+    """Create a LinkedIn post with one or more images.
+    Images are uploaded concurrently and appear in the order given.
+    With optimize=true they are first downscaled to LinkedIn's recommended
+    size, re-encoded and stripped of metadata; the result then includes the
+    bytes saved and time spent per image.
     Returns the new post's URL (e.g. 'urn:li:share:12345').
     """
     # Ensure the content is not empty
     if not content:
         raise ValueError("Content cannot be empty")
+    if not image_paths:
+        raise ValueError("At least one image is required")
 
-    
+    result = {}
+    if optimize:
+        report = await client().preprocess_images(image_paths)
+        image_paths = [r["path"] for r in report]
+        result["optimized"] = [
+            {k: r[k] for k in ("source", "saved_bytes", "seconds")} for r in report
+        ]
 
-    # Call the LinkedIn API to create a post with an image
-    new_urn = client.post_image(AUTHOR_URN, content, [image_path])
+    # Call the LinkedIn API to create a post with the images
+    new_urn = await client().post_image(AUTHOR_URN, content, image_paths)
     
     URL = f"https://www.linkedin.com/feed/update/{new_urn}"
     # Return the new post's URN
-    return {"url" : URL}
+    return {"url" : URL, **result}
 
 # LinkedIn Video Post tool
 @mcp.tool()
-def create_video_post(content:str, video_path:str) -> str:
+async def create_video_post(content:str, video_path:str) -> str:
     """Create a LinkedIn post with a video.
     Returns the new post's URL (e.g. 'urn:li:share:12345').
     """
@@ -67,17 +224,97 @@ def create_video_post(content:str, video_path:str) -> str:
 
 
     # Call the LinkedIn API to create a post with a video
-    new_urn = client.post_video(AUTHOR_URN, content, video_path)
+    new_urn = await client().post_video(AUTHOR_URN, content, video_path)
     
     URL = f"https://www.linkedin.com/feed/update/{new_urn}"
     # Return the new post's URN
     return {"url" : URL}
 
+# Create many posts at once
+@mcp.tool()
+async def create_posts_batch(posts: list[dict], optimize: bool = False) -> dict:
+    """Create many posts in one call (e.g. a campaign launch).
+    Each post is {"content", "image_paths"?, "video_path"?, "title"?,
+    "description"?, "publish_at"?, "idempotency_key"?}. Posts with publish_at
+    are queued as with schedule_post; the rest are published now. Each
+    distinct image or video is uploaded once even if several posts use it,
+    and posts are sent concurrently within a rate limit. With optimize=true
+    images are shrunk first, as in create_image_post.
+    One failing post doesn't stop the others. Returns {"posts": [{"index",
+    "status": "published" | "scheduled" | "failed", "url" | "job" | "error"}],
+    "counts", "uploads": {"files", "shared"}}.
+    """
+    if not posts:
+        raise ValueError("At least one post is required")
+
+    from utils.batch import create_posts_batch as run_batch
+
+    def schedule(spec):
+        return publish_queue().enqueue(
+            spec["content"],
+            image_paths=spec.get("image_paths"),
+            video_path=spec.get("video_path"),
+            title=spec.get("title"),
+            description=spec.get("description"),
+            optimize=optimize,
+            publish_at=spec["publish_at"],
+            idempotency_key=spec.get("idempotency_key"),
+        )
+
+    return await run_batch(client(), AUTHOR_URN, posts, schedule=schedule, optimize=optimize)
+
+# Queue a post for later or for reliable delivery
+@mcp.tool()
+async def schedule_post(content: str, image_paths: list[str] = None, video_path: str = None,
+    publish_at: str = None, idempotency_key: str = None, optimize: bool = False) -> dict:
+    """Queue a text, image or video post and return its job at once.
+    The post is published at publish_at (ISO 8601, e.g. "2025-06-01T09:00+02:00";
+    default: as soon as possible) by a background worker that respects
+    LinkedIn's rate limits and retries failures with backoff.
+    Submitting the same idempotency_key (by default derived from the content
+    and publish_at) again returns the existing job instead of a second post;
+    without either, an identical post counts as the same one only within
+    PUBLISH_DEDUPE_WINDOW seconds (default 10 minutes).
+    Returns the job: {"id", "status", "scheduled_at", ..., "duplicate"};
+    check progress with publish_status.
+    """
+    return await asyncio.to_thread(
+        publish_queue().enqueue,
+        content,
+        image_paths=image_paths,
+        video_path=video_path,
+        optimize=optimize,
+        publish_at=publish_at,
+        idempotency_key=idempotency_key,
+    )
+
+# Status of queued posts
+@mcp.tool()
+async def publish_status(job_id: int = None, idempotency_key: str = None,
+    status: str = None, limit: int = 20) -> dict:
+    """Look up a queued post by job_id or idempotency_key, or list the most
+    recent jobs (optionally only those with status: queued, running,
+    retrying, done, failed or unknown; unknown means an interrupted post
+    may have gone through but couldn't be checked, so it wasn't retried).
+    A job has status, attempts, last_error, next_attempt_at and, once
+    published, post_urn and url.
+    """
+    if job_id is not None or idempotency_key is not None:
+        job = await asyncio.to_thread(publish_queue().get, job_id, idempotency_key)
+        if job is None:
+            raise ValueError("No such job")
+        return job
+    jobs = await asyncio.to_thread(publish_queue().recent, status, limit)
+    counts = await asyncio.to_thread(publish_queue().counts)
+    return {"jobs": jobs, "counts": counts}
+
 #Generate an image using a promt
 @mcp.tool()
-def generate_image(prompt:str, quality: str = "medium",
-    size: str = "1536x1024") -> str:
+async def generate_image(prompt:str, quality: str = "medium",
+    size: str = "1536x1024", force_regenerate: bool = False) -> str:
     """Generate an image using a prompt, and optionally take quality and size of a image and save it locally.
+    The same prompt/quality/size returns the previously generated file unless
+    force_regenerate is true.
     Returns the path to the saved image file.
     """
     # Ensure the prompt is not empty
@@ -85,57 +322,363 @@ def generate_image(prompt:str, quality: str = "medium",
         raise ValueError("Prompt cannot be empty")
 
     # Call the openai API to create an image
-    new_path = generate_and_save_image(prompt, quality=quality, size=size)
+    from utils.gpt_image import async_generate_and_save_image
+    new_path = await async_generate_and_save_image(
+        prompt, quality=quality, size=size, force_regenerate=force_regenerate
+    )
 
     # Extract file name from the path
     file_name = os.path.basename(new_path)
     
     return {"path" : new_path, "file_name" : file_name}
 
+# Generate several images at once
+@mcp.tool()
+async def generate_images(prompts: list[str], n: int = 1, quality: str = "medium",
+    size: str = "1536x1024") -> dict:
+    """Generate n variants of each prompt concurrently and save them locally.
+    Returns {"images": [{"prompt", "paths"} | {"prompt", "error"}, ...]} in
+    the same order as prompts.
+    """
+    if not prompts or not all(prompts):
+        raise ValueError("Prompts cannot be empty")
+    if not 1 <= n <= 10:
+        raise ValueError("n must be between 1 and 10")
+
+    from utils.gpt_image import async_generate_images
+    images = await async_generate_images(prompts, n=n, quality=quality, size=size)
+    return {"images": images}
+
 # Search the web using Brave
 @mcp.tool()
-def search_web(query: str, count: int = 5, search_lang: str = "en") -> dict:
+async def search_web(query: str, count: int = 5, search_lang: str = "en") -> dict:
     """Perform a Brave Web Search and return the JSON response.
     Args:
         query (str): The search query.
         count (int): Number of search results to return.
         search_lang (str): ISO 639-1 language code (default: "en").
     Returns:
-        dict: Parsed JSON response from Brave Search API.
+        dict: {"cached": bool, "results": [...]} where cached tells whether
+        the results were served from the local search cache.
     """
     # Ensure the query is not empty
     if not query:
         raise ValueError("Query cannot be empty")
 
     # Call the Brave API to perform a web search
-    results = brave_search(query, count=count, search_lang=search_lang)
+    from utils.brave import cached_brave_search, extract_titles_and_descriptions
+    results, cached = await cached_brave_search(query, count=count, search_lang=search_lang)
 
     final_results = extract_titles_and_descriptions(results)
+    if not cached:
+        _archive_results(query, final_results)
     # Return the parsed results
-    return final_results
+    return {"cached": cached, "results": final_results}
+
+# Search the web with several queries at once
+@mcp.tool()
+async def search_web_batch(queries: list[str], count: int = 5, search_lang: str = "en") -> dict:
+    """Run several Brave Web Searches concurrently and merge the results.
+    Args:
+        queries (list[str]): The search queries.
+        count (int): Number of results to fetch per query.
+        search_lang (str): ISO 639-1 language code (default: "en").
+    Returns:
+        dict: {"results": [...], "queries": {...}} where results are
+        de-duplicated by URL and ranked across all queries, and queries
+        reports per-query cache hits or errors.
+    """
+    if not queries:
+        raise ValueError("At least one query is required")
+
+    from utils.brave import batch_search
+    return await batch_search(queries, count=count, search_lang=search_lang,
+                              on_fresh=_archive_results)
+
+# Search previously fetched results offline
+@mcp.tool()
+async def search_archive(text: str, limit: int = 10, query: str = None,
+    max_age_days: float = None) -> dict:
+    """Full-text search over every web search result fetched so far (kept
+    in data.db), ranked by BM25 with title matches weighted highest. No
+    network call is made, so try this before search_web for anything that
+    may have been looked up already.
+    Args:
+        text (str): Words to look for in titles, descriptions and URLs.
+        limit (int): Maximum number of results.
+        query (str): Only results found by this earlier search_web query.
+        max_age_days (float): Only results fetched within this many days.
+    Returns:
+        dict: {"results": [{"title", "description", "url", "query",
+        "fetched_at", "snippet", "score"}], "took_ms"}; best match first.
+    """
+    if not SEARCH_ARCHIVE_ENABLED:
+        raise ValueError("The search archive is disabled (SEARCH_ARCHIVE_ENABLED=0)")
+    started = time.perf_counter()
+    results = await asyncio.to_thread(archive().search, text, limit, query, max_age_days)
+    return {"results": results, "took_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+# Post engagement synced into data.db
+@mcp.tool()
+async def sync_engagement(full: bool = False) -> dict:
+    """
+    Pull our posts and their engagement from LinkedIn into data.db now
+    (this also runs in the background every ENGAGEMENT_SYNC_INTERVAL
+    seconds). Only posts new or edited since the last sync are listed;
+    stats are re-read for recent posts, or for every post with full=True.
+    Query the results with execute_db_query:
+      - linkedin_posts (urn, text, created_at, published_at, ...)
+      - linkedin_post_stats (post_urn, likes, comments, shares,
+        impressions, clicks, engagement, changed_at): latest values
+      - linkedin_post_stats_history: one row per change, for trends
+    Times are epoch seconds.
+    Returns:
+        dict: {"sync": {"posts_fetched", "posts_changed", "stats_checked",
+        "stats_changed", "requests", "seconds", "errors", ...},
+        "totals": {"posts", "posts_with_stats", "high_water", "last_sync", ...}}
+    """
+    sync = engagement()
+    result = await asyncio.to_thread(sync.sync, True if full else None)
+    totals = await asyncio.to_thread(sync.stats)
+    totals.pop("last_result")
+    return {"sync": result, "totals": totals}
+
+# Cache statistics
+@mcp.tool()
+async def cache_stats() -> dict:
+    """Report hit/miss counts of the local caches:
+      - assets: already-uploaded media reused instead of re-uploaded (with bytes_saved)
+      - search: Brave search results
+      - images: generated images, per save directory
+    """
+    # the caches' locks can be held by a save in another thread
+    return await asyncio.to_thread(_cache_stats)
+
+
+def _cache_stats() -> dict:
+    from utils.brave import search_cache
+    return {
+        "assets": get_asset_cache().stats() if get_asset_cache() else {"enabled": False},
+        "search": search_cache.stats(),
+        "images": image_cache_stats(),
+    }
 
 # Database Query tool
 @mcp.tool()
-def execute_db_query(query: str) -> str:
+async def execute_db_query(query: str, page_size: int = 500, profile: bool = False) -> str:
     """
     Executes any SQL on data.db.
+    Read queries (SELECT, WITH ... SELECT) come back one page at a time in
+    columnar form; pass next_token to fetch_db_page for the following page.
+    Read results are cached until a write touches one of their tables.
+    Statements are stopped after DB_STATEMENT_TIMEOUT seconds; slow ones
+    are logged for db_advise.
+    With profile=True the query runs even if cached, and the result adds
+    "profile": {"wall_ms", "rows_returned", "rows_scanned", "vm_steps",
+    "plan", "full_scans"}.
     Returns a JSON-stringified dict:
       - { "success": true }
-      - { "success": true, "rows": [ {...}, {...} ] }
+      - { "success": true, "columns": [...], "rows": [ [...], [...] ], "next_token": "..." | null }
       - { "success": false, "error": "..." }
     """
+    # sqlite3 is blocking, so run it off the event loop
+    return await asyncio.to_thread(_run_db_query, query, page_size, 0, profile)
+
+
+def _run_db_query(query: str, page_size: int = 500, offset: int = 0,
+                  profile: bool = False, cursor_id: str = None) -> str:
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            cur.execute(query)
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        with db.reader() as conn:
+            info = query_cache.analyze(conn, query)
+            if info.readonly:
+                key = (normalize_sql(query), offset, page_size)
+                use_cache = info.deterministic and not profile
+                # carry on from the cursor the last page left open, if any,
+                # so every page of one paging run comes from one snapshot
+                entry = cursors.take(cursor_id, query, offset)
+                page = query_cache.get(key) if use_cache and entry is None else None
+                if page is None:
+                    # a continued page is as old as its cursor's snapshot;
+                    # put() drops it if a write has happened since
+                    generation = entry.generation if entry else query_cache.generation
+                    run_conn = entry.conn if entry else conn
+                    try:
+                        with profiler.measure(run_conn, query, explain=profile) as run:
+                            page = fetch_page(run_conn, query, offset, page_size, cursors,
+                                              entry, generation)
+                            run["rows_returned"] = len(page["rows"])
+                    finally:
+                        cursors.release(entry)
+                    if info.deterministic:
+                        query_cache.put(key, page, info.reads, generation)
+                result = {"success": True, **page}
+                if profile:
+                    result["profile"] = run
+                return json.dumps(result)
 
-            if query.strip().lower().startswith("select"):
-                rows = [dict(r) for r in cur.fetchall()]
-                return json.dumps({"success": True, "rows": rows})
+        with db.writer() as conn:
+            with profiler.measure(conn, query, explain=profile) as run:
+                run["kind"] = "write"
+                cur = conn.execute(query)
+                # PRAGMAs and RETURNING clauses produce rows too
+                result = {}
+                if cur.description:
+                    result = {
+                        "columns": [d[0] for d in cur.description],
+                        "rows": [tuple(r) for r in cur.fetchall()],
+                    }
+                run["rows_returned"] = len(result.get("rows", ()))
+        query_cache.invalidate(info)
+        if profile:
+            result["profile"] = run
+        return json.dumps({"success": True, **result})
+
+    except Exception as e:
+        return json.dumps({"success": False, "error": str(e)})
+    finally:
+        # slow runs are written once no connection is held
+        try:
+            profiler.flush()
+        except Exception:
+            pass
+
+# Bulk parameterised writes
+@mcp.tool()
+async def execute_db_batch(statement: str, params: list[list | dict], chunk_size: int = 1000) -> str:
+    """
+    Executes one parameterised statement (e.g. "INSERT INTO t VALUES (?, ?)"
+    or with :named parameters) once per entry of params, all inside a single
+    transaction on data.db. Values are bound, never pasted into the SQL.
+    If any row fails, nothing is written.
+    Returns a JSON-stringified dict:
+      - { "success": true, "rows_affected": n, "elapsed_ms": t }
+      - { "success": false, "error": "..." }
+    """
+    return await asyncio.to_thread(_run_db_batch, statement, params, chunk_size)
 
-            conn.commit()
-            return json.dumps({"success": True})
 
+def _run_db_batch(statement: str, params: list, chunk_size: int) -> str:
+    try:
+        started = time.perf_counter()
+        if not params:
+            raise ValueError("params cannot be empty")
+        with db.reader() as conn:
+            info = query_cache.analyze(conn, statement, params[0])
+        with db.writer() as conn:
+            affected = execute_batch(conn, statement, params, chunk_size)
+        query_cache.invalidate(info)
+        return json.dumps({
+            "success": True,
+            "rows_affected": affected,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        })
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)})
+
+# Next page of a SELECT
+@mcp.tool()
+async def fetch_db_page(next_token: str) -> str:
+    """
+    Fetch the next page of a SELECT started with execute_db_query.
+    Pages are read from the query's still-open cursor; after DB_CURSOR_TTL
+    seconds unused it is closed and the query runs again up to this page.
+    Returns the same JSON-stringified shape as execute_db_query.
+    """
+    try:
+        query, offset, page_size, cursor_id = decode_page_token(next_token)
+    except ValueError as e:
+        return json.dumps({"success": False, "error": str(e)})
+    return await asyncio.to_thread(_run_db_query, query, page_size, offset, False, cursor_id)
+
+# Stream a large SELECT to a file
+@mcp.tool()
+async def export_db_query(query: str, file_name: str) -> dict:
+    """
+    Run a SELECT on data.db and stream the full result to a JSON file
+    ({"columns": [...], "rows": [...]}) in the media folder, without
+    holding it in memory. Use this instead of paging through huge results.
+    file_name is a plain file name; it can't point outside the folder.
+    Returns:
+      - { "success": true, "path": "...", "rows": n }
+      - { "success": false, "error": "..." }
+    """
+    return await asyncio.to_thread(_export_db_query, query, file_name)
+
+
+def _export_path(file_name: str) -> str:
+    """Where file_name goes in FOLDER_PATH; raises ValueError if it would leave it."""
+    if not FOLDER_PATH:
+        raise ValueError("FOLDER_PATH is not set")
+    if (file_name in ("", ".", "..") or os.path.basename(file_name) != file_name
+            or (os.altsep and os.altsep in file_name)):
+        raise ValueError(f"file_name must be a plain file name: {file_name!r}")
+    folder = os.path.realpath(os.path.expanduser(FOLDER_PATH))
+    # realpath also follows a symlink already sitting at that name
+    path = os.path.realpath(os.path.join(folder, file_name))
+    if os.path.commonpath([folder, path]) != folder:
+        raise ValueError(f"file_name leads outside FOLDER_PATH: {file_name!r}")
+    return path
+
+
+def _export_db_query(query: str, file_name: str) -> dict:
+    try:
+        path = _export_path(file_name)
+        with db.reader() as conn:
+            if not query_cache.analyze(conn, query).readonly:
+                raise ValueError("Only read queries can be exported")
+            with open(path, "w") as f:
+                rows = write_columnar_json(conn.execute(query), f)
+        return {"success": True, "path": path, "rows": rows}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+# Slow-query log & index advice
+@mcp.tool()
+async def db_advise(min_calls: int = 1, limit: int = 10, create_indexes: bool = False) -> dict:
+    """
+    Summarise the slow-query log of execute_db_query: the queries costing the
+    most total time, how often they ran, average/max ms, rows scanned vs
+    returned, timeouts, their current EXPLAIN QUERY PLAN and the tables they
+    still scan in full. For each such table an index is proposed (tried
+    against the query planner first), covering the query when it is narrow
+    enough.
+    Args:
+        min_calls (int): Only queries logged at least this many times.
+        limit (int): Maximum number of queries to report.
+        create_indexes (bool): Also create the proposed indexes.
+    Returns:
+        dict: {"queries": [{"sql", "calls", "total_ms", "avg_ms", "max_ms",
+        "plan", "full_scans", "indexes": [{"table", "columns", "covering",
+        "sql"}], ...}], "created": [CREATE INDEX statements run]}
+    """
+    return await asyncio.to_thread(profiler.advise, min_calls, limit, create_indexes)
+
+# Database engine & cache statistics
+@mcp.tool()
+async def db_stats() -> dict:
+    """Report connection pool usage, SELECT cursors held open between pages
+    (and pages continued from them vs re-run), read-query cache hits/misses, slow
+    queries logged and timed out, and the search archive (rows, pending
+    writes, compactions)."""
+    # the profiler and archive counts are read from data.db
+    return await asyncio.to_thread(_db_stats)
+
+
+def _db_stats() -> dict:
+    result = {"pool": db.stats(), "open_cursors": cursors.stats(),
+              "query_cache": query_cache.stats(), "profiler": profiler.stats()}
+    if SEARCH_ARCHIVE_ENABLED:
+        result["search_archive"] = archive().stats()
+    return result
+
+# Latency & throughput of tools and outbound HTTP calls
+@mcp.tool()
+def server_stats() -> dict:
+    """Report, since startup, per tool and per outbound HTTP endpoint
+    (LinkedIn, Brave, OpenAI): call count, p50/p95/p99/mean/max latency in
+    ms, bytes sent and received, errors by status code or exception, and
+    retries. Also reports the state of the LinkedIn access token.
+    """
+    return {**metrics.snapshot(), "auth": get_token_manager().stats()}
@@ -0,0 +1,30 @@
+import pytest
+
+import server
+from utils.db import Database, OpenCursors
+from utils.query_cache import QueryCache, table_write
+from utils.query_profiler import QueryProfiler, LOG_TABLE
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A pooled Database on a fresh file in tmp_path."""
+    db = Database(str(tmp_path / "data.db"))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def db_server(database, monkeypatch):
+    """The server module with its DB tools pointed at `database`."""
+    cursors = OpenCursors(database)
+    query_cache = QueryCache()
+    profiler = QueryProfiler(
+        database, on_change=lambda: query_cache.invalidate(table_write(LOG_TABLE))
+    )
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "cursors", cursors)
+    monkeypatch.setattr(server, "query_cache", query_cache)
+    monkeypatch.setattr(server, "profiler", profiler)
+    yield server
+    cursors.close()
@@ -0,0 +1,54 @@
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch, db_server):
+    folder = tmp_path / "media"
+    folder.mkdir()
+    monkeypatch.setattr(db_server, "FOLDER_PATH", str(folder))
+    return folder
+
+
+def test_plain_name_goes_in_the_folder(db_server, folder):
+    assert db_server._export_path("out.json") == str(folder / "out.json")
+
+
+@pytest.mark.parametrize("file_name", [
+    "", ".", "..", "../out.json", "sub/out.json", "/tmp/out.json",
+])
+def test_names_with_a_path_are_refused(db_server, folder, file_name):
+    with pytest.raises(ValueError, match="plain file name"):
+        db_server._export_path(file_name)
+
+
+def test_symlink_out_of_the_folder_is_refused(db_server, folder, tmp_path):
+    (folder / "out.json").symlink_to(tmp_path / "elsewhere.json")
+    with pytest.raises(ValueError, match="outside FOLDER_PATH"):
+        db_server._export_path("out.json")
+
+
+def test_folder_must_be_set(db_server, monkeypatch):
+    monkeypatch.setattr(db_server, "FOLDER_PATH", None)
+    with pytest.raises(ValueError, match="FOLDER_PATH is not set"):
+        db_server._export_path("out.json")
+
+
+def test_export_writes_columnar_json(db_server, folder, database):
+    with database.writer() as conn:
+        conn.execute("CREATE TABLE t (n INTEGER, s TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?, ?)", [(1, "a"), (2, "b")])
+    result = db_server._export_db_query("SELECT n, s FROM t ORDER BY n", "out.json")
+    assert result == {"success": True, "path": str(folder / "out.json"), "rows": 2}
+    with open(folder / "out.json") as f:
+        assert json.load(f) == {"columns": ["n", "s"], "rows": [[1, "a"], [2, "b"]]}
+
+
+def test_export_refuses_writes_and_escapes(db_server, folder, database):
+    result = db_server._export_db_query("DROP TABLE IF EXISTS t", "out.json")
+    assert result == {"success": False, "error": "Only read queries can be exported"}
+    result = db_server._export_db_query("SELECT 1", "../out.json")
+    assert not result["success"]
+    assert not os.path.exists(folder.parent / "out.json")
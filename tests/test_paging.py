@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import pytest
+
+from utils.db import OpenCursors, decode_page_token, encode_page_token, fetch_page
+
+
+@pytest.fixture
+def numbers(database):
+    with database.writer() as conn:
+        conn.execute("CREATE TABLE t (n INTEGER)")
+        conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(1, 6)])
+    return database
+
+
+def run(server, query, page_size):
+    return json.loads(server._run_db_query(query, page_size))
+
+
+def next_page(server, page):
+    return json.loads(asyncio.run(server.fetch_db_page(page["next_token"])))
+
+
+def test_page_token_round_trip():
+    token = encode_page_token("SELECT 1", 20, 10, "abc")
+    assert decode_page_token(token) == ("SELECT 1", 20, 10, "abc")
+    with pytest.raises(ValueError):
+        decode_page_token("not a token")
+
+
+def test_fetch_page_keeps_column_names_as_written(database):
+    with database.reader() as conn:
+        page = fetch_page(conn, "SELECT 1 AS a, 2 AS a", 0, 10)
+    assert page == {"columns": ["a", "a"], "rows": [(1, 2)], "next_token": None}
+
+
+def test_fetch_page_continues_the_held_cursor(numbers):
+    cursors = OpenCursors(numbers)
+    query = "SELECT n FROM t ORDER BY n"
+    with numbers.reader() as conn:
+        page = fetch_page(conn, query, 0, 2, cursors)
+    pages = [page["rows"]]
+    while page["next_token"]:
+        _, offset, page_size, cursor_id = decode_page_token(page["next_token"])
+        entry = cursors.take(cursor_id, query, offset)
+        assert entry is not None
+        try:
+            page = fetch_page(entry.conn, query, offset, page_size, cursors, entry)
+        finally:
+            cursors.release(entry)
+        pages.append(page["rows"])
+    assert pages == [[(1,), (2,)], [(3,), (4,)], [(5,)]]
+    assert cursors.stats() == {"open": 0, "continued": 2, "restarted": 0}
+
+
+def test_fetch_page_reruns_a_query_whose_cursor_is_gone(numbers):
+    cursors = OpenCursors(numbers, max_open=0)
+    with numbers.reader() as conn:
+        first = fetch_page(conn, "SELECT n FROM t ORDER BY n", 0, 2, cursors)
+        query, offset, page_size, cursor_id = decode_page_token(first["next_token"])
+        assert cursor_id is None
+        assert cursors.take(cursor_id, query, offset) is None
+        page = fetch_page(conn, query, offset, page_size, cursors)
+    assert page["rows"] == [(3,), (4,)]
+
+
+def test_continued_pages_come_from_the_first_page_snapshot(db_server, numbers):
+    first = run(db_server, "SELECT n FROM t ORDER BY n", 2)
+    assert first["rows"] == [[1], [2]]
+    assert json.loads(db_server._run_db_query("UPDATE t SET n = n * 100"))["success"]
+
+    assert next_page(db_server, first)["rows"] == [[3], [4]]
+    # a new run sees the write, on its first page and on the pages after
+    fresh = run(db_server, "SELECT n FROM t ORDER BY n", 2)
+    assert fresh["rows"] == [[100], [200]]
+    assert next_page(db_server, fresh)["rows"] == [[300], [400]]
+
+
+def test_pages_cached_before_a_write_are_not_served_after_it(db_server, numbers):
+    query = "SELECT n FROM t ORDER BY n"
+    first = run(db_server, query, 2)
+    db_server._run_db_query("INSERT INTO t VALUES (6)")
+    # the continued page predates the insert, so it must not be cached
+    assert next_page(db_server, first)["rows"] == [[3], [4]]
+    restarted = json.loads(db_server._run_db_query(query, 2, 2))
+    assert restarted["rows"] == [[3], [4]]
+    assert next_page(db_server, restarted)["rows"] == [[5], [6]]
+
+
+def test_reads_are_cached_until_a_write(db_server, numbers):
+    query = "SELECT COUNT(*) FROM t"
+    assert run(db_server, query, 10)["rows"] == [[5]]
+    assert run(db_server, query, 10)["rows"] == [[5]]
+    assert db_server.query_cache.hits == 1
+    db_server._run_db_query("DELETE FROM t WHERE n > 3")
+    assert run(db_server, query, 10)["rows"] == [[3]]
+
+
+def test_vacuum_runs_on_the_writer(db_server, numbers):
+    assert json.loads(db_server._run_db_query("VACUUM")) == {"success": True}
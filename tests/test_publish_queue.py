@@ -0,0 +1,223 @@
+import pytest
+import requests
+
+from utils import publish_queue
+from utils.publish_queue import PublishQueue
+
+AUTHOR = "urn:li:person:1"
+WINDOW = 600
+
+
+class FakeClient:
+    """Stands in for LinkedInClient: records posts, serves recent_posts."""
+
+    def __init__(self, folder_path):
+        self.folder_path = str(folder_path)
+        self.posted = []
+        self.posts = []
+        self.post_error = None
+        self.list_error = None
+
+    def _resolve_images(self, image_paths):
+        return image_paths
+
+    def upload_images(self, author_urn, paths):
+        return [f"urn:li:digitalmediaAsset:{p}" for p in paths]
+
+    def publish_post(self, author_urn, text, category, media):
+        self.posted.append((text, category, media))
+        if self.post_error is not None:
+            raise self.post_error
+        return f"urn:li:share:{len(self.posted)}"
+
+    def recent_posts(self, author_urn):
+        if self.list_error is not None:
+            raise self.list_error
+        return self.posts
+
+
+def http_error(status):
+    resp = requests.Response()
+    resp.status_code = status
+    return requests.HTTPError(f"{status} Error", response=resp)
+
+
+def linkedin_post(urn, text, created_ms, assets=()):
+    content = {"shareCommentary": {"text": text}}
+    if assets:
+        content["media"] = [{"status": "READY", "media": a} for a in assets]
+    return {
+        "id": urn,
+        "created": {"time": created_ms},
+        "specificContent": {"com.linkedin.ugc.ShareContent": content},
+    }
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """publish_queue's time.time, set by assigning clock.now."""
+    class Clock:
+        now = 1000 * WINDOW + 100.0
+
+        def time(self):
+            return self.now
+
+    clock = Clock()
+    monkeypatch.setattr(publish_queue.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture
+def client(tmp_path):
+    return FakeClient(tmp_path)
+
+
+@pytest.fixture
+def queue(database, client, clock):
+    return PublishQueue(database, client, AUTHOR, rate=1000, burst=1000,
+                        dedupe_window=WINDOW)
+
+
+def run_next(queue):
+    job = queue._claim()
+    assert job is not None
+    queue._dispatch(job)
+    return queue.get(job["id"])
+
+
+# ─── Dedupe ───────────────────────────────────────────────────────────────────
+
+def test_same_post_twice_is_one_job(queue):
+    first = queue.enqueue("hello")
+    second = queue.enqueue("hello")
+    assert not first["duplicate"]
+    assert second["duplicate"]
+    assert second["id"] == first["id"]
+    assert queue.counts() == {"queued": 1}
+
+
+def test_dedupe_window_slides_across_window_boundaries(queue, clock):
+    clock.now = 1000 * WINDOW + WINDOW - 10
+    first = queue.enqueue("hello")
+    # the next window, but within WINDOW seconds of the first submission
+    clock.now += 20
+    assert queue.enqueue("hello")["id"] == first["id"]
+    clock.now += WINDOW
+    later = queue.enqueue("hello")
+    assert not later["duplicate"]
+    assert later["id"] != first["id"]
+
+
+def test_different_text_is_a_different_job(queue):
+    assert queue.enqueue("hello")["id"] != queue.enqueue("hello again")["id"]
+
+
+def test_scheduled_post_dedupes_regardless_of_when_it_is_submitted(queue, clock):
+    first = queue.enqueue("hello", publish_at="2030-01-01T09:00:00Z")
+    clock.now += 10 * WINDOW
+    second = queue.enqueue("hello", publish_at="2030-01-01T09:00:00Z")
+    assert second["duplicate"]
+    assert second["id"] == first["id"]
+
+
+def test_explicit_key_wins_over_content(queue):
+    first = queue.enqueue("hello", idempotency_key="launch")
+    second = queue.enqueue("something else", idempotency_key="launch")
+    assert second["duplicate"]
+    assert second["payload"] == first["payload"] == {"text": "hello"}
+
+
+def test_empty_post_is_refused(queue):
+    with pytest.raises(ValueError):
+        queue.enqueue("")
+
+
+# ─── Publishing and verify ────────────────────────────────────────────────────
+
+def test_job_is_posted_once(queue, client):
+    queue.enqueue("hello")
+    job = run_next(queue)
+    assert job["status"] == "done"
+    assert job["post_urn"] == "urn:li:share:1"
+    assert client.posted == [("hello", "NONE", None)]
+
+
+def test_lost_post_response_is_verified_before_posting_again(queue, client, clock):
+    job = queue.enqueue("hello")
+    client.post_error = requests.ReadTimeout("read timed out")
+    job = run_next(queue)
+    assert job["status"] == "retrying"
+    assert job["phase"] == "verify"
+
+    # the post did go through; the retry finds it instead of posting again
+    client.post_error = None
+    client.posts = [linkedin_post("urn:li:share:9", "hello", clock.now * 1000)]
+    clock.now += 3600
+    job = run_next(queue)
+    assert job["status"] == "done"
+    assert job["post_urn"] == "urn:li:share:9"
+    assert len(client.posted) == 1
+
+
+def test_verify_posts_when_no_matching_post_exists(queue, client, clock):
+    job = queue.enqueue("hello")
+    created_ms = clock.now * 1000
+    queue._update(job["id"], phase="verify")
+    client.posts = [
+        # same text, but from before the job was queued
+        linkedin_post("urn:li:share:7", "hello", created_ms - 3600 * 1000),
+        # other text
+        linkedin_post("urn:li:share:8", "hello world", created_ms),
+    ]
+    job = run_next(queue)
+    assert job["status"] == "done"
+    assert job["post_urn"] == "urn:li:share:1"
+    assert client.posted == [("hello", "NONE", None)]
+
+
+def test_verify_matches_media_posts_on_their_assets(queue, client, clock):
+    queue.enqueue("hello", image_paths=["a.png", "b.png"])
+    client.post_error = requests.ReadTimeout("read timed out")
+    job = run_next(queue)
+    assets = job["assets"]
+    assert job["phase"] == "verify"
+
+    client.post_error = None
+    now_ms = clock.now * 1000
+    client.posts = [
+        linkedin_post("urn:li:share:8", "hello", now_ms, assets[:1]),
+        linkedin_post("urn:li:share:9", "hello", now_ms, reversed(assets)),
+    ]
+    clock.now += 3600
+    job = run_next(queue)
+    assert job["post_urn"] == "urn:li:share:9"
+    assert len(client.posted) == 1
+
+
+def test_unverifiable_job_ends_unknown_without_posting(queue, client):
+    job = queue.enqueue("hello")
+    queue._update(job["id"], phase="verify")
+    client.list_error = http_error(403)
+    job = run_next(queue)
+    assert job["status"] == "unknown"
+    assert "r_member_social" in job["last_error"]
+    assert client.posted == []
+
+
+def test_rejected_post_is_retried_without_verify(queue, client):
+    queue.enqueue("hello")
+    client.post_error = http_error(429)
+    job = run_next(queue)
+    assert job["status"] == "retrying"
+    assert job["phase"] == "post"
+
+
+def test_jobs_interrupted_mid_post_are_verified_after_restart(database, client, clock):
+    queue = PublishQueue(database, client, AUTHOR, dedupe_window=WINDOW)
+    job = queue.enqueue("hello")
+    queue._update(job["id"], status="running", phase="posting")
+
+    restarted = PublishQueue(database, client, AUTHOR, dedupe_window=WINDOW)
+    job = restarted.get(job["id"])
+    assert job["status"] == "retrying"
+    assert job["phase"] == "verify"
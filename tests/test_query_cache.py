@@ -0,0 +1,110 @@
+import sqlite3
+
+import pytest
+
+from utils.query_cache import QueryCache, analyze_sql, normalize_sql, table_write
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE posts (id INTEGER PRIMARY KEY, body TEXT);
+        CREATE TABLE audit (post_id INTEGER);
+        CREATE TRIGGER posts_audit AFTER INSERT ON posts
+        BEGIN INSERT INTO audit VALUES (new.id); END;
+    """)
+    yield conn
+    conn.close()
+
+
+def test_select_is_a_deterministic_read(conn):
+    info = analyze_sql(conn, "SELECT p.body FROM posts p JOIN audit a ON a.post_id = p.id")
+    assert info.readonly
+    assert info.reads == {"posts", "audit"}
+    assert not info.writes
+    assert not info.global_write
+    assert info.deterministic
+
+
+def test_cte_select_is_a_read(conn):
+    info = analyze_sql(conn, "WITH recent AS (SELECT id FROM posts) SELECT * FROM recent")
+    assert info.readonly
+    assert info.reads == {"posts"}
+
+
+def test_volatile_function_is_not_deterministic(conn):
+    info = analyze_sql(conn, "SELECT id, random() FROM posts")
+    assert info.readonly
+    assert not info.deterministic
+
+
+def test_insert_writes_the_tables_its_triggers_write(conn):
+    info = analyze_sql(conn, "INSERT INTO posts (body) VALUES ('hi')")
+    assert not info.readonly
+    assert info.writes == {"posts", "audit"}
+    assert not info.global_write
+
+
+def test_vacuum_goes_to_the_writer(conn):
+    # reports no table access at all, so must not pass for a read
+    info = analyze_sql(conn, "VACUUM")
+    assert not info.readonly
+
+
+@pytest.mark.parametrize("sql", [
+    "CREATE TABLE other (x)",
+    "DROP TABLE audit",
+    "PRAGMA journal_mode = DELETE",
+    "ATTACH ':memory:' AS other",
+])
+def test_schema_and_pragma_changes_are_global(conn, sql):
+    info = analyze_sql(conn, sql)
+    assert not info.readonly
+    assert info.global_write
+
+
+def test_load_extension_is_global(conn):
+    info = analyze_sql(conn, "SELECT load_extension('x')")
+    assert not info.readonly
+    assert info.global_write
+
+
+def test_explain_is_a_read_of_the_explained_tables(conn):
+    info = analyze_sql(conn, "EXPLAIN QUERY PLAN INSERT INTO posts (body) VALUES ('hi')")
+    assert info.readonly
+    assert not info.writes
+    assert not info.deterministic
+
+
+def test_invalid_sql_raises(conn):
+    with pytest.raises(sqlite3.Error):
+        analyze_sql(conn, "SELEC 1")
+
+
+def test_normalize_sql_keeps_quoted_whitespace():
+    assert normalize_sql("SELECT  'a  b'\n FROM t ;") == "SELECT 'a  b' FROM t"
+
+
+def test_invalidate_drops_entries_of_written_tables():
+    cache = QueryCache()
+    cache.put("a", 1, {"posts"})
+    cache.put("b", 2, {"audit"})
+    cache.invalidate(table_write("posts"))
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_put_drops_results_from_before_a_write():
+    cache = QueryCache()
+    generation = cache.generation
+    cache.invalidate(table_write("posts"))
+    cache.put("a", 1, {"posts"}, generation)
+    assert cache.get("a") is None
+    cache.put("a", 1, {"posts"}, cache.generation)
+    assert cache.get("a") == 1
+
+
+def test_normalize_sql_keeps_literals_apart():
+    # an alias and a blob literal must not share a cache key
+    assert normalize_sql("SELECT x 'AB'") != normalize_sql("SELECT x'AB'")
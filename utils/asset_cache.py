@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from utils.config import (
+    STATE_DIR,
+    ASSET_CACHE_ENABLED,
+    ASSET_CACHE_TTL,
+    ASSET_CACHE_MAX_ENTRIES,
+    ASSET_CACHE_VERIFY_INTERVAL,
+)
+
+
+# (path, size, mtime_ns) -> digest, so the asset cache and the upload
+# journal hash a file once between changes
+_hashes = {}
+_hashes_lock = threading.Lock()
+_HASHES_MAX = 1024
+
+
+def file_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in blocks so large videos aren't loaded whole."""
+    st = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), st.st_size, st.st_mtime_ns)
+    digest = _hashes.get(memo_key)
+    if digest is not None:
+        return digest
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    with _hashes_lock:
+        if len(_hashes) >= _HASHES_MAX:
+            _hashes.clear()
+        _hashes[memo_key] = digest
+    return digest
+
+
+class AssetCache:
+    """
+    Persistent index of media already uploaded to LinkedIn, keyed by
+    (owner, recipe, content hash) and pointing at the asset URN.
+
+    Entries expire ttl seconds after upload, the least recently used ones are
+    evicted beyond max_entries, and callers should re-check an entry with
+    LinkedIn once needs_verify() says it is due.
+    """
+
+    def __init__(self,
+                 path: str = None,
+                 ttl: float = ASSET_CACHE_TTL,
+                 max_entries: int = ASSET_CACHE_MAX_ENTRIES,
+                 verify_interval: float = ASSET_CACHE_VERIFY_INTERVAL):
+        self.path = path or os.path.join(os.path.expanduser(STATE_DIR), "asset_cache.json")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.verify_interval = verify_interval
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def key(owner: str, recipe: str, digest: str) -> str:
+        return f"{owner}|{recipe}|{digest}"
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp, self.path)
+
+    def get(self, key: str) -> dict:
+        """Return the entry for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created"] > self.ttl:
+                del self._entries[key]
+                self._save()
+                entry = None
+            if entry is None:
+                self.misses += 1
+            return dict(entry) if entry else None
+
+    def needs_verify(self, entry: dict) -> bool:
+        return time.time() - entry["verified_at"] > self.verify_interval
+
+    def hit(self, key: str, verified: bool = False):
+        """Record that the cached asset for key was reused."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            now = time.time()
+            entry["last_used"] = now
+            if verified:
+                entry["verified_at"] = now
+            self.hits += 1
+            self.bytes_saved += entry["size"]
+            self._save()
+
+    def put(self, key: str, asset_urn: str, size: int):
+        """Remember a freshly uploaded asset, evicting the LRU entries if full."""
+        with self._lock:
+            now = time.time()
+            self._entries[key] = {
+                "asset": asset_urn,
+                "size": size,
+                "created": now,
+                "last_used": now,
+                "verified_at": now,
+            }
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                lru = sorted(self._entries, key=lambda k: self._entries[k]["last_used"])
+                for old in lru[:overflow]:
+                    del self._entries[old]
+            self._save()
+
+    def discard(self, key: str):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_asset_cache() -> AssetCache:
+    """
+    The process-wide AssetCache shared by every client, or None when
+    ASSET_CACHE_ENABLED is off.
+    """
+    global _default_cache
+    if not ASSET_CACHE_ENABLED:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AssetCache()
+        return _default_cache
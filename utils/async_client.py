@@ -0,0 +1,476 @@
+import asyncio
+import copy
+import mimetypes
+import os
+from urllib.parse import quote
+import httpx
+from utils.config import (
+    ACCESS_TOKEN,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    LINKEDIN_SETTINGS,
+    require,
+)
+from utils.client import (
+    SYNC_MECHANISM,
+    MULTIPART_MECHANISM,
+    IMAGE_RECIPE,
+    VIDEO_RECIPE,
+    RETRY_STATUSES,
+    USABLE_ASSET_STATUSES,
+    LinkedInClient,
+    register_upload_payload,
+    ugc_post_payload,
+    video_media_entry,
+    complete_multipart_payload,
+)
+from utils.asset_cache import AssetCache, file_hash, get_asset_cache
+from utils.metrics import metrics, endpoint
+from utils.media import get_process_pool, preprocess_image
+from utils.http_pool import build_async_client, new_pool_counters, async_pool_stats
+from utils.uploads import (
+    aiter_file_range,
+    UPLOADED,
+    load_journal,
+    new_journal_entry,
+    record_part,
+    mark_uploaded,
+    save_journal,
+    clear_journal,
+    prune_journal,
+)
+
+
+class AsyncLinkedInClient:
+    """
+    asyncio version of LinkedInClient with the same methods, as coroutines.
+    Uploads stream from disk without blocking the event loop.
+    """
+    API_BASE = LinkedInClient.API_BASE
+    MULTIPART_THRESHOLD = LinkedInClient.MULTIPART_THRESHOLD
+    IMAGE_UPLOAD_CONCURRENCY = LinkedInClient.IMAGE_UPLOAD_CONCURRENCY
+    folder_path = LinkedInClient.folder_path
+
+    def __init__(self,
+                 pool_connections: int = HTTP_POOL_CONNECTIONS,
+                 pool_maxsize: int = HTTP_POOL_MAXSIZE,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 read_timeout: float = HTTP_READ_TIMEOUT,
+                 asset_cache: AssetCache = None):
+        require(*LINKEDIN_SETTINGS)
+        self.headers = {
+            "Authorization": f"Bearer {ACCESS_TOKEN}",
+            "X-Restli-Protocol-Version": "2.0.0",
+        }
+        self._counters = new_pool_counters()
+        self.session = build_async_client(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            counters=self._counters,
+        )
+        self.asset_cache = asset_cache or get_asset_cache()
+        # asset URN -> upload journal key, cleared once the asset is posted
+        self._journaled = {}
+        # journal saves run in worker threads; this keeps them in call order
+        self._journal_lock = asyncio.Lock()
+        prune_journal()
+
+    def set_access_token(self, token: str):
+        """
+        Use token for every later request. The headers dict is replaced, not
+        mutated, so a request in flight sees either the old or the new one.
+        """
+        self.headers = {**self.headers, "Authorization": f"Bearer {token}"}
+
+    def pool_stats(self) -> dict:
+        """Per-host connection pool statistics (see utils.http_pool.async_pool_stats)."""
+        return async_pool_stats(self.session, self._counters)
+
+    async def close(self):
+        """Close every pooled connection."""
+        await self.session.aclose()
+
+    async def _post_json(self, url, payload):
+        resp = await self.session.post(
+            url,
+            headers={**self.headers, "Content-Type": "application/json"},
+            json=payload
+        )
+        resp.raise_for_status()
+        return resp
+
+    async def _put_file(self, url, file_path, first_byte, last_byte, headers):
+        """PUT a byte range of a file, streamed, with an explicit length."""
+        return await self.session.put(
+            url,
+            content=aiter_file_range(file_path, first_byte, last_byte),
+            headers={**headers, "Content-Length": str(last_byte - first_byte + 1)}
+        )
+
+    async def asset_status(self, asset_urn: str) -> str:
+        """LinkedIn's status for an uploaded asset (see LinkedInClient.asset_status)."""
+        asset_id = asset_urn.rsplit(":", 1)[-1]
+        resp = await self.session.get(
+            f"{self.API_BASE}/assets/{asset_id}", headers=self.headers
+        )
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        statuses = [r.get("status") for r in resp.json().get("recipes", [])]
+        if not statuses:
+            return None
+        return next((s for s in statuses if s != "AVAILABLE"), "AVAILABLE")
+
+    async def asset_available(self, asset_urn: str) -> bool:
+        """Check with LinkedIn that an uploaded asset is still usable."""
+        return await self.asset_status(asset_urn) == "AVAILABLE"
+
+    async def _reuse_asset(self, author_urn, recipe, file_path):
+        """
+        Look file_path up in the asset cache.
+        Returns (key, asset_urn), with asset_urn None on a miss. The key
+        also names the file's upload journal.
+        """
+        digest = await asyncio.to_thread(file_hash, file_path)
+        key = AssetCache.key(author_urn, recipe, digest)
+        if self.asset_cache is None:
+            return key, None
+        # the cache rewrites its JSON index on changes: keep that off the loop
+        entry = await asyncio.to_thread(self.asset_cache.get, key)
+        if entry is None:
+            return key, None
+        verified = self.asset_cache.needs_verify(entry)
+        if verified and not await self.asset_available(entry["asset"]):
+            await asyncio.to_thread(self.asset_cache.discard, key)
+            return key, None
+        await asyncio.to_thread(self.asset_cache.hit, key, verified)
+        return key, entry["asset"]
+
+    async def _remember_asset(self, key, asset_urn, file_path):
+        if self.asset_cache is not None:
+            await asyncio.to_thread(
+                self.asset_cache.put, key, asset_urn, os.path.getsize(file_path)
+            )
+
+    async def _resume_from_journal(self, key):
+        """The upload journal entry to carry on from, or None to start afresh."""
+        entry = await asyncio.to_thread(load_journal, key)
+        if entry is None or entry["status"] != UPLOADED:
+            return entry
+        if await self.asset_status(entry["asset"]) in USABLE_ASSET_STATUSES:
+            return entry
+        await asyncio.to_thread(clear_journal, key)
+        return None
+
+    async def _save_journal(self, entry):
+        """save_journal off the event loop, writing a snapshot of entry as it is now."""
+        snapshot = copy.deepcopy(entry)
+        async with self._journal_lock:
+            await asyncio.to_thread(save_journal, snapshot)
+
+    async def _finish_journal(self, entry):
+        mark_uploaded(entry)
+        await self._save_journal(entry)
+        self._journaled[entry["asset"]] = entry["key"]
+
+    async def _upload_single(self, key, file_path, register, put):
+        """
+        Upload a file with one PUT, journaled (see LinkedInClient._upload_single).
+        register() and put(url, path) are coroutine functions.
+        Returns the asset URN.
+        """
+        entry = await self._resume_from_journal(key)
+        if entry is None:
+            value = await register()
+            entry = new_journal_entry(
+                key, file_path, value["asset"],
+                upload_url=value["uploadMechanism"][SYNC_MECHANISM]["uploadUrl"],
+            )
+            await self._save_journal(entry)
+        elif entry["status"] == UPLOADED:
+            self._journaled[entry["asset"]] = key
+            return entry["asset"]
+        try:
+            await put(entry["upload_url"], file_path)
+        except httpx.HTTPStatusError as e:
+            # an expired or rejected upload URL: register afresh next time
+            if e.response.status_code not in RETRY_STATUSES:
+                await asyncio.to_thread(clear_journal, key)
+            raise
+        await self._finish_journal(entry)
+        return entry["asset"]
+
+    async def publish_post(self, author_urn, text, category="NONE", media=None):
+        """
+        Create the post itself, with media (if any) already uploaded.
+        Returns the post URN.
+        """
+        resp = await self._post_json(
+            f"{self.API_BASE}/ugcPosts",
+            ugc_post_payload(author_urn, text, category, media)
+        )
+        # the media is posted: nothing left to resume
+        for item in media or ():
+            key = self._journaled.pop(item["media"], None)
+            if key is not None:
+                await asyncio.to_thread(clear_journal, key)
+        return resp.json().get("id")
+
+    async def recent_posts(self, author_urn, count=20, start=0):
+        """The author's posts, most recently modified first (one page)."""
+        resp = await self.session.get(
+            f"{self.API_BASE}/ugcPosts?q=authors"
+            f"&authors=List({quote(author_urn, safe='')})"
+            f"&sortBy=LAST_MODIFIED&count={count}&start={start}",
+            headers=self.headers
+        )
+        resp.raise_for_status()
+        return resp.json().get("elements", [])
+
+    async def post_text(self, author_urn, text):
+        """Publish a text-only post. Returns the post URN."""
+        return await self.publish_post(author_urn, text)
+
+    async def _register_upload(self, author_urn):
+        """Register an image upload and get upload URL + asset URN."""
+        resp = await self._post_json(
+            f"{self.API_BASE}/assets?action=registerUpload",
+            register_upload_payload(author_urn, IMAGE_RECIPE)
+        )
+        return resp.json()
+
+    async def _upload_image(self, upload_url, file_path):
+        """Upload binary image data to the given upload URL."""
+        mime_type, _ = mimetypes.guess_type(file_path)
+        size = await asyncio.to_thread(os.path.getsize, file_path)
+        resp = await self._put_file(upload_url, file_path, 0, size - 1, {
+            "Authorization": self.headers["Authorization"],
+            "Content-Type": mime_type or "application/octet-stream"
+        })
+        resp.raise_for_status()
+
+    async def _register_and_upload_image(self, author_urn, path, limit):
+        async with limit:
+            key, asset_urn = await self._reuse_asset(author_urn, IMAGE_RECIPE, path)
+            if asset_urn:
+                return asset_urn
+            async def register():
+                return (await self._register_upload(author_urn))["value"]
+
+            asset_urn = await self._upload_single(key, path, register, self._upload_image)
+            await self._remember_asset(key, asset_urn, path)
+            return asset_urn
+
+    _resolve_images = LinkedInClient._resolve_images
+
+    async def preprocess_images(self, image_paths):
+        """
+        Downscale, re-encode and strip metadata from images on the shared
+        process pool. Returns one report per image, in order, whose "path"
+        is the file to upload.
+        """
+        paths = self._resolve_images(image_paths)
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool()
+        return list(await asyncio.gather(*(
+            loop.run_in_executor(pool, preprocess_image, path) for path in paths
+        )))
+
+    async def upload_images(self, author_urn, image_paths, max_workers=None):
+        """
+        Register and upload several images concurrently, at most max_workers
+        at a time. Returns the asset URNs in the same order as image_paths.
+        """
+        paths = self._resolve_images(image_paths)
+
+        limit = asyncio.Semaphore(max_workers or self.IMAGE_UPLOAD_CONCURRENCY)
+        # gather() returns results in argument order
+        return list(await asyncio.gather(*(
+            self._register_and_upload_image(author_urn, path, limit)
+            for path in paths
+        )))
+
+    async def post_image(self, author_urn, text, image_paths, max_workers=None,
+                         preprocess=False):
+        """
+        Publish a post with one or more images. Returns the post URN.
+        With preprocess=True the images are shrunk for LinkedIn first.
+        """
+        if preprocess:
+            image_paths = [r["path"] for r in await self.preprocess_images(image_paths)]
+        media_entries = [
+            {"status": "READY", "media": asset_urn}
+            for asset_urn in await self.upload_images(author_urn, image_paths, max_workers)
+        ]
+        return await self.publish_post(author_urn, text, "IMAGE", media_entries)
+
+    async def _register_video_upload(self, author_urn: str):
+        """Register a synchronous video upload; returns upload URL + asset URN."""
+        resp = await self._post_json(
+            f"{self.API_BASE}/assets?action=registerUpload",
+            register_upload_payload(author_urn, VIDEO_RECIPE)
+        )
+        return resp.json()["value"]
+
+    async def _upload_video(self, upload_url: str, file_path: str):
+        """Upload the video bytes to the URL LinkedIn gave you."""
+        mime_type, _ = mimetypes.guess_type(file_path)
+        size = await asyncio.to_thread(os.path.getsize, file_path)
+        resp = await self._put_file(upload_url, file_path, 0, size - 1, {
+            "Authorization": self.headers["Authorization"],
+            "Content-Type": mime_type or "application/octet-stream"
+        })
+        resp.raise_for_status()
+
+    async def _register_multipart_video_upload(self, author_urn: str, file_size: int):
+        """Register a video for LinkedIn's multipart upload."""
+        resp = await self._post_json(
+            f"{self.API_BASE}/assets?action=registerUpload",
+            register_upload_payload(
+                author_urn, VIDEO_RECIPE, "MULTIPART_UPLOAD", file_size
+            )
+        )
+        return resp.json()["value"]
+
+    async def _upload_part(self, part: dict, file_path: str, retries: int = 3) -> dict:
+        """
+        Upload one byte range of a multipart upload, retrying on network
+        errors and retryable statuses. Returns its partUploadResponse.
+        """
+        first = part["byteRange"]["firstByte"]
+        last = part["byteRange"]["lastByte"]
+        for attempt in range(retries + 1):
+            try:
+                resp = await self._put_file(
+                    part["url"], file_path, first, last, part.get("headers", {})
+                )
+                if resp.status_code not in RETRY_STATUSES or attempt == retries:
+                    resp.raise_for_status()
+                    return {
+                        "httpStatusCode": resp.status_code,
+                        "headers": {"ETag": resp.headers.get("ETag")}
+                    }
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+            if metrics.enabled:
+                metrics.retry("http", endpoint(part["url"]))
+            await asyncio.sleep(min(2 ** attempt, 30))
+
+    async def _complete_multipart_upload(self, state: dict):
+        """Tell LinkedIn every part is uploaded so it can assemble the video."""
+        await self._post_json(
+            f"{self.API_BASE}/assets?action=completeMultiPartUpload",
+            complete_multipart_payload(state)
+        )
+
+    async def _upload_video_multipart(self,
+                                      author_urn: str,
+                                      file_path: str,
+                                      max_workers: int = 4,
+                                      retries: int = 3,
+                                      key: str = None) -> str:
+        """
+        Upload a video with LinkedIn's multipart mechanism, max_workers parts
+        at a time, resuming from the upload journal. Returns the asset URN.
+        """
+        if not os.path.isfile(file_path):
+            raise ValueError(f"Video file does not exist: {file_path}")
+        if key is None:
+            digest = await asyncio.to_thread(file_hash, file_path)
+            key = AssetCache.key(author_urn, VIDEO_RECIPE, digest)
+
+        state = await self._resume_from_journal(key)
+        if state is None:
+            upload_info = await self._register_multipart_video_upload(
+                author_urn, os.path.getsize(file_path)
+            )
+            multipart = upload_info["uploadMechanism"][MULTIPART_MECHANISM]
+            state = new_journal_entry(
+                key, file_path, upload_info["asset"],
+                upload_info=upload_info, multipart=multipart,
+            )
+            await self._save_journal(state)
+        elif state["status"] == UPLOADED:
+            self._journaled[state["asset"]] = key
+            return state["asset"]
+
+        limit = asyncio.Semaphore(max_workers)
+
+        async def upload(i):
+            async with limit:
+                part_response = await self._upload_part(
+                    state["parts"][i], file_path, retries
+                )
+            record_part(state, i, part_response)
+            await self._save_journal(state)
+
+        pending = [
+            i for i in range(len(state["parts"])) if str(i) not in state["done"]
+        ]
+        # let every part finish (or fail) so progress is saved before raising
+        results = await asyncio.gather(
+            *(upload(i) for i in pending), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        await self._complete_multipart_upload(state)
+        await self._finish_journal(state)
+        return state["asset"]
+
+    async def upload_video(self,
+                           author_urn: str,
+                           video_path: str,
+                           multipart: bool = None,
+                           max_workers: int = 4) -> str:
+        """
+        Upload a video (or reuse an identical one already uploaded).
+        multipart forces (True) or disables (False) the chunked, resumable
+        upload; by default it is used for files over MULTIPART_THRESHOLD.
+        Returns the asset URN.
+        """
+        video_path = os.path.join(self.folder_path, video_path)
+        if not os.path.isfile(video_path):
+            raise ValueError(f"Video file does not exist: {video_path}")
+        if multipart is None:
+            multipart = os.path.getsize(video_path) >= self.MULTIPART_THRESHOLD
+
+        key, asset_urn = await self._reuse_asset(author_urn, VIDEO_RECIPE, video_path)
+        if asset_urn is None:
+            if multipart:
+                asset_urn = await self._upload_video_multipart(
+                    author_urn, video_path, max_workers=max_workers, key=key
+                )
+            else:
+                asset_urn = await self._upload_single(
+                    key, video_path,
+                    lambda: self._register_video_upload(author_urn),
+                    self._upload_video,
+                )
+            await self._remember_asset(key, asset_urn, video_path)
+        return asset_urn
+
+    async def post_video(self,
+                         author_urn: str,
+                         text: str,
+                         video_path: str,
+                         title: str = None,
+                         description: str = None,
+                         multipart: bool = None,
+                         max_workers: int = 4) -> str:
+        """
+        Publish a post with a single video (see upload_video for multipart).
+        Returns the post URN.
+        """
+        # 1) register & upload the bytes, unless this video is already uploaded
+        asset_urn = await self.upload_video(author_urn, video_path, multipart, max_workers)
+
+        # 2) build the UGC post
+        media_entry = video_media_entry(asset_urn, title, description)
+        return await self.publish_post(author_urn, text, "VIDEO", [media_entry])
@@ -0,0 +1,142 @@
+import asyncio
+import os
+from typing import Callable, Dict, List
+from utils.client import video_media_entry
+from utils.config import (
+    BATCH_POST_RATE_LIMIT,
+    BATCH_POST_RATE_BURST,
+    BATCH_POST_CONCURRENCY,
+)
+from utils.ratelimit import TokenBucket
+
+# Shared by every batch, so back-to-back batches stay under the limit too
+_post_limiter = TokenBucket(BATCH_POST_RATE_LIMIT, BATCH_POST_RATE_BURST)
+
+
+def _resolve(client, path: str) -> str:
+    """Where the client will read path from; two spellings of one file match."""
+    return os.path.normpath(os.path.join(client.folder_path, path))
+
+
+def _check_spec(spec: dict):
+    if not spec.get("content"):
+        raise ValueError("Content cannot be empty")
+    if spec.get("image_paths") and spec.get("video_path"):
+        raise ValueError("A post can have images or a video, not both")
+
+
+async def create_posts_batch(
+    client,
+    author_urn: str,
+    posts: List[Dict],
+    schedule: Callable = None,
+    optimize: bool = False,
+    concurrency: int = BATCH_POST_CONCURRENCY,
+) -> Dict:
+    """
+    Create many posts with one AsyncLinkedInClient.
+
+    Each post is {"content", "image_paths"?, "video_path"?, "title"?,
+    "description"?, "publish_at"?, "idempotency_key"?}. Posts with a
+    publish_at are handed to schedule(spec) (run in a thread; it returns the
+    queued job). The others are published now: every distinct image or video
+    is uploaded once, however many posts use it, then the posts are sent
+    `concurrency` at a time under the batch rate limit.
+
+    A failing post (bad spec, failed upload or post) is reported, not raised.
+    Returns {"posts": [{"index", "status": "published" | "scheduled" |
+    "failed", "url" | "job" | "error"}, ...] in input order, "counts",
+    "uploads": {"files", "shared"}}.
+    """
+    results = [None] * len(posts)
+    now, later = [], []
+    for i, spec in enumerate(posts):
+        try:
+            _check_spec(spec)
+        except ValueError as e:
+            results[i] = {"index": i, "status": "failed", "error": str(e)}
+            continue
+        (later if spec.get("publish_at") else now).append(i)
+
+    async def enqueue(i):
+        try:
+            job = await asyncio.to_thread(schedule, posts[i])
+            results[i] = {"index": i, "status": "scheduled", "job": job}
+        except Exception as e:
+            results[i] = {"index": i, "status": "failed", "error": str(e)}
+
+    if later and schedule is None:
+        for i in later:
+            results[i] = {"index": i, "status": "failed", "error": "Scheduling is not available"}
+        later = []
+    scheduling = asyncio.gather(*(enqueue(i) for i in later))
+
+    # ─── Upload each distinct file once ──────────────────────────────────────
+    # resolved path -> the path as given, which the client resolves itself
+    images, videos = {}, {}
+    for i in now:
+        for p in posts[i].get("image_paths") or ():
+            images.setdefault(_resolve(client, p), p)
+        if posts[i].get("video_path"):
+            videos.setdefault(_resolve(client, posts[i]["video_path"]), posts[i]["video_path"])
+    uses = sum(len(posts[i].get("image_paths") or ()) + bool(posts[i].get("video_path"))
+               for i in now)
+    limit = asyncio.Semaphore(client.IMAGE_UPLOAD_CONCURRENCY)
+
+    async def upload_image(path):
+        async with limit:
+            if optimize:
+                path = (await client.preprocess_images([path]))[0]["path"]
+            # one file per call, so a bad image only fails the posts using it
+            return (await client.upload_images(author_urn, [path], max_workers=1))[0]
+
+    async def upload_video(path):
+        async with limit:
+            return await client.upload_video(author_urn, path)
+
+    uploaded = await asyncio.gather(
+        *(upload_image(p) for p in images.values()),
+        *(upload_video(p) for p in videos.values()),
+        return_exceptions=True,
+    )
+    assets = dict(zip([*images, *videos], uploaded))
+
+    # ─── Publish ─────────────────────────────────────────────────────────────
+    sending = asyncio.Semaphore(concurrency)
+
+    async def publish(i):
+        spec = posts[i]
+        try:
+            if spec.get("image_paths"):
+                urns = [assets[_resolve(client, p)] for p in spec["image_paths"]]
+                category, media = "IMAGE", [{"status": "READY", "media": u} for u in urns]
+            elif spec.get("video_path"):
+                urns = [assets[_resolve(client, spec["video_path"])]]
+                category = "VIDEO"
+                media = [video_media_entry(urns[0], spec.get("title"), spec.get("description"))]
+            else:
+                urns, category, media = [], "NONE", None
+            failed = next((u for u in urns if isinstance(u, Exception)), None)
+            if failed is not None:
+                raise failed
+            async with sending:
+                await _post_limiter.acquire_async()
+                post_urn = await client.publish_post(author_urn, spec["content"], category, media)
+            results[i] = {
+                "index": i,
+                "status": "published",
+                "url": f"https://www.linkedin.com/feed/update/{post_urn}",
+            }
+        except Exception as e:
+            results[i] = {"index": i, "status": "failed", "error": str(e)}
+
+    await asyncio.gather(scheduling, *(publish(i) for i in now))
+
+    counts = {"published": 0, "scheduled": 0, "failed": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return {
+        "posts": results,
+        "counts": counts,
+        "uploads": {"files": len(images) + len(videos), "shared": uses - len(images) - len(videos)},
+    }
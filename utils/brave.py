@@ -1,17 +1,44 @@
+import asyncio
+import os
 import requests
 import json
-from typing import List, Dict
-from utils.config import BRAVE_API_KEY
+from typing import List, Dict, Tuple
+from urllib.parse import urlsplit, urlunsplit
+from utils.cache import TTLCache
+from utils.config import (
+    BRAVE_API_KEY,
+    BRAVE_RATE_LIMIT,
+    BRAVE_RATE_BURST,
+    STATE_DIR,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_PERSIST,
+)
+from utils.http_pool import build_async_client
+from utils.ratelimit import TokenBucket
 
-def brave_search(query: str, count: int = 5, search_lang: str = "en") -> dict:
-    """
-    Perform a Brave Web Search and return the full JSON response.
-    """
+BRAVE_SEARCH_URL = "https://api.search.brave.com/res/v1/web/search"
+
+# Shared keep-alive client for async_brave_search, created on first use
+_async_http = None
+
+# Recent responses keyed on (query, count, search_lang)
+search_cache = TTLCache(
+    maxsize=SEARCH_CACHE_SIZE,
+    ttl=SEARCH_CACHE_TTL,
+    path=os.path.join(STATE_DIR, "search_cache.json") if SEARCH_CACHE_PERSIST else None,
+)
+# Searches currently on the wire, so identical concurrent calls share one
+_inflight: Dict[str, asyncio.Task] = {}
+# Every call that reaches the Brave API waits its turn here
+rate_limiter = TokenBucket(BRAVE_RATE_LIMIT, BRAVE_RATE_BURST)
+
+
+def _request_args(query: str, count: int, search_lang: str):
     api_key = BRAVE_API_KEY
     if not api_key:
         raise RuntimeError("BRAVE_API_KEY environment variable not set")
 
-    url = "https://api.search.brave.com/res/v1/web/search"
     headers = {
         "Accept": "application/json",
         "Accept-Encoding": "gzip",
@@ -22,11 +49,79 @@ def brave_search(query: str, count: int = 5, search_lang: str = "en") -> dict:
         "count": count,
         "search_lang": search_lang
     }
+    return headers, params
+
+
+def brave_search(query: str, count: int = 5, search_lang: str = "en") -> dict:
+    """
+    Perform a Brave Web Search and return the full JSON response.
+    """
+    headers, params = _request_args(query, count, search_lang)
+    rate_limiter.acquire()
+    resp = requests.get(BRAVE_SEARCH_URL, headers=headers, params=params)
+    resp.raise_for_status()
+    return resp.json()
+
 
-    resp = requests.get(url, headers=headers, params=params)
+async def async_brave_search(query: str, count: int = 5, search_lang: str = "en") -> dict:
+    """
+    asyncio version of brave_search, over a shared keep-alive connection.
+    """
+    global _async_http
+    headers, params = _request_args(query, count, search_lang)
+    if _async_http is None:
+        _async_http = build_async_client()
+    await rate_limiter.acquire_async()
+    resp = await _async_http.get(BRAVE_SEARCH_URL, headers=headers, params=params)
     resp.raise_for_status()
     return resp.json()
 
+
+def _cache_key(query: str, count: int, search_lang: str) -> str:
+    normalized = " ".join(query.split()).lower()
+    return json.dumps([normalized, count, search_lang])
+
+
+async def _fetch_and_cache(key: str, query: str, count: int, search_lang: str) -> dict:
+    data = await async_brave_search(query, count=count, search_lang=search_lang)
+    search_cache.set(key, data)
+    return data
+
+
+def _fetch_done(key: str, task: asyncio.Task):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # mark retrieved so a failure nobody waited for isn't logged
+    if not task.cancelled():
+        task.exception()
+
+
+async def cached_brave_search(
+    query: str, count: int = 5, search_lang: str = "en"
+) -> Tuple[dict, bool]:
+    """
+    async_brave_search behind search_cache. Identical searches made while
+    one is already in flight wait for it instead of calling Brave again.
+    The search runs as its own task, so a caller being cancelled neither
+    cancels it nor the other callers waiting on it.
+
+    Returns (response, from_cache).
+    """
+    key = _cache_key(query, count, search_lang)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached, True
+
+    task = _inflight.get(key)
+    if task is not None:
+        return await asyncio.shield(task), True
+
+    task = asyncio.ensure_future(_fetch_and_cache(key, query, count, search_lang))
+    _inflight[key] = task
+    task.add_done_callback(lambda t: _fetch_done(key, t))
+    return await asyncio.shield(task), False
+
+
 def extract_titles_and_descriptions(
     data: dict
 ) -> List[Dict[str, str]]:
@@ -41,9 +136,73 @@ def extract_titles_and_descriptions(
         desc  = item.get("description", "").strip()
         # skip entries that lack both
         if title or desc:
-            reduced.append({"title": title, "description": desc})
+            reduced.append({"title": title, "description": desc, "url": item.get("url", "")})
     return reduced
 
+
+def _normalize_url(url: str) -> str:
+    """Canonical form of a URL for de-duplication (no fragment/trailing slash)."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def merge_results(results_by_query: Dict[str, List[Dict[str, str]]], k: int = 60) -> List[Dict]:
+    """
+    Merge extracted results from several queries into one ranked list.
+
+    Results are de-duplicated by URL and ranked by reciprocal rank fusion:
+    each query a result appears in adds 1 / (k + rank), so results that rank
+    well for several queries float to the top.
+    """
+    merged = {}
+    for query, results in results_by_query.items():
+        for rank, item in enumerate(results, start=1):
+            key = _normalize_url(item["url"]) if item.get("url") else f"{query}#{rank}"
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = {**item, "score": 0.0, "queries": []}
+            entry["score"] += 1.0 / (k + rank)
+            entry["queries"].append(query)
+
+    ranked = sorted(merged.values(), key=lambda e: e["score"], reverse=True)
+    for entry in ranked:
+        entry["score"] = round(entry["score"], 6)
+    return ranked
+
+
+async def batch_search(
+    queries: List[str], count: int = 5, search_lang: str = "en", on_fresh=None
+) -> Dict:
+    """
+    Run several searches concurrently (within the Brave rate limit) and merge
+    them with merge_results. A failing query is reported, not raised.
+    on_fresh(query, results) is called for each query answered by Brave
+    rather than the cache.
+
+    Returns {"results": [...], "queries": {query: {"cached": bool} or {"error": str}}}.
+    """
+    # keep order, drop duplicate queries
+    unique = list(dict.fromkeys(q for q in queries if q))
+    responses = await asyncio.gather(
+        *(cached_brave_search(q, count=count, search_lang=search_lang) for q in unique),
+        return_exceptions=True,
+    )
+
+    per_query = {}
+    results_by_query = {}
+    for query, response in zip(unique, responses):
+        if isinstance(response, Exception):
+            per_query[query] = {"error": str(response)}
+            continue
+        data, cached = response
+        per_query[query] = {"cached": cached}
+        results_by_query[query] = extract_titles_and_descriptions(data)
+        if on_fresh is not None and not cached:
+            on_fresh(query, results_by_query[query])
+
+    return {"results": merge_results(results_by_query), "queries": per_query}
+
 if __name__ == "__main__":
     # Make sure your environment has:
     #   export BRAVE_API_KEY="your_real_api_key"
@@ -0,0 +1,105 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire ttl seconds after they
+    were stored. With a path, entries are persisted as JSON (values must be
+    JSON-serialisable) and reloaded on start. The file is rewritten by a
+    background timer at most once every save_delay seconds, and on exit,
+    so set() never waits on the disk.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 900, path: str = None,
+                 save_delay: float = 2.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = os.path.expanduser(path) if path else None
+        self.save_delay = save_delay
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        # key -> (expires_at, value), oldest first
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if self.path:
+            self._load()
+            atexit.register(self.flush)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, expires_at, value in items:
+            if expires_at > now:
+                self._data[key] = (expires_at, value)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _schedule_save(self):
+        """Write the file save_delay seconds from now (caller holds _lock)."""
+        if self.path and self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write changes not yet saved to the file now."""
+        with self._lock:
+            if self._save_timer is None:
+                return
+            self._save_timer.cancel()
+            self._save_timer = None
+            items = [[k, exp, v] for k, (exp, v) in self._data.items()]
+        with self._save_lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(items, f)
+            os.replace(tmp, self.path)
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing/expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= time.time():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            self._schedule_save()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._schedule_save()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -1,145 +1,437 @@
 import mimetypes
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
 import requests
-from utils.config import ACCESS_TOKEN, FOLDER_PATH
+from utils.config import (
+    ACCESS_TOKEN,
+    FOLDER_PATH,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    LINKEDIN_SETTINGS,
+    require,
+)
+from utils.http_pool import build_session, pool_stats
+from utils.asset_cache import AssetCache, file_hash, get_asset_cache
+from utils.metrics import metrics, endpoint
+from utils.media import preprocess_images
+from utils.uploads import (
+    FileRange,
+    UPLOADED,
+    load_journal,
+    new_journal_entry,
+    record_part,
+    mark_uploaded,
+    save_journal,
+    clear_journal,
+    prune_journal,
+)
 import os
 
 
+SYNC_MECHANISM = "com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest"
+MULTIPART_MECHANISM = "com.linkedin.digitalmedia.uploading.MultipartUpload"
+IMAGE_RECIPE = "urn:li:digitalmediaRecipe:feedshare-image"
+VIDEO_RECIPE = "urn:li:digitalmediaRecipe:feedshare-video"
+# Statuses worth retrying a part upload on
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Asset states in which a finished upload can be posted (videos process
+# for a while after their bytes arrive)
+USABLE_ASSET_STATUSES = {"AVAILABLE", "PROCESSING"}
+
+
+# ─── Request payloads (shared with AsyncLinkedInClient) ──────────────────────
+
+def register_upload_payload(author_urn, recipe, mechanism="SYNCHRONOUS_UPLOAD",
+                            file_size=None):
+    """Body of an assets?action=registerUpload request."""
+    request = {
+        "owner": author_urn,
+        "recipes": [recipe],
+        "serviceRelationships": [{
+            "identifier": "urn:li:userGeneratedContent",
+            "relationshipType": "OWNER"
+        }],
+        "supportedUploadMechanism": [mechanism]
+    }
+    if file_size is not None:
+        request["fileSize"] = file_size
+    return {"registerUploadRequest": request}
+
+
+def ugc_post_payload(author_urn, text, category="NONE", media=None):
+    """Body of a public ugcPosts request."""
+    content = {
+        "shareCommentary": {"text": text},
+        "shareMediaCategory": category
+    }
+    if media is not None:
+        content["media"] = media
+    return {
+        "author": author_urn,
+        "lifecycleState": "PUBLISHED",
+        "specificContent": {
+            "com.linkedin.ugc.ShareContent": content
+        },
+        "visibility": {
+            "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
+        }
+    }
+
+
+def video_media_entry(asset_urn, title=None, description=None):
+    return {
+        "status": "READY",
+        "description": {"text": description} if description else {},
+        "media": asset_urn,
+        "title": {"text": title} if title else {}
+    }
+
+
+def complete_multipart_payload(state):
+    """Body of an assets?action=completeMultiPartUpload request."""
+    return {
+        "completeMultipartUploadRequest": {
+            "mediaArtifact": state["mediaArtifact"],
+            "metadata": state["metadata"],
+            "partUploadResponses": [
+                state["done"][str(i)] for i in range(len(state["parts"]))
+            ]
+        }
+    }
+
+
 class LinkedInClient:
     API_BASE = "https://api.linkedin.com/v2"
-    folder_path = os.path.expanduser(FOLDER_PATH)
-    # Ensure the folder path exists
+    # Videos at least this large go through LinkedIn's multipart upload
+    MULTIPART_THRESHOLD = 64 * 1024 * 1024
+    # How many images are registered/uploaded at once by post_image
+    IMAGE_UPLOAD_CONCURRENCY = 4
 
-    def __init__(self):
+    def __init__(self,
+                 pool_connections: int = HTTP_POOL_CONNECTIONS,
+                 pool_maxsize: int = HTTP_POOL_MAXSIZE,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 read_timeout: float = HTTP_READ_TIMEOUT,
+                 asset_cache: AssetCache = None):
+        require(*LINKEDIN_SETTINGS)
         self.headers = {
             "Authorization": f"Bearer {ACCESS_TOKEN}",
             "X-Restli-Protocol-Version": "2.0.0",
         }
+        # One keep-alive pool shared by every call this client makes
+        self.session = build_session(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+        )
+        # Index of media already uploaded, so identical files aren't re-sent
+        self.asset_cache = asset_cache or get_asset_cache()
+        # asset URN -> upload journal key, cleared once the asset is posted
+        self._journaled = {}
+        prune_journal()
 
-    def post_text(self, author_urn, text):
-        """Publish a text-only post. Returns the post URN."""
-        url = f"{self.API_BASE}/ugcPosts"
-        payload = {
-            "author": author_urn,
-            "lifecycleState": "PUBLISHED",
-            "specificContent": {
-                "com.linkedin.ugc.ShareContent": {
-                    "shareCommentary": {"text": text},
-                    "shareMediaCategory": "NONE"
-                }
-            },
-            "visibility": {
-                "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
-            }
-        }
-        resp = requests.post(
+    @property
+    def folder_path(self) -> str:
+        """The media folder (FOLDER_PATH), required only by tools that read from it."""
+        require("FOLDER_PATH")
+        return os.path.expanduser(FOLDER_PATH)
+
+    def set_access_token(self, token: str):
+        """
+        Use token for every later request. The headers dict is replaced, not
+        mutated, so a request in flight sees either the old or the new one.
+        """
+        self.headers = {**self.headers, "Authorization": f"Bearer {token}"}
+
+    def pool_stats(self) -> dict:
+        """Per-host connection pool statistics (see utils.http_pool.pool_stats)."""
+        return pool_stats(self.session)
+
+    def close(self):
+        """Close every pooled connection."""
+        self.session.close()
+
+    def _post_json(self, url, payload):
+        resp = self.session.post(
             url,
             headers={**self.headers, "Content-Type": "application/json"},
             json=payload
         )
         resp.raise_for_status()
+        return resp
+
+    def asset_status(self, asset_urn: str) -> str:
+        """
+        LinkedIn's status for an uploaded asset: "AVAILABLE" once every
+        recipe is, otherwise the first other status ("PROCESSING",
+        "WAITING_UPLOAD", ...). None if the asset doesn't exist.
+        """
+        asset_id = asset_urn.rsplit(":", 1)[-1]
+        resp = self.session.get(f"{self.API_BASE}/assets/{asset_id}", headers=self.headers)
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        statuses = [r.get("status") for r in resp.json().get("recipes", [])]
+        if not statuses:
+            return None
+        return next((s for s in statuses if s != "AVAILABLE"), "AVAILABLE")
+
+    def asset_available(self, asset_urn: str) -> bool:
+        """Check with LinkedIn that an uploaded asset is still usable."""
+        return self.asset_status(asset_urn) == "AVAILABLE"
+
+    def _reuse_asset(self, author_urn, recipe, file_path):
+        """
+        Look file_path up in the asset cache.
+        Returns (key, asset_urn), with asset_urn None on a miss. The key
+        (owner, recipe, content hash) also names the file's upload journal.
+        """
+        key = AssetCache.key(author_urn, recipe, file_hash(file_path))
+        if self.asset_cache is None:
+            return key, None
+        entry = self.asset_cache.get(key)
+        if entry is None:
+            return key, None
+        verified = self.asset_cache.needs_verify(entry)
+        if verified and not self.asset_available(entry["asset"]):
+            self.asset_cache.discard(key)
+            return key, None
+        self.asset_cache.hit(key, verified=verified)
+        return key, entry["asset"]
+
+    def _remember_asset(self, key, asset_urn, file_path):
+        if self.asset_cache is not None:
+            self.asset_cache.put(key, asset_urn, os.path.getsize(file_path))
+
+    def _resume_from_journal(self, key):
+        """
+        The upload journal entry to carry on from, or None to start afresh.
+        A finished upload is only reused while LinkedIn still has the asset.
+        """
+        entry = load_journal(key)
+        if entry is None or entry["status"] != UPLOADED:
+            return entry
+        if self.asset_status(entry["asset"]) in USABLE_ASSET_STATUSES:
+            return entry
+        clear_journal(key)
+        return None
+
+    def _finish_journal(self, entry):
+        mark_uploaded(entry)
+        save_journal(entry)
+        self._journaled[entry["asset"]] = entry["key"]
+
+    def _upload_single(self, key, file_path, register, put):
+        """
+        Upload a file with one PUT, journaled: a file whose asset was
+        already registered is PUT again to the recorded URL instead of
+        registering a new asset, and a finished one isn't sent at all.
+        register() returns the registerUpload value; put(url, path) uploads.
+        Returns the asset URN.
+        """
+        entry = self._resume_from_journal(key)
+        if entry is None:
+            value = register()
+            entry = new_journal_entry(
+                key, file_path, value["asset"],
+                upload_url=value["uploadMechanism"][SYNC_MECHANISM]["uploadUrl"],
+            )
+            save_journal(entry)
+        elif entry["status"] == UPLOADED:
+            self._journaled[entry["asset"]] = key
+            return entry["asset"]
+        try:
+            put(entry["upload_url"], file_path)
+        except requests.HTTPError as e:
+            # an expired or rejected upload URL: register afresh next time
+            if e.response is not None and e.response.status_code not in RETRY_STATUSES:
+                clear_journal(key)
+            raise
+        self._finish_journal(entry)
+        return entry["asset"]
+
+    def publish_post(self, author_urn, text, category="NONE", media=None):
+        """
+        Create the post itself, with media (if any) already uploaded.
+        Returns the post URN.
+        """
+        resp = self._post_json(
+            f"{self.API_BASE}/ugcPosts",
+            ugc_post_payload(author_urn, text, category, media)
+        )
+        # the media is posted: nothing left to resume
+        for item in media or ():
+            key = self._journaled.pop(item["media"], None)
+            if key is not None:
+                clear_journal(key)
         return resp.json().get("id")
 
-    def _register_upload(self, author_urn):
-        """Register an image upload and get upload URL + asset URN."""
-        url = f"{self.API_BASE}/assets?action=registerUpload"
-        payload = {
-            "registerUploadRequest": {
-                "owner": author_urn,
-                "recipes": ["urn:li:digitalmediaRecipe:feedshare-image"],
-                "serviceRelationships": [{
-                    "identifier": "urn:li:userGeneratedContent",
-                    "relationshipType": "OWNER"
-                }],
-                "supportedUploadMechanism": ["SYNCHRONOUS_UPLOAD"]
+    def recent_posts(self, author_urn, count=20, start=0):
+        """The author's posts, most recently modified first (one page)."""
+        resp = self.session.get(
+            f"{self.API_BASE}/ugcPosts?q=authors"
+            f"&authors=List({quote(author_urn, safe='')})"
+            f"&sortBy=LAST_MODIFIED&count={count}&start={start}",
+            headers=self.headers
+        )
+        resp.raise_for_status()
+        return resp.json().get("elements", [])
+
+    def social_actions(self, post_urns):
+        """
+        Like and comment counts of several posts in one batch request.
+        Returns {urn: {"likes", "comments", "first_level_comments"}}; posts
+        LinkedIn reports no data for are left out.
+        """
+        ids = ",".join(quote(urn, safe="") for urn in post_urns)
+        resp = self.session.get(
+            f"{self.API_BASE}/socialActions?ids=List({ids})", headers=self.headers
+        )
+        resp.raise_for_status()
+        return {
+            urn: {
+                "likes": (actions.get("likesSummary") or {}).get("totalLikes"),
+                "comments": (actions.get("commentsSummary") or {}).get("aggregatedTotalComments"),
+                "first_level_comments":
+                    (actions.get("commentsSummary") or {}).get("totalFirstLevelComments"),
             }
+            for urn, actions in resp.json().get("results", {}).items()
         }
-        resp = requests.post(
-            url,
-            headers={**self.headers, "Content-Type": "application/json"},
-            json=payload
+
+    def share_statistics(self, organization_urn, post_urns):
+        """
+        Lifetime statistics of several of an organization's posts in one
+        request. Returns {urn: {"impressions", "unique_impressions",
+        "clicks", "shares", "engagement"}}.
+        """
+        url = (
+            f"{self.API_BASE}/organizationalEntityShareStatistics?q=organizationalEntity"
+            f"&organizationalEntity={quote(organization_urn, safe='')}"
         )
+        for param, kind in (("shares", ":share:"), ("ugcPosts", ":ugcPost:")):
+            urns = [quote(urn, safe="") for urn in post_urns if kind in urn]
+            if urns:
+                url += f"&{param}=List({','.join(urns)})"
+        resp = self.session.get(url, headers=self.headers)
         resp.raise_for_status()
+        result = {}
+        for element in resp.json().get("elements", []):
+            stats = element.get("totalShareStatistics") or {}
+            result[element.get("share") or element.get("ugcPost")] = {
+                "impressions": stats.get("impressionCount"),
+                "unique_impressions": stats.get("uniqueImpressionsCount"),
+                "clicks": stats.get("clickCount"),
+                "shares": stats.get("shareCount"),
+                "engagement": stats.get("engagement"),
+            }
+        return result
+
+    def post_text(self, author_urn, text):
+        """Publish a text-only post. Returns the post URN."""
+        return self.publish_post(author_urn, text)
+
+    def _register_upload(self, author_urn):
+        """Register an image upload and get upload URL + asset URN."""
+        resp = self._post_json(
+            f"{self.API_BASE}/assets?action=registerUpload",
+            register_upload_payload(author_urn, IMAGE_RECIPE)
+        )
         return resp.json()
 
     def _upload_image(self, upload_url, file_path):
         """Upload binary image data to the given upload URL."""
         mime_type, _ = mimetypes.guess_type(file_path)
         with open(file_path, "rb") as f:
-            data = f.read()
-        resp = requests.put(
-            upload_url,
-            data=data,
-            headers={
-                "Authorization": f"Bearer {ACCESS_TOKEN}",
-                "Content-Type": mime_type or "application/octet-stream"
-            }
-        )
+            resp = self.session.put(
+                upload_url,
+                data=f,
+                headers={
+                    "Authorization": self.headers["Authorization"],
+                    "Content-Type": mime_type or "application/octet-stream"
+                }
+            )
         resp.raise_for_status()
 
-    def post_image(self, author_urn, text, image_paths):
-        """Publish a post with one or more images. Returns the post URN."""
-        media_entries = []
-        # 1) Register & upload each image
-        for path in image_paths:
-            reg = self._register_upload(author_urn)
-            path = os.path.join(self.folder_path, path)
+    def _register_and_upload_image(self, author_urn, path):
+        """
+        Register one image and upload it as soon as its URL is known, unless
+        the same bytes were already uploaded.
+        """
+        key, asset_urn = self._reuse_asset(author_urn, IMAGE_RECIPE, path)
+        if asset_urn:
+            return asset_urn
+        asset_urn = self._upload_single(
+            key, path,
+            lambda: self._register_upload(author_urn)["value"],
+            self._upload_image,
+        )
+        self._remember_asset(key, asset_urn, path)
+        return asset_urn
+
+    def upload_images(self, author_urn, image_paths, max_workers=None):
+        """
+        Register and upload several images concurrently, each one going from
+        register to upload without waiting on the others.
+        Returns the asset URNs in the same order as image_paths.
+        """
+        paths = self._resolve_images(image_paths)
+
+        workers = min(max_workers or self.IMAGE_UPLOAD_CONCURRENCY, len(paths)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # map() yields results in submission order
+            return list(pool.map(
+                lambda path: self._register_and_upload_image(author_urn, path),
+                paths
+            ))
+
+    def _resolve_images(self, image_paths):
+        paths = [os.path.join(self.folder_path, p) for p in image_paths]
+        for path in paths:
             if not os.path.isfile(path):
                 raise ValueError(f"Image file does not exist: {path}")
-            upload_url = reg["value"]["uploadMechanism"][
-                "com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest"
-            ]["uploadUrl"]
-            asset_urn = reg["value"]["asset"]
-            self._upload_image(upload_url, path)
-            media_entries.append({"status": "READY", "media": asset_urn})
+        return paths
+
+    def preprocess_images(self, image_paths):
+        """
+        Downscale, re-encode and strip metadata from images on a process pool
+        (see utils.media.preprocess_image). Returns one report per image, in
+        order, whose "path" is the file to upload.
+        """
+        return preprocess_images(self._resolve_images(image_paths))
+
+    def post_image(self, author_urn, text, image_paths, max_workers=None,
+                   preprocess=False):
+        """
+        Publish a post with one or more images. Returns the post URN.
+        With preprocess=True the images are shrunk for LinkedIn first.
+        """
+        if preprocess:
+            image_paths = [r["path"] for r in self.preprocess_images(image_paths)]
+
+        # 1) Register & upload the images concurrently, keeping their order
+        media_entries = [
+            {"status": "READY", "media": asset_urn}
+            for asset_urn in self.upload_images(author_urn, image_paths, max_workers)
+        ]
 
         # 2) Create the UGC post with media
-        url = f"{self.API_BASE}/ugcPosts"
-        payload = {
-            "author": author_urn,
-            "lifecycleState": "PUBLISHED",
-            "specificContent": {
-                "com.linkedin.ugc.ShareContent": {
-                    "shareCommentary": {"text": text},
-                    "shareMediaCategory": "IMAGE",
-                    "media": media_entries
-                }
-            },
-            "visibility": {
-                "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
-            }
-        }
-        resp = requests.post(
-            url,
-            headers={**self.headers, "Content-Type": "application/json"},
-            json=payload
-        )
-        resp.raise_for_status()
-        return resp.json().get("id")
-    
+        return self.publish_post(author_urn, text, "IMAGE", media_entries)
+
     def _register_video_upload(self, author_urn: str):
         """
         Tells LinkedIn you’re about to upload a video
         and returns an upload URL + asset URN.
         """
-        url = f"{self.API_BASE}/assets?action=registerUpload"
-        payload = {
-            "registerUploadRequest": {
-                "owner": author_urn,
-                "recipes": ["urn:li:digitalmediaRecipe:feedshare-video"],
-                "serviceRelationships": [{
-                    "identifier": "urn:li:userGeneratedContent",
-                    "relationshipType": "OWNER"
-                }],
-                # small videos can often use synchronous PUT
-                "supportedUploadMechanism": ["SYNCHRONOUS_UPLOAD"]
-            }
-        }
-        resp = requests.post(
-            url,
-            headers={**self.headers, "Content-Type": "application/json"},
-            json=payload
+        # small videos can often use synchronous PUT
+        resp = self._post_json(
+            f"{self.API_BASE}/assets?action=registerUpload",
+            register_upload_payload(author_urn, VIDEO_RECIPE)
         )
-        resp.raise_for_status()
         return resp.json()["value"]
 
     def _upload_video(self, upload_url: str, file_path: str):
@@ -147,72 +439,177 @@ class LinkedInClient:
         Upload the video bytes to the URL LinkedIn gave you.
         """
         mime_type, _ = mimetypes.guess_type(file_path)
-        
+
         if not os.path.isfile(file_path):
             raise ValueError(f"Video file does not exist: {file_path}")
-        # Read the file in binary mode
+        # Stream the file from disk instead of reading it into memory
         with open(file_path, "rb") as f:
-            data = f.read()
-        resp = requests.put(
-            upload_url,
-            data=data,
-            headers={
-                "Authorization": f"Bearer {ACCESS_TOKEN}",
-                "Content-Type": mime_type or "application/octet-stream"
-            }
-        )
+            resp = self.session.put(
+                upload_url,
+                data=f,
+                headers={
+                    "Authorization": self.headers["Authorization"],
+                    "Content-Type": mime_type or "application/octet-stream"
+                }
+            )
         resp.raise_for_status()
 
+    def _register_multipart_video_upload(self, author_urn: str, file_size: int):
+        """
+        Register a video for LinkedIn's multipart upload.
+        Returns the asset URN, media artifact and the per-part upload requests.
+        """
+        resp = self._post_json(
+            f"{self.API_BASE}/assets?action=registerUpload",
+            register_upload_payload(
+                author_urn, VIDEO_RECIPE, "MULTIPART_UPLOAD", file_size
+            )
+        )
+        return resp.json()["value"]
+
+    def _upload_part(self, part: dict, file_path: str, retries: int = 3) -> dict:
+        """
+        Upload one byte range of a multipart upload, retrying on network
+        errors and retryable statuses. Returns its partUploadResponse.
+        """
+        first = part["byteRange"]["firstByte"]
+        last = part["byteRange"]["lastByte"]
+        for attempt in range(retries + 1):
+            try:
+                with FileRange(file_path, first, last) as body:
+                    resp = self.session.put(
+                        part["url"],
+                        data=body,
+                        headers=part.get("headers", {})
+                    )
+                if resp.status_code not in RETRY_STATUSES or attempt == retries:
+                    resp.raise_for_status()
+                    return {
+                        "httpStatusCode": resp.status_code,
+                        "headers": {"ETag": resp.headers.get("ETag")}
+                    }
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    raise
+            if metrics.enabled:
+                metrics.retry("http", endpoint(part["url"]))
+            time.sleep(min(2 ** attempt, 30))
+
+    def _complete_multipart_upload(self, state: dict):
+        """Tell LinkedIn every part is uploaded so it can assemble the video."""
+        self._post_json(
+            f"{self.API_BASE}/assets?action=completeMultiPartUpload",
+            complete_multipart_payload(state)
+        )
+
+    def _upload_video_multipart(self,
+                                author_urn: str,
+                                file_path: str,
+                                max_workers: int = 4,
+                                retries: int = 3,
+                                key: str = None) -> str:
+        """
+        Upload a video with LinkedIn's multipart mechanism.
+
+        Parts are streamed from disk and uploaded max_workers at a time, so
+        memory stays proportional to the part size, not the file size.
+        Progress is journaled after every part; calling this again for the
+        same content resumes with the parts that are still missing.
+        Returns the asset URN.
+        """
+        if not os.path.isfile(file_path):
+            raise ValueError(f"Video file does not exist: {file_path}")
+        key = key or AssetCache.key(author_urn, VIDEO_RECIPE, file_hash(file_path))
+
+        state = self._resume_from_journal(key)
+        if state is None:
+            upload_info = self._register_multipart_video_upload(
+                author_urn, os.path.getsize(file_path)
+            )
+            multipart = upload_info["uploadMechanism"][MULTIPART_MECHANISM]
+            state = new_journal_entry(
+                key, file_path, upload_info["asset"],
+                upload_info=upload_info, multipart=multipart,
+            )
+            save_journal(state)
+        elif state["status"] == UPLOADED:
+            self._journaled[state["asset"]] = key
+            return state["asset"]
+
+        pending = [
+            i for i in range(len(state["parts"])) if str(i) not in state["done"]
+        ]
+        lock = threading.Lock()
+        error = None
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(self._upload_part, state["parts"][i], file_path, retries): i
+                for i in pending
+            }
+            for fut in as_completed(futures):
+                try:
+                    part_response = fut.result()
+                except Exception as e:
+                    # keep recording the parts that do succeed so a retry skips them
+                    error = error or e
+                    continue
+                with lock:
+                    record_part(state, futures[fut], part_response)
+                    save_journal(state)
+        if error is not None:
+            raise error
+
+        self._complete_multipart_upload(state)
+        self._finish_journal(state)
+        return state["asset"]
+
+    def upload_video(self,
+                     author_urn: str,
+                     video_path: str,
+                     multipart: bool = None,
+                     max_workers: int = 4) -> str:
+        """
+        Upload a video (or reuse an identical one already uploaded).
+        multipart forces (True) or disables (False) the chunked, resumable
+        upload; by default it is used for files over MULTIPART_THRESHOLD.
+        Returns the asset URN.
+        """
+        video_path = os.path.join(self.folder_path, video_path)
+        if not os.path.isfile(video_path):
+            raise ValueError(f"Video file does not exist: {video_path}")
+        if multipart is None:
+            multipart = os.path.getsize(video_path) >= self.MULTIPART_THRESHOLD
+
+        key, asset_urn = self._reuse_asset(author_urn, VIDEO_RECIPE, video_path)
+        if asset_urn is None:
+            if multipart:
+                asset_urn = self._upload_video_multipart(
+                    author_urn, video_path, max_workers=max_workers, key=key
+                )
+            else:
+                asset_urn = self._upload_single(
+                    key, video_path,
+                    lambda: self._register_video_upload(author_urn),
+                    self._upload_video,
+                )
+            self._remember_asset(key, asset_urn, video_path)
+        return asset_urn
+
     def post_video(self,
                    author_urn: str,
                    text: str,
                    video_path: str,
                    title: str = None,
-                   description: str = None) -> str:
+                   description: str = None,
+                   multipart: bool = None,
+                   max_workers: int = 4) -> str:
         """
-        Publish a post with a single video.
+        Publish a post with a single video (see upload_video for multipart).
         Returns the post URN.
         """
-        # 1) register & get upload info
-        upload_info = self._register_video_upload(author_urn)
-        upload_url = upload_info["uploadMechanism"][
-            "com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest"
-        ]["uploadUrl"]
-        asset_urn = upload_info["asset"]
-
-        video_path = os.path.join(self.folder_path, video_path)
-
-        # 2) upload the bytes
-        self._upload_video(upload_url, video_path)
-
-        # 3) build the UGC post
-        media_entry = {
-            "status": "READY",
-            "description": {"text": description} if description else {},
-            "media": asset_urn,
-            "title": {"text": title} if title else {}
-        }
-
-        payload = {
-            "author": author_urn,
-            "lifecycleState": "PUBLISHED",
-            "specificContent": {
-                "com.linkedin.ugc.ShareContent": {
-                    "shareCommentary": {"text": text},
-                    "shareMediaCategory": "VIDEO",
-                    "media": [media_entry]
-                }
-            },
-            "visibility": {
-                "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
-            }
-        }
+        # 1) register & upload the bytes, unless this video is already uploaded
+        asset_urn = self.upload_video(author_urn, video_path, multipart, max_workers)
 
-        resp = requests.post(
-            f"{self.API_BASE}/ugcPosts",
-            headers={**self.headers, "Content-Type": "application/json"},
-            json=payload
-        )
-        resp.raise_for_status()
-        return resp.json().get("id")
-    
+        # 2) build the UGC post
+        media_entry = video_media_entry(asset_urn, title, description)
+        return self.publish_post(author_urn, text, "VIDEO", [media_entry])
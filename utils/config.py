@@ -12,7 +12,140 @@ FOLDER_PATH   = os.getenv("FOLDER_PATH")
 OPEN_AI_API_KEY = os.getenv("OPENAI_API_KEY")
 BRAVE_API_KEY = os.getenv("BRAVE_API_KEY")
 
-if not all([CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, ACCESS_TOKEN, AUTHOR_URN]):
-    raise EnvironmentError(
-        "Please set CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, ACCESS_TOKEN, and AUTHOR_URN in .env"
-    )
+
+def _epoch(name):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+# Written by utils/oauth.py; used to refresh ACCESS_TOKEN in the background
+REFRESH_TOKEN            = os.getenv("REFRESH_TOKEN")
+ACCESS_TOKEN_EXPIRES_AT  = _epoch("ACCESS_TOKEN_EXPIRES_AT")
+REFRESH_TOKEN_EXPIRES_AT = _epoch("REFRESH_TOKEN_EXPIRES_AT")
+# Refresh this many seconds before the access token expires
+TOKEN_REFRESH_MARGIN     = float(os.getenv("TOKEN_REFRESH_MARGIN", str(24 * 3600)))
+
+# Where local upload state and caches are kept
+STATE_DIR = os.getenv("STATE_DIR", "~/.linkedin-mcp")
+
+# Reuse of already-uploaded media (ttl / verify interval in seconds)
+ASSET_CACHE_ENABLED         = os.getenv("ASSET_CACHE_ENABLED", "1") == "1"
+ASSET_CACHE_TTL             = float(os.getenv("ASSET_CACHE_TTL", str(30 * 24 * 3600)))
+ASSET_CACHE_MAX_ENTRIES     = int(os.getenv("ASSET_CACHE_MAX_ENTRIES", "1000"))
+ASSET_CACHE_VERIFY_INTERVAL = float(os.getenv("ASSET_CACHE_VERIFY_INTERVAL", "3600"))
+
+# Unfinished / unposted uploads are resumed from the journal for this long (seconds)
+UPLOAD_JOURNAL_TTL = float(os.getenv("UPLOAD_JOURNAL_TTL", str(24 * 3600)))
+
+# Brave search result cache (ttl in seconds)
+SEARCH_CACHE_TTL     = float(os.getenv("SEARCH_CACHE_TTL", "900"))
+SEARCH_CACHE_SIZE    = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+SEARCH_CACHE_PERSIST = os.getenv("SEARCH_CACHE_PERSIST", "0") == "1"
+
+# Archive of every Brave result in data.db for search_archive (full-text,
+# offline); writes are batched by a background thread
+SEARCH_ARCHIVE_ENABLED          = os.getenv("SEARCH_ARCHIVE_ENABLED", "1") == "1"
+SEARCH_ARCHIVE_RETENTION_DAYS   = float(os.getenv("SEARCH_ARCHIVE_RETENTION_DAYS", "90"))
+SEARCH_ARCHIVE_MAX_ROWS         = int(os.getenv("SEARCH_ARCHIVE_MAX_ROWS", "200000"))
+SEARCH_ARCHIVE_BATCH_SIZE       = int(os.getenv("SEARCH_ARCHIVE_BATCH_SIZE", "500"))
+SEARCH_ARCHIVE_FLUSH_INTERVAL   = float(os.getenv("SEARCH_ARCHIVE_FLUSH_INTERVAL", "2"))
+SEARCH_ARCHIVE_COMPACT_INTERVAL = float(os.getenv("SEARCH_ARCHIVE_COMPACT_INTERVAL", str(6 * 3600)))
+
+# Generated image cache: total bytes kept per save directory
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+
+# Optional image preprocessing before upload (needs Pillow)
+IMAGE_MAX_WIDTH          = int(os.getenv("IMAGE_MAX_WIDTH", "1200"))
+IMAGE_MAX_HEIGHT         = int(os.getenv("IMAGE_MAX_HEIGHT", "1350"))
+IMAGE_JPEG_QUALITY       = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_PREPROCESS_WORKERS = int(os.getenv("IMAGE_PREPROCESS_WORKERS", str(os.cpu_count() or 2)))
+
+# Brave API quota (requests per second, burst size)
+BRAVE_RATE_LIMIT = float(os.getenv("BRAVE_RATE_LIMIT", "1"))
+BRAVE_RATE_BURST = float(os.getenv("BRAVE_RATE_BURST", "1"))
+
+# SQLite engine behind execute_db_query
+DB_READERS         = int(os.getenv("DB_READERS", "4"))
+DB_MMAP_SIZE       = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE      = int(os.getenv("DB_CACHE_SIZE", "-65536"))  # negative = KiB
+DB_SYNCHRONOUS     = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+DB_BUSY_TIMEOUT    = int(os.getenv("DB_BUSY_TIMEOUT", "5000"))  # ms
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+
+# SELECT cursors kept open between pages of execute_db_query, each holding a
+# reader connection, and seconds an unused one is kept (0 open = re-run the
+# query for every page)
+DB_OPEN_CURSORS = int(os.getenv("DB_OPEN_CURSORS", "4"))
+DB_CURSOR_TTL   = float(os.getenv("DB_CURSOR_TTL", "120"))
+
+# execute_db_query guard rail and slow-query log: statements running longer
+# than DB_STATEMENT_TIMEOUT seconds are stopped (0 = no limit); those taking
+# DB_SLOW_QUERY_MS or more are logged with their plan (0 = log nothing)
+DB_STATEMENT_TIMEOUT  = float(os.getenv("DB_STATEMENT_TIMEOUT", "30"))
+DB_SLOW_QUERY_MS      = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_SLOW_QUERY_LOG_MAX = int(os.getenv("DB_SLOW_QUERY_LOG_MAX", "10000"))
+
+# Read-query result cache (ttl in seconds)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "128"))
+QUERY_CACHE_TTL  = float(os.getenv("QUERY_CACHE_TTL", "300"))
+
+# Publish queue: post rate (per second, burst), retries and backoff (seconds)
+PUBLISH_RATE_LIMIT    = float(os.getenv("PUBLISH_RATE_LIMIT", "0.1"))
+PUBLISH_RATE_BURST    = float(os.getenv("PUBLISH_RATE_BURST", "3"))
+PUBLISH_MAX_ATTEMPTS  = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "8"))
+PUBLISH_BACKOFF_BASE  = float(os.getenv("PUBLISH_BACKOFF_BASE", "5"))
+PUBLISH_BACKOFF_MAX   = float(os.getenv("PUBLISH_BACKOFF_MAX", "3600"))
+PUBLISH_WORKERS       = int(os.getenv("PUBLISH_WORKERS", "1"))
+PUBLISH_POLL_INTERVAL = float(os.getenv("PUBLISH_POLL_INTERVAL", "30"))
+# Seconds within which the same unscheduled post, queued without an
+# idempotency key, counts as a resubmission rather than a new post
+PUBLISH_DEDUPE_WINDOW = float(os.getenv("PUBLISH_DEDUPE_WINDOW", "600"))
+
+# create_posts_batch: posts sent per second (with bursts) and at once
+BATCH_POST_RATE_LIMIT  = float(os.getenv("BATCH_POST_RATE_LIMIT", "1"))
+BATCH_POST_RATE_BURST  = int(os.getenv("BATCH_POST_RATE_BURST", "5"))
+BATCH_POST_CONCURRENCY = int(os.getenv("BATCH_POST_CONCURRENCY", "4"))
+
+# Engagement sync: posts and their stats pulled into data.db every interval
+# seconds (0, the default = only when sync_engagement is called; needs the
+# r_member_social or r_organization_social scope). Stats are refreshed for
+# posts from the last active_days on every run, for all posts every
+# full_interval seconds; requests carry batch_size posts each.
+ENGAGEMENT_SYNC_INTERVAL      = float(os.getenv("ENGAGEMENT_SYNC_INTERVAL", "0"))
+ENGAGEMENT_SYNC_ACTIVE_DAYS   = float(os.getenv("ENGAGEMENT_SYNC_ACTIVE_DAYS", "30"))
+ENGAGEMENT_SYNC_FULL_INTERVAL = float(os.getenv("ENGAGEMENT_SYNC_FULL_INTERVAL", "86400"))
+ENGAGEMENT_SYNC_BATCH_SIZE    = int(os.getenv("ENGAGEMENT_SYNC_BATCH_SIZE", "50"))
+ENGAGEMENT_SYNC_CONCURRENCY   = int(os.getenv("ENGAGEMENT_SYNC_CONCURRENCY", "4"))
+ENGAGEMENT_SYNC_RATE_LIMIT    = float(os.getenv("ENGAGEMENT_SYNC_RATE_LIMIT", "10"))
+ENGAGEMENT_SYNC_RATE_BURST    = float(os.getenv("ENGAGEMENT_SYNC_RATE_BURST", "10"))
+
+# Latency/throughput metrics (server_stats); optional periodic export to a
+# file in "json" or "prometheus" text format
+METRICS_ENABLED         = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_EXPORT_PATH     = os.getenv("METRICS_EXPORT_PATH")
+METRICS_EXPORT_FORMAT   = os.getenv("METRICS_EXPORT_FORMAT", "json")
+METRICS_EXPORT_INTERVAL = float(os.getenv("METRICS_EXPORT_INTERVAL", "15"))
+
+# HTTP connection pool tuning
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE     = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+HTTP_CONNECT_TIMEOUT  = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT     = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+
+# Delay before the publish worker, token refresh and metrics export start,
+# so they don't compete with the MCP handshake (seconds)
+BACKGROUND_START_DELAY = float(os.getenv("BACKGROUND_START_DELAY", "2"))
+
+# Settings a LinkedIn client can't work without
+LINKEDIN_SETTINGS = ("CLIENT_ID", "CLIENT_SECRET", "REDIRECT_URI", "ACCESS_TOKEN", "AUTHOR_URN")
+
+
+def require(*names):
+    """
+    Raise EnvironmentError unless every named setting is set. Checked when a
+    feature is first used rather than at import, so the server can start
+    (and serve other tools) with an incomplete .env.
+    """
+    missing = [name for name in names if not globals().get(name)]
+    if missing:
+        raise EnvironmentError(f"Please set {', '.join(missing)} in .env")
@@ -0,0 +1,405 @@
+import base64
+import itertools
+import json
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from utils.config import (
+    DB_READERS,
+    DB_MMAP_SIZE,
+    DB_CACHE_SIZE,
+    DB_SYNCHRONOUS,
+    DB_BUSY_TIMEOUT,
+    DB_STATEMENT_CACHE,
+    DB_OPEN_CURSORS,
+    DB_CURSOR_TTL,
+)
+
+
+class Database:
+    """
+    Connection pool for one SQLite file in WAL mode: a single writer
+    connection guarded by a lock, plus up to `readers` read-only connections
+    handed out from a queue. WAL lets the readers keep working while the
+    writer commits.
+
+    Connections are opened with check_same_thread=False but are only ever
+    used by one thread at a time, and each keeps its own prepared-statement
+    cache of `statement_cache` entries.
+    """
+
+    def __init__(self,
+                 path: str,
+                 readers: int = DB_READERS,
+                 mmap_size: int = DB_MMAP_SIZE,
+                 cache_size: int = DB_CACHE_SIZE,
+                 synchronous: str = DB_SYNCHRONOUS,
+                 busy_timeout: int = DB_BUSY_TIMEOUT,
+                 statement_cache: int = DB_STATEMENT_CACHE):
+        self.path = path
+        self.readers = readers
+        self.pragmas = {
+            "mmap_size": mmap_size,
+            "cache_size": cache_size,
+            "synchronous": synchronous,
+            "busy_timeout": busy_timeout,
+            "temp_store": "MEMORY",
+        }
+        self.statement_cache = statement_cache
+
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._idle_readers = queue.LifoQueue()
+        self._opened_readers = 0
+        self._open_lock = threading.Lock()
+        self._detached = set()
+        self._closed = False
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=self.statement_cache,
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        if readonly:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _get_writer(self) -> sqlite3.Connection:
+        if self._writer is None:
+            self._writer = self._connect(readonly=False)
+            # persistent for the file; only needs setting once
+            self._writer.execute("PRAGMA journal_mode = WAL")
+        return self._writer
+
+    @contextmanager
+    def writer(self):
+        """
+        Exclusive use of the writer connection. Commits on success and
+        rolls back if the block raises.
+        """
+        with self._write_lock:
+            if self._closed:
+                raise RuntimeError("Database is closed")
+            conn = self._get_writer()
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    @contextmanager
+    def reader(self):
+        """A read-only connection from the pool, returned when the block exits."""
+        # make sure the file is in WAL mode before any reader opens it
+        if self._writer is None:
+            with self._write_lock:
+                self._get_writer()
+
+        conn = None
+        try:
+            conn = self._idle_readers.get_nowait()
+        except queue.Empty:
+            with self._open_lock:
+                if self._opened_readers < self.readers:
+                    self._opened_readers += 1
+                    conn = self._connect(readonly=True)
+            if conn is None:
+                conn = self._idle_readers.get()
+        try:
+            yield conn
+        finally:
+            if id(conn) in self._detached:
+                # handed over by detach(); its new owner closes it
+                self._detached.discard(id(conn))
+            else:
+                # end any implicit read transaction before parking the connection
+                if conn.in_transaction:
+                    conn.rollback()
+                if self._closed:
+                    conn.close()
+                else:
+                    self._idle_readers.put(conn)
+
+    def detach(self, conn: sqlite3.Connection):
+        """
+        Take a connection handed out by reader() out of the pool: the block's
+        exit leaves it (and any open read transaction) alone, and the caller
+        closes it when done. The pool opens another reader in its place.
+        """
+        with self._open_lock:
+            self._detached.add(id(conn))
+            self._opened_readers -= 1
+
+    def stats(self) -> dict:
+        return {
+            "readers_open": self._opened_readers,
+            "readers_idle": self._idle_readers.qsize(),
+            "writer_busy": self._write_lock.locked(),
+        }
+
+    def close(self):
+        """Close the writer and every idle reader."""
+        self._closed = True
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._idle_readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# ─── Paginated & streamed results ─────────────────────────────────────────────
+
+def encode_page_token(query: str, offset: int, page_size: int, cursor_id: str = None) -> str:
+    """
+    Opaque continuation token for the page of query starting at offset,
+    naming the open cursor positioned there, if any.
+    """
+    data = {"q": query, "o": offset, "n": page_size}
+    if cursor_id:
+        data["c"] = cursor_id
+    raw = json.dumps(data).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_page_token(token: str):
+    """Inverse of encode_page_token. Returns (query, offset, page_size, cursor_id)."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return data["q"], int(data["o"]), int(data["n"]), data.get("c")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError("Invalid continuation token")
+
+
+class OpenCursor:
+    """A SELECT part-way through its rows, on the connection it runs on."""
+
+    __slots__ = ("conn", "cursor", "columns", "query", "offset", "lookahead",
+                 "detached", "last_used", "generation")
+
+    def __init__(self, conn, cursor, columns, query, generation=None):
+        self.conn = conn
+        self.cursor = cursor
+        self.columns = columns
+        self.query = query
+        # caller's tag for the data version the cursor's snapshot was taken
+        # at (the server uses its query cache generation)
+        self.generation = generation
+        self.offset = 0          # rows of the result already returned
+        self.lookahead = None    # the row read past the last page
+        self.detached = False
+        self.last_used = time.monotonic()
+
+
+class OpenCursors:
+    """
+    SELECT cursors kept open between pages, so the next page of a result is
+    read where the last one stopped instead of running the query again and
+    stepping over every row already sent (what LIMIT/OFFSET paging costs).
+
+    Each keeps the reader connection it ran on, taken out of db's pool, and
+    with it that connection's read snapshot, so later pages are consistent
+    with the first but the WAL can't be checkpointed past it. That is why at
+    most max_open are kept, each for ttl seconds after its last page; the
+    least recently used is closed first.
+    """
+
+    def __init__(self, db: Database, max_open: int = DB_OPEN_CURSORS,
+                 ttl: float = DB_CURSOR_TTL):
+        self.db = db
+        self.max_open = max_open
+        self.ttl = ttl
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+        self.continued = 0
+        self.restarted = 0
+
+    def take(self, cursor_id: str, query: str, offset: int):
+        """
+        Remove and return the open cursor cursor_id if it is positioned at
+        offset of query, else None (the query is then run again).
+        """
+        with self._lock:
+            self._reap()
+            entry = self._open.get(cursor_id) if cursor_id else None
+            if entry is None or entry.query != query or entry.offset != offset:
+                self.restarted += bool(offset)
+                return None
+            del self._open[cursor_id]
+            self.continued += 1
+            return entry
+
+    def keep(self, entry: OpenCursor):
+        """Hold entry for its next page. Returns its id, or None if cursors are off."""
+        if self.max_open < 1:
+            return None
+        if not entry.detached:
+            self.db.detach(entry.conn)
+            entry.detached = True
+        entry.last_used = time.monotonic()
+        cursor_id = secrets.token_urlsafe(9)
+        with self._lock:
+            self._open[cursor_id] = entry
+            while len(self._open) > self.max_open:
+                self._close(self._open.popitem(last=False)[1])
+        return cursor_id
+
+    def release(self, entry: OpenCursor = None):
+        """
+        Done with a taken entry: close it unless fetch_page kept it again
+        (None, and entries that were never kept, are ignored).
+        """
+        if entry is None:
+            return
+        with self._lock:
+            if any(kept is entry for kept in self._open.values()):
+                return
+        self._close(entry)
+
+    def close(self):
+        """Close every open cursor."""
+        with self._lock:
+            while self._open:
+                self._close(self._open.popitem(last=False)[1])
+
+    def _reap(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._open:
+            cursor_id, entry = next(iter(self._open.items()))
+            if entry.last_used > cutoff:
+                break
+            del self._open[cursor_id]
+            self._close(entry)
+
+    @staticmethod
+    def _close(entry: OpenCursor):
+        if entry.detached:
+            entry.conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._reap()
+            return {"open": len(self._open), "continued": self.continued,
+                    "restarted": self.restarted}
+
+
+def fetch_page(conn: sqlite3.Connection, query: str, offset: int, page_size: int,
+               cursors: OpenCursors = None, entry: OpenCursor = None,
+               generation=None) -> dict:
+    """
+    Run a read query and return one page of it in columnar form:
+    {"columns": [...], "rows": [[...], ...], "next_token": str or None}.
+
+    The query runs exactly as written, so its column names come back as-is
+    (duplicates included). One row past the page is read to know whether
+    another page exists. Given cursors, the cursor of a page that isn't the
+    last is kept open there and named in next_token; pass the entry taken
+    back from cursors (conn being entry.conn) to carry on from it, and
+    release it afterwards. Without one the query is run again and its first
+    offset rows read and dropped, which costs as much as returning them.
+    A new cursor is tagged with generation (see OpenCursor).
+    """
+    if entry is None:
+        cur = conn.execute(query)
+        entry = OpenCursor(conn, cur, [d[0] for d in cur.description or ()], query,
+                           generation)
+        while entry.offset < offset:
+            skipped = len(cur.fetchmany(min(offset - entry.offset, 1000)))
+            if not skipped:
+                break
+            entry.offset += skipped
+    rows = [] if entry.lookahead is None else [entry.lookahead]
+    if entry.cursor.description:
+        rows += entry.cursor.fetchmany(page_size + 1 - len(rows))
+    rows = [tuple(r) for r in rows]
+
+    next_token = None
+    if len(rows) > page_size:
+        entry.lookahead = rows[page_size]
+        rows = rows[:page_size]
+        entry.offset = offset + page_size
+        cursor_id = cursors.keep(entry) if cursors is not None else None
+        next_token = encode_page_token(query, offset + page_size, page_size, cursor_id)
+    return {"columns": entry.columns, "rows": rows, "next_token": next_token}
+
+
+def write_columnar_json(cur: sqlite3.Cursor, f, batch_size: int = 1000) -> int:
+    """
+    Serialise a cursor's result to f as {"columns": [...], "rows": [...]},
+    fetching and writing batch_size rows at a time so memory stays flat.
+    Returns the number of rows written.
+    """
+    columns = [d[0] for d in cur.description]
+    f.write('{"columns": ' + json.dumps(columns) + ', "rows": [')
+    count = 0
+    while True:
+        batch = cur.fetchmany(batch_size)
+        if not batch:
+            break
+        f.write(("," if count else "") + ",".join(json.dumps(tuple(r)) for r in batch))
+        count += len(batch)
+    f.write("]}")
+    return count
+
+
+def execute_batch(conn: sqlite3.Connection, statement: str, params, chunk_size: int = 1000) -> int:
+    """
+    Run one parameterised statement for every parameter set in params (an
+    iterable of sequences or mappings) with executemany, chunk_size sets at
+    a time. The caller owns the transaction. Returns the rows affected.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    params = iter(params)
+    affected = 0
+    while True:
+        chunk = list(itertools.islice(params, chunk_size))
+        if not chunk:
+            break
+        cur = conn.executemany(statement, chunk)
+        affected += max(cur.rowcount, 0)
+    return affected
+
+
+# ─── Statement limits ─────────────────────────────────────────────────────────
+
+@contextmanager
+def statement_limit(conn: sqlite3.Connection, timeout: float, check_every: int = 1000):
+    """
+    Stop any statement run on conn inside the block once timeout seconds
+    have passed (0: no limit), raising TimeoutError. SQLite calls the
+    progress handler every check_every VM instructions, so the check costs
+    nothing measurable; the yielded dict's "vm_steps" counts instructions
+    executed, to within check_every.
+    """
+    counter = {"vm_steps": 0}
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def progress():
+        counter["vm_steps"] += check_every
+        # a non-zero return makes SQLite abort with "interrupted"
+        return deadline is not None and time.monotonic() > deadline
+
+    conn.set_progress_handler(progress, check_every)
+    try:
+        yield counter
+    except sqlite3.OperationalError as e:
+        if deadline is not None and time.monotonic() > deadline and "interrupt" in str(e):
+            raise TimeoutError(
+                f"Statement stopped after {timeout:g} s (DB_STATEMENT_TIMEOUT)"
+            ) from e
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
@@ -0,0 +1,410 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import requests
+from utils.client import LinkedInClient, RETRY_STATUSES
+from utils.db import Database
+from utils.publish_queue import retry_after
+from utils.ratelimit import TokenBucket
+from utils.config import (
+    ENGAGEMENT_SYNC_INTERVAL,
+    ENGAGEMENT_SYNC_ACTIVE_DAYS,
+    ENGAGEMENT_SYNC_FULL_INTERVAL,
+    ENGAGEMENT_SYNC_BATCH_SIZE,
+    ENGAGEMENT_SYNC_CONCURRENCY,
+    ENGAGEMENT_SYNC_RATE_LIMIT,
+    ENGAGEMENT_SYNC_RATE_BURST,
+)
+
+POSTS_TABLE = "linkedin_posts"
+STATS_TABLE = "linkedin_post_stats"
+HISTORY_TABLE = "linkedin_post_stats_history"
+STATE_TABLE = "linkedin_sync_state"
+TABLES = (POSTS_TABLE, STATS_TABLE, HISTORY_TABLE, STATE_TABLE)
+
+_STAT_COLUMNS = ("likes", "comments", "first_level_comments", "shares",
+                 "impressions", "unique_impressions", "clicks", "engagement")
+_COLUMNS = ", ".join(_STAT_COLUMNS)
+_NEW_VALUES = ", ".join(f"new.{c}" for c in _STAT_COLUMNS)
+
+# Times are epoch seconds. The latest stats of a post live in STATS_TABLE;
+# triggers copy every change into HISTORY_TABLE, so unchanged stats add no
+# rows. STATE_TABLE holds the high-water mark and the last run times.
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {POSTS_TABLE} (
+    urn            TEXT PRIMARY KEY,
+    author         TEXT NOT NULL,
+    state          TEXT,
+    visibility     TEXT,
+    media_category TEXT,
+    text           TEXT,
+    created_at     REAL,
+    published_at   REAL,
+    last_modified  REAL NOT NULL,
+    synced_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {POSTS_TABLE}_published
+    ON {POSTS_TABLE} (coalesce(published_at, created_at));
+CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+    post_urn             TEXT PRIMARY KEY REFERENCES {POSTS_TABLE} (urn),
+    likes                INTEGER,
+    comments             INTEGER,
+    first_level_comments INTEGER,
+    shares               INTEGER,
+    impressions          INTEGER,
+    unique_impressions   INTEGER,
+    clicks               INTEGER,
+    engagement           REAL,
+    changed_at           REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+    id                   INTEGER PRIMARY KEY,
+    post_urn             TEXT NOT NULL,
+    likes                INTEGER,
+    comments             INTEGER,
+    first_level_comments INTEGER,
+    shares               INTEGER,
+    impressions          INTEGER,
+    unique_impressions   INTEGER,
+    clicks               INTEGER,
+    engagement           REAL,
+    recorded_at          REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {HISTORY_TABLE}_post ON {HISTORY_TABLE} (post_urn, recorded_at);
+CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_ai AFTER INSERT ON {STATS_TABLE} BEGIN
+    INSERT INTO {HISTORY_TABLE} (post_urn, {_COLUMNS}, recorded_at)
+    VALUES (new.post_urn, {_NEW_VALUES}, new.changed_at);
+END;
+CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_au AFTER UPDATE ON {STATS_TABLE} BEGIN
+    INSERT INTO {HISTORY_TABLE} (post_urn, {_COLUMNS}, recorded_at)
+    VALUES (new.post_urn, {_NEW_VALUES}, new.changed_at);
+END;
+CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+    name  TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+# Lifecycle states of posts that can still gain engagement
+_LIVE_STATES = ("PUBLISHED", "PUBLISHED_EDITED")
+# Tries per LinkedIn request before a page or batch is given up
+MAX_ATTEMPTS = 4
+# Statuses meaning the token may not read posts or their stats
+_FORBIDDEN_STATUSES = {401, 403}
+
+
+def _iso(ts):
+    if not ts:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+
+
+def _seconds(value):
+    """LinkedIn millisecond timestamp ({"time": ms} or ms) in seconds."""
+    if isinstance(value, dict):
+        value = value.get("time")
+    return value / 1000 if value else None
+
+
+def post_row(element: dict, now: float) -> tuple:
+    """POSTS_TABLE row for one ugcPosts element."""
+    content = element.get("specificContent", {}).get("com.linkedin.ugc.ShareContent", {})
+    visibility = element.get("visibility", {}).get("com.linkedin.ugc.MemberNetworkVisibility")
+    return (
+        element["id"],
+        element.get("author"),
+        element.get("lifecycleState"),
+        visibility,
+        content.get("shareMediaCategory"),
+        content.get("shareCommentary", {}).get("text"),
+        _seconds(element.get("created")),
+        _seconds(element.get("firstPublishedAt")),
+        _seconds(element.get("lastModified")) or 0.0,
+        now,
+    )
+
+
+class EngagementSync:
+    """
+    Keeps the author's posts and their engagement (likes, comments and,
+    for organizations, impressions, clicks, shares) in data.db.
+
+    Each sync() lists the author's posts most recently modified first and
+    stops at the high-water mark left by the previous run, so only new and
+    edited posts are fetched. Stats have no "changed since", so they are
+    re-read in batch requests for posts from the last active_days on every
+    run, and for all posts every full_interval. Requests go through the
+    client's connection pool, concurrency at a time under a rate limit;
+    results are written in one transaction per table, and rows whose values
+    didn't change are left alone.
+    """
+
+    def __init__(self,
+                 db: Database,
+                 client: LinkedInClient,
+                 author_urn: str,
+                 interval: float = ENGAGEMENT_SYNC_INTERVAL,
+                 active_days: float = ENGAGEMENT_SYNC_ACTIVE_DAYS,
+                 full_interval: float = ENGAGEMENT_SYNC_FULL_INTERVAL,
+                 batch_size: int = ENGAGEMENT_SYNC_BATCH_SIZE,
+                 concurrency: int = ENGAGEMENT_SYNC_CONCURRENCY,
+                 rate: float = ENGAGEMENT_SYNC_RATE_LIMIT,
+                 burst: float = ENGAGEMENT_SYNC_RATE_BURST,
+                 page_size: int = 100,
+                 on_change=None):
+        self.db = db
+        self.client = client
+        self.author_urn = author_urn
+        self.interval = interval
+        self.active_days = active_days
+        self.full_interval = full_interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.limiter = TokenBucket(rate, burst)
+        # called after every write, e.g. to invalidate cached reads
+        self.on_change = on_change
+
+        self._schema_ready = False
+        self._sync_lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self._requests = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.last_result = None
+        self.last_error = None
+
+    def _ensure_schema(self):
+        if self._schema_ready:
+            return
+        with self.db.writer() as conn:
+            conn.executescript(SCHEMA)
+        self._schema_ready = True
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def _state(self) -> dict:
+        with self.db.reader() as conn:
+            return dict(conn.execute(f"SELECT name, value FROM {STATE_TABLE}").fetchall())
+
+    # ─── LinkedIn ─────────────────────────────────────────────────────────────
+
+    def _call(self, fn, *args):
+        """fn(*args) under the rate limit, retried on 429/5xx and dropped connections."""
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.limiter.acquire()
+            with self._count_lock:
+                self._requests += 1
+            try:
+                return fn(*args)
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code in _FORBIDDEN_STATUSES:
+                    scope = ("r_organization_social" if ":organization:" in self.author_urn
+                             else "r_member_social")
+                    raise PermissionError(
+                        f"LinkedIn refused the engagement sync ({e.response.status_code}): "
+                        f"the access token needs the {scope} scope. Add it to "
+                        f"LINKEDIN_SCOPES, sign in again with utils/oauth.py, then "
+                        f"call sync_engagement."
+                    ) from e
+                if (e.response is None or e.response.status_code not in RETRY_STATUSES
+                        or attempt == MAX_ATTEMPTS):
+                    raise
+                time.sleep(max(retry_after(e.response), min(2 ** attempt, 30)))
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                time.sleep(min(2 ** attempt, 30))
+
+    def _fetch_posts(self, high_water: float, now: float) -> list:
+        """Rows for the posts modified since high_water, newest first."""
+        rows, start = [], 0
+        while True:
+            page = self._call(self.client.recent_posts, self.author_urn, self.page_size, start)
+            for element in page:
+                row = post_row(element, now)
+                # equal times are re-read: another post may share the mark
+                if row[8] < high_water:
+                    return rows
+                rows.append(row)
+            if len(page) < self.page_size:
+                return rows
+            start += self.page_size
+
+    def _fetch_stats(self, batch: list) -> list:
+        """STATS_TABLE rows (without changed_at) for one batch of post URNs."""
+        stats = {urn: {} for urn in batch}
+        for urn, values in self._call(self.client.social_actions, batch).items():
+            stats.setdefault(urn, {}).update(values)
+        if ":organization:" in self.author_urn:
+            for urn, values in self._call(
+                    self.client.share_statistics, self.author_urn, batch).items():
+                stats.setdefault(urn, {}).update(values)
+        return [
+            (urn, *(values.get(c) for c in _STAT_COLUMNS))
+            for urn, values in stats.items() if urn in batch
+        ]
+
+    # ─── Sync ─────────────────────────────────────────────────────────────────
+
+    def sync(self, full: bool = None) -> dict:
+        """
+        Pull new and edited posts, then current stats. full=True re-reads
+        the stats of every post; by default that happens once per
+        full_interval. Returns a summary of what was fetched and changed.
+        """
+        with self._sync_lock:
+            self._ensure_schema()
+            started = time.time()
+            with self._count_lock:
+                self._requests = 0
+            state = self._state()
+            high_water = state.get("posts_high_water", 0.0)
+            if full is None:
+                full = started - state.get("last_full_sync", 0.0) >= self.full_interval
+
+            posts = self._fetch_posts(high_water, started)
+            with self.db.writer() as conn:
+                # an unedited post seen again is left as is
+                posts_changed = conn.executemany(
+                    f"INSERT INTO {POSTS_TABLE} (urn, author, state, visibility, "
+                    f"media_category, text, created_at, published_at, last_modified, "
+                    f"synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    f"ON CONFLICT (urn) DO UPDATE SET state = excluded.state, "
+                    f"visibility = excluded.visibility, "
+                    f"media_category = excluded.media_category, text = excluded.text, "
+                    f"published_at = excluded.published_at, "
+                    f"last_modified = excluded.last_modified, synced_at = excluded.synced_at "
+                    f"WHERE last_modified IS NOT excluded.last_modified "
+                    f"OR state IS NOT excluded.state",
+                    posts,
+                ).rowcount
+                if posts:
+                    high_water = max(high_water, max(row[8] for row in posts))
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {STATE_TABLE} VALUES ('posts_high_water', ?)",
+                        (high_water,)
+                    )
+
+            edited = [row[0] for row in posts if row[2] in _LIVE_STATES]
+            targets = self._stats_targets(full, edited, started)
+            batches = [targets[i:i + self.batch_size]
+                       for i in range(0, len(targets), self.batch_size)]
+            rows, errors = [], []
+            with ThreadPoolExecutor(max(1, self.concurrency)) as pool:
+                futures = [pool.submit(self._fetch_stats, batch) for batch in batches]
+                for future in futures:
+                    try:
+                        rows.extend(future.result())
+                    except PermissionError:
+                        # no batch can succeed without the scope
+                        raise
+                    except Exception as e:
+                        # the batch is retried on the next run
+                        errors.append(str(e))
+
+            now = time.time()
+            changed = " OR ".join(f"{c} IS NOT excluded.{c}" for c in _STAT_COLUMNS)
+            with self.db.writer() as conn:
+                stats_changed = conn.executemany(
+                    f"INSERT INTO {STATS_TABLE} (post_urn, {_COLUMNS}, "
+                    f"changed_at) VALUES ({', '.join('?' * (len(_STAT_COLUMNS) + 2))}) "
+                    f"ON CONFLICT (post_urn) DO UPDATE SET "
+                    f"{', '.join(f'{c} = excluded.{c}' for c in _STAT_COLUMNS)}, "
+                    f"changed_at = excluded.changed_at WHERE {changed}",
+                    [(*row, now) for row in rows],
+                ).rowcount
+                conn.execute(f"INSERT OR REPLACE INTO {STATE_TABLE} VALUES ('last_sync', ?)",
+                             (started,))
+                if full and not errors:
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {STATE_TABLE} VALUES ('last_full_sync', ?)",
+                        (started,)
+                    )
+            self._changed()
+
+            result = {
+                "full": full,
+                "posts_fetched": len(posts),
+                "posts_changed": max(posts_changed, 0),
+                "stats_checked": len(rows),
+                "stats_changed": max(stats_changed, 0),
+                "requests": self._requests,
+                "errors": errors[:5],
+                "failed_batches": len(errors),
+                "high_water": _iso(high_water),
+                "seconds": round(time.time() - started, 3),
+            }
+            self.runs += 1
+            self.last_result = result
+            return result
+
+    def _stats_targets(self, full: bool, fetched: list, now: float) -> list:
+        """URNs of the posts whose stats this run re-reads."""
+        live = ", ".join(f"'{s}'" for s in _LIVE_STATES)
+        with self.db.reader() as conn:
+            if full:
+                urns = [r[0] for r in conn.execute(
+                    f"SELECT urn FROM {POSTS_TABLE} WHERE state IN ({live})"
+                )]
+            else:
+                urns = [r[0] for r in conn.execute(
+                    f"SELECT urn FROM {POSTS_TABLE} WHERE state IN ({live}) "
+                    f"AND coalesce(published_at, created_at) >= ?",
+                    (now - self.active_days * 86400,)
+                )]
+        return list(dict.fromkeys(urns + fetched))
+
+    # ─── Background sync ──────────────────────────────────────────────────────
+
+    def start(self):
+        """Start the sync thread (a daemon); a no-op if already running or disabled."""
+        if self._thread is not None or not self.interval:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="engagement-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+                self.last_error = None
+            except PermissionError as e:
+                # retrying can't help until the user signs in with the scope
+                self.last_error = f"{e} Background sync stopped."
+                self._thread = None
+                return
+            except Exception as e:
+                # e.g. LinkedIn is down; the high-water mark hasn't moved
+                self.last_error = str(e)
+            self._stop.wait(self.interval)
+
+    def stats(self) -> dict:
+        self._ensure_schema()
+        with self.db.reader() as conn:
+            posts, with_stats = conn.execute(
+                f"SELECT (SELECT count(*) FROM {POSTS_TABLE}), "
+                f"(SELECT count(*) FROM {STATS_TABLE})"
+            ).fetchone()
+        state = self._state()
+        return {
+            "posts": posts,
+            "posts_with_stats": with_stats,
+            "high_water": _iso(state.get("posts_high_water")),
+            "last_sync": _iso(state.get("last_sync")),
+            "last_full_sync": _iso(state.get("last_full_sync")),
+            "runs": self.runs,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
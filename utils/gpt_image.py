@@ -1,27 +1,80 @@
-from openai import OpenAI
+import asyncio
 import os
 import base64
+import time
+import uuid
 from pathlib import Path
+from typing import List, Dict
 from utils.config import OPEN_AI_API_KEY
+from utils.image_cache import ImageCache, get_image_cache
+from utils.lazy import Lazy
+from utils.metrics import metrics
 # ─── Configuration ────────────────────────────────────────────────────────────
 
-# Initialize the OpenAI client (reads OPENAI_API_KEY from env)
-client = OpenAI(api_key=OPEN_AI_API_KEY)
+
+def _make_client(is_async: bool = False):
+    """
+    Build the OpenAI client (reads OPENAI_API_KEY from env); with metrics on,
+    its responses are recorded through event hooks. openai takes about half
+    a second to import, so nothing here runs until an image is requested.
+    """
+    from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+    cls = AsyncOpenAI if is_async else OpenAI
+    if not metrics.enabled:
+        return cls(api_key=OPEN_AI_API_KEY)
+    from utils.http_pool import metrics_event_hooks
+    http_client = DefaultAsyncHttpxClient if is_async else DefaultHttpxClient
+    return cls(
+        api_key=OPEN_AI_API_KEY,
+        http_client=http_client(event_hooks=metrics_event_hooks(is_async=is_async)),
+    )
+
+
+# Shared clients, created on first use
+get_client = Lazy(_make_client)
+get_async_client = Lazy(lambda: _make_client(is_async=True))
+
+
+# Base64 characters decoded per write; a multiple of 4 so chunks decode alone
+DECODE_CHUNK = 256 * 1024
+
+
+def _save_image(image_base64: str, out_path: Path) -> str:
+    """
+    Decode a Base64 image into a new, uniquely named file under out_path.
+    The payload is decoded and written a chunk at a time, so the full
+    decoded image is never held in memory next to the Base64 string.
+    """
+    # Unique even for images generated in the same second
+    filename = f"gpt_image_{int(time.time())}_{uuid.uuid4().hex[:8]}.png"
+    file_path = out_path / filename
+
+    # Write the image file
+    with open(file_path, "xb") as f:
+        for start in range(0, len(image_base64), DECODE_CHUNK):
+            f.write(base64.b64decode(image_base64[start:start + DECODE_CHUNK]))
+
+    return str(file_path)
+
 
 def generate_and_save_image(
     prompt: str,
     save_dir: str = "~/Desktop/Experiment/MCP",
     model: str = "gpt-image-1",
     quality: str = "medium",
-    size: str = "1536x1024"
+    size: str = "1536x1024",
+    force_regenerate: bool = False
 ) -> str:
     """
     Generates an image using the GPT Image 1 API and saves it locally.
+    An image already generated for the same prompt, model, quality and size
+    is returned from the save directory's cache instead.
 
     Args:
         prompt: The text prompt to generate the image.
         save_dir: Directory where the image will be stored.
         model: The image generation model identifier.
+        force_regenerate: Skip the cache and always call the API.
 
     Returns:
         The path to the saved image file.
@@ -30,8 +83,15 @@ def generate_and_save_image(
     out_path = Path(save_dir).expanduser()
     out_path.mkdir(parents=True, exist_ok=True)
 
+    cache = get_image_cache(save_dir)
+    key = ImageCache.key(prompt, model, quality, size)
+    if not force_regenerate:
+        cached_path = cache.get(key)
+        if cached_path:
+            return cached_path
+
     # Call the image generation endpoint
-    result = client.images.generate(
+    result = get_client().images.generate(
         model=model,
         prompt=prompt,
         n=1,
@@ -39,19 +99,86 @@ def generate_and_save_image(
         size=size
     )
 
-    # Extract Base64-encoded image data
-    image_base64 = result.data[0].b64_json
-    image_bytes = base64.b64decode(image_base64)
+    # Extract Base64-encoded image data and write it out
+    file_path = _save_image(result.data[0].b64_json, out_path)
+    cache.put(key, file_path)
+    return file_path
 
-    # Build a unique filename
-    filename = f"gpt_image_{int(Path().stat().st_mtime)}.png"
-    file_path = out_path / filename
 
-    # Write the image file
-    with open(file_path, "wb") as f:
-        f.write(image_bytes)
+async def async_generate_and_save_image(
+    prompt: str,
+    save_dir: str = "~/Desktop/Experiment/MCP",
+    model: str = "gpt-image-1",
+    quality: str = "medium",
+    size: str = "1536x1024",
+    force_regenerate: bool = False
+) -> str:
+    """
+    asyncio version of generate_and_save_image (same cache); the file is
+    written off the event loop.
+    """
+    out_path = Path(save_dir).expanduser()
+    out_path.mkdir(parents=True, exist_ok=True)
 
-    return str(file_path)
+    cache = get_image_cache(save_dir)
+    key = ImageCache.key(prompt, model, quality, size)
+    if not force_regenerate:
+        cached_path = await asyncio.to_thread(cache.get, key)
+        if cached_path:
+            return cached_path
+
+    result = await get_async_client().images.generate(
+        model=model,
+        prompt=prompt,
+        n=1,
+        quality=quality,
+        size=size
+    )
+
+    file_path = await asyncio.to_thread(_save_image, result.data[0].b64_json, out_path)
+    await asyncio.to_thread(cache.put, key, file_path)
+    return file_path
+
+
+async def async_generate_images(
+    prompts: List[str],
+    n: int = 1,
+    save_dir: str = "~/Desktop/Experiment/MCP",
+    model: str = "gpt-image-1",
+    quality: str = "medium",
+    size: str = "1536x1024",
+    concurrency: int = 4
+) -> List[Dict]:
+    """
+    Generate n variants of each prompt, running at most `concurrency`
+    generation requests at once. A failing prompt is reported, not raised.
+
+    Returns one {"prompt", "paths"} or {"prompt", "error"} per prompt, in order.
+    """
+    out_path = Path(save_dir).expanduser()
+    out_path.mkdir(parents=True, exist_ok=True)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def generate(prompt: str) -> Dict:
+        try:
+            async with limit:
+                result = await get_async_client().images.generate(
+                    model=model,
+                    prompt=prompt,
+                    n=n,
+                    quality=quality,
+                    size=size
+                )
+            paths = []
+            for image in result.data:
+                paths.append(await asyncio.to_thread(_save_image, image.b64_json, out_path))
+                # let the decoded payload go as soon as it is on disk
+                image.b64_json = None
+            return {"prompt": prompt, "paths": paths}
+        except Exception as e:
+            return {"prompt": prompt, "error": str(e)}
+
+    return list(await asyncio.gather(*(generate(p) for p in prompts)))
 
 
 if __name__ == "__main__":
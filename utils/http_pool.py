@@ -0,0 +1,238 @@
+import importlib.util
+import time
+from collections import defaultdict
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from utils.config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+)
+from utils.metrics import metrics, endpoint
+
+
+def _length(headers) -> int:
+    return int(headers.get("Content-Length") or 0)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that applies a default (connect, read) timeout to every
+    request that doesn't pass its own, and records each request in metrics
+    (time to response headers, declared body sizes, status or exception).
+    """
+
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        if not metrics.enabled:
+            return super().send(request, **kwargs)
+        started = time.perf_counter()
+        try:
+            resp = super().send(request, **kwargs)
+        except Exception as e:
+            metrics.observe("http", endpoint(request.url), time.perf_counter() - started,
+                            type(e).__name__, _length(request.headers))
+            raise
+        metrics.observe("http", endpoint(request.url), time.perf_counter() - started,
+                        resp.status_code, _length(request.headers), _length(resp.headers))
+        return resp
+
+
+def build_session(
+    pool_connections: int = HTTP_POOL_CONNECTIONS,
+    pool_maxsize: int = HTTP_POOL_MAXSIZE,
+    connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+    read_timeout: float = HTTP_READ_TIMEOUT,
+) -> requests.Session:
+    """
+    Build a keep-alive requests.Session backed by a shared connection pool.
+
+    Args:
+        pool_connections: Number of distinct hosts to keep pools for.
+        pool_maxsize: Maximum number of kept-alive connections per host.
+        connect_timeout: Seconds to wait for a TCP/TLS connection.
+        read_timeout: Seconds to wait between bytes of a response.
+    """
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        # block instead of opening throw-away connections when the pool is busy
+        pool_block=True,
+        timeout=(connect_timeout, read_timeout),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+
+def pool_stats(session: requests.Session) -> dict:
+    """
+    Per-host connection pool statistics for a session built by build_session.
+
+    Returns a dict keyed by "scheme://host:port" with:
+      - connections_opened: TCP/TLS connections created so far
+      - requests: requests sent over the pool
+      - idle: connections currently parked in the pool
+      - reuse_ratio: share of requests that reused an existing connection
+    """
+    stats = {}
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened = pool.num_connections
+            sent = pool.num_requests
+            stats[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                "connections_opened": opened,
+                "requests": sent,
+                # urllib3 pads the idle queue with None placeholders
+                "idle": sum(1 for c in list(pool.pool.queue) if c is not None)
+                        if pool.pool is not None else 0,
+                "reuse_ratio": round(1 - opened / sent, 3) if sent else 0.0,
+            }
+    return stats
+
+
+# ─── Async (httpx) ────────────────────────────────────────────────────────────
+
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+_STARTED = "metrics.started"
+
+
+def metrics_event_hooks(is_async: bool = False) -> dict:
+    """
+    httpx event hooks that record each response in metrics, for clients
+    whose transport can't be swapped (the OpenAI SDK may be built on its
+    own copy of httpx). Unlike the instrumented transports they don't see
+    requests that fail without a response.
+    """
+    def on_request(request):
+        request.extensions[_STARTED] = time.perf_counter()
+
+    def on_response(response):
+        request = response.request
+        started = request.extensions.get(_STARTED)
+        if started is not None:
+            metrics.observe("http", endpoint(request.url), time.perf_counter() - started,
+                            response.status_code, _length(request.headers),
+                            _length(response.headers))
+
+    if not is_async:
+        return {"request": [on_request], "response": [on_response]}
+
+    async def on_request_async(request):
+        on_request(request)
+
+    async def on_response_async(response):
+        on_response(response)
+
+    return {"request": [on_request_async], "response": [on_response_async]}
+
+
+class InstrumentedAsyncTransport(httpx.AsyncHTTPTransport):
+    """httpx transport that records each request in metrics, like TimeoutHTTPAdapter."""
+
+    async def handle_async_request(self, request):
+        started = time.perf_counter()
+        try:
+            resp = await super().handle_async_request(request)
+        except Exception as e:
+            metrics.observe("http", endpoint(request.url), time.perf_counter() - started,
+                            type(e).__name__, _length(request.headers))
+            raise
+        metrics.observe("http", endpoint(request.url), time.perf_counter() - started,
+                        resp.status_code, _length(request.headers), _length(resp.headers))
+        return resp
+
+
+def _origin(url: httpx.URL) -> str:
+    port = url.port or (443 if url.scheme == "https" else 80)
+    return f"{url.scheme}://{url.host}:{port}"
+
+
+def build_async_client(
+    pool_connections: int = HTTP_POOL_CONNECTIONS,
+    pool_maxsize: int = HTTP_POOL_MAXSIZE,
+    connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+    read_timeout: float = HTTP_READ_TIMEOUT,
+    counters: dict = None,
+) -> httpx.AsyncClient:
+    """
+    Build a keep-alive httpx.AsyncClient with the same pool/timeout knobs as
+    build_session, speaking HTTP/2 when h2 is installed.
+
+    If counters is given (see new_pool_counters) it is updated with the
+    requests sent and connections opened per origin.
+    """
+    event_hooks = {}
+    if counters is not None:
+        async def count_request(request: httpx.Request):
+            entry = counters[_origin(request.url)]
+            entry["requests"] += 1
+
+            async def trace(event_name, info):
+                if event_name == "connection.connect_tcp.complete":
+                    entry["connections_opened"] += 1
+
+            request.extensions["trace"] = trace
+
+        event_hooks["request"] = [count_request]
+
+    transport_class = InstrumentedAsyncTransport if metrics.enabled else httpx.AsyncHTTPTransport
+    return httpx.AsyncClient(
+        transport=transport_class(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=pool_connections * pool_maxsize,
+                max_keepalive_connections=pool_maxsize,
+            ),
+        ),
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        event_hooks=event_hooks,
+    )
+
+
+def new_pool_counters() -> dict:
+    return defaultdict(lambda: {"connections_opened": 0, "requests": 0})
+
+
+def async_pool_stats(client: httpx.AsyncClient, counters: dict) -> dict:
+    """
+    Per-origin statistics for a client built by build_async_client, in the
+    same shape as pool_stats.
+    """
+    idle = defaultdict(int)
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    for conn in getattr(pool, "connections", []):
+        if conn.is_idle():
+            origin = conn._origin
+            idle[f"{origin.scheme.decode()}://{origin.host.decode()}:{origin.port}"] += 1
+
+    stats = {}
+    for origin, entry in counters.items():
+        opened, sent = entry["connections_opened"], entry["requests"]
+        stats[origin] = {
+            "connections_opened": opened,
+            "requests": sent,
+            "idle": idle.get(origin, 0),
+            "reuse_ratio": round(1 - opened / sent, 3) if sent else 0.0,
+        }
+    return stats
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from utils.config import IMAGE_CACHE_MAX_BYTES
+
+INDEX_NAME = ".gpt_image_cache.json"
+
+
+class ImageCache:
+    """
+    Persistent cache of generated images for one save directory, keyed on
+    (prompt, model, quality, size). The index lives in the directory next
+    to the images; once the cached files exceed max_bytes, the least
+    recently used ones are deleted.
+    """
+
+    def __init__(self, save_dir: str, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.save_dir = os.path.expanduser(save_dir)
+        self.index_path = os.path.join(self.save_dir, INDEX_NAME)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(prompt: str, model: str, quality: str, size: str) -> str:
+        raw = json.dumps([prompt, model, quality, size])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        os.makedirs(self.save_dir, exist_ok=True)
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp, self.index_path)
+
+    def get(self, key: str) -> str:
+        """Path of the cached image for key, or None (also if the file is gone)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not os.path.isfile(entry["path"]):
+                del self._entries[key]
+                self._save()
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            entry["last_used"] = time.time()
+            self.hits += 1
+            self._save()
+            return entry["path"]
+
+    def put(self, key: str, path: str):
+        """Record a generated image and evict old ones past max_bytes."""
+        with self._lock:
+            # a forced regeneration only replaces the entry: the earlier
+            # image may already be in use, so its file is left alone
+            self._entries[key] = {
+                "path": path,
+                "size": os.path.getsize(path),
+                "last_used": time.time(),
+            }
+            total = sum(e["size"] for e in self._entries.values())
+            for old in sorted(self._entries, key=lambda k: self._entries[k]["last_used"]):
+                if total <= self.max_bytes or old == key:
+                    break
+                entry = self._entries.pop(old)
+                total -= entry["size"]
+                self.evictions += 1
+                try:
+                    os.remove(entry["path"])
+                except FileNotFoundError:
+                    pass
+            self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e["size"] for e in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_image_cache(save_dir: str) -> ImageCache:
+    """The shared ImageCache for save_dir."""
+    save_dir = os.path.expanduser(save_dir)
+    with _caches_lock:
+        if save_dir not in _caches:
+            _caches[save_dir] = ImageCache(save_dir)
+        return _caches[save_dir]
+
+
+def image_cache_stats() -> dict:
+    """Stats of every image cache used so far, keyed by directory."""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {save_dir: cache.stats() for save_dir, cache in caches.items()}
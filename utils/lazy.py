@@ -0,0 +1,26 @@
+import threading
+
+
+class Lazy:
+    """
+    A value built by factory() the first time it is called for, then shared.
+    Concurrent first calls wait for a single construction.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value = None
+        self._built = False
+
+    def __call__(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._value = self._factory()
+                    self._built = True
+        return self._value
+
+    @property
+    def built(self) -> bool:
+        return self._built
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from utils.config import (
+    STATE_DIR,
+    IMAGE_MAX_WIDTH,
+    IMAGE_MAX_HEIGHT,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_PREPROCESS_WORKERS,
+)
+
+OUTPUT_DIR = os.path.join(os.path.expanduser(STATE_DIR), "preprocessed")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Process pool shared by every preprocessing call, created on first use.
+    Workers are spawned, not forked: the server has threads (publish worker,
+    token refresh, HTTP pools) whose held locks a forked child would inherit.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=IMAGE_PREPROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _require_pillow():
+    """
+    Import Pillow on first use: it is optional, only needed when
+    preprocessing is requested, and slow to import.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise RuntimeError(
+            "Image preprocessing needs Pillow: pip install pillow"
+        ) from None
+    return Image, ImageOps
+
+
+def preprocess_image(source: str,
+                     max_width: int = IMAGE_MAX_WIDTH,
+                     max_height: int = IMAGE_MAX_HEIGHT,
+                     quality: int = IMAGE_JPEG_QUALITY,
+                     out_dir: str = OUTPUT_DIR) -> dict:
+    """
+    Shrink one image for upload: apply its EXIF rotation, downscale to fit
+    max_width x max_height, and re-encode without metadata (JPEG, or
+    optimised PNG when it has transparency). Animated images are left alone.
+
+    The output name is derived from the source bytes and settings, so the
+    same image always maps to the same file. If re-encoding doesn't make the
+    file smaller, the original is used.
+
+    Returns {"source", "path", "original_bytes", "bytes", "saved_bytes", "seconds"}.
+    Runs in a worker process, so it only takes and returns plain data.
+    """
+    Image, ImageOps = _require_pillow()
+    started = time.perf_counter()
+    original_bytes = os.path.getsize(source)
+    result = {
+        "source": source,
+        "path": source,
+        "original_bytes": original_bytes,
+        "bytes": original_bytes,
+    }
+
+    with Image.open(source) as img:
+        if getattr(img, "is_animated", False):
+            result["saved_bytes"] = 0
+            result["seconds"] = round(time.perf_counter() - started, 4)
+            return result
+
+        h = hashlib.sha256()
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        h.update(json.dumps([max_width, max_height, quality]).encode())
+
+        has_alpha = img.mode in ("RGBA", "LA") or (
+            img.mode == "P" and "transparency" in img.info
+        )
+        ext = "png" if has_alpha else "jpg"
+        out_path = os.path.join(out_dir, f"{h.hexdigest()[:32]}.{ext}")
+
+        if not os.path.isfile(out_path):
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_width, max_height), Image.LANCZOS)
+            os.makedirs(out_dir, exist_ok=True)
+            tmp = f"{out_path}.{os.getpid()}.tmp"
+            if has_alpha:
+                img.convert("RGBA").save(tmp, "PNG", optimize=True)
+            else:
+                img.convert("RGB").save(
+                    tmp, "JPEG", quality=quality, optimize=True, progressive=True
+                )
+            os.replace(tmp, out_path)
+
+    new_bytes = os.path.getsize(out_path)
+    if new_bytes < original_bytes:
+        result["path"] = out_path
+        result["bytes"] = new_bytes
+    result["saved_bytes"] = original_bytes - result["bytes"]
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def preprocess_images(sources, **options) -> list:
+    """
+    preprocess_image for several files across the shared process pool.
+    Returns the reports in the same order as sources.
+    """
+    _require_pillow()
+    pool = get_process_pool()
+    futures = [pool.submit(preprocess_image, source, **options) for source in sources]
+    return [f.result() for f in futures]
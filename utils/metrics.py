@@ -0,0 +1,225 @@
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from urllib.parse import urlsplit
+from utils.config import (
+    METRICS_ENABLED,
+    METRICS_EXPORT_PATH,
+    METRICS_EXPORT_FORMAT,
+    METRICS_EXPORT_INTERVAL,
+)
+
+# Latency bucket upper bounds in seconds: 0.5 ms to ~10 min, 4 per doubling,
+# so percentiles read from the histogram are within ~10% of the true value
+BUCKETS = tuple(0.0005 * 2 ** (i / 4) for i in range(83))
+
+_ID_SEGMENT = re.compile(r"[0-9]|^[A-Za-z0-9_-]{24,}$|%")
+
+
+def endpoint(url: str) -> str:
+    """
+    Low-cardinality name for a request URL: host, first path segments with
+    ids collapsed, and the Rest.li ?action= if any.
+    "https://api.linkedin.com/v2/assets?action=registerUpload"
+      -> "api.linkedin.com/v2/assets?action=registerUpload"
+    """
+    parts = urlsplit(str(url))
+    segments = [
+        ":id" if _ID_SEGMENT.search(s) and s not in ("v1", "v2") else s
+        for s in parts.path.split("/") if s
+    ][:3]
+    name = f"{parts.hostname}/{'/'.join(segments)}"
+    for param in parts.query.split("&"):
+        if param.startswith("action="):
+            name += f"?{param}"
+    return name
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Series:
+    """Counters and latency histogram for one (kind, name)."""
+
+    __slots__ = ("count", "errors", "retries", "bytes_sent", "bytes_received",
+                 "buckets", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = {}
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        # one slot per bound plus one for anything slower
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile (seconds) by interpolating in its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": dict(self.errors),
+            "retries": self.retries,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 2),
+            "p95_ms": round(self.quantile(0.95) * 1000, 2),
+            "p99_ms": round(self.quantile(0.99) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class Metrics:
+    """
+    In-process registry of call latencies and counters, grouped by kind
+    ("tool", "http", ...) and name (tool name, endpoint(url), ...).
+
+    Call sites check `enabled` before timing anything, so a disabled
+    registry costs one attribute lookup per call.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._series = {}
+        self._exporter = None
+
+    def _get(self, kind: str, name: str) -> Series:
+        series = self._series.get((kind, name))
+        if series is None:
+            series = self._series.setdefault((kind, name), Series())
+        return series
+
+    def observe(self, kind: str, name: str, seconds: float, status=None,
+                sent: int = 0, received: int = 0):
+        """
+        Record one call. status is an HTTP status code, or an exception name
+        for calls that failed without one; codes >= 400 and names count as
+        errors.
+        """
+        with self._lock:
+            series = self._get(kind, name)
+            series.count += 1
+            series.total += seconds
+            if seconds > series.max:
+                series.max = seconds
+            series.buckets[bisect_left(BUCKETS, seconds)] += 1
+            series.bytes_sent += sent
+            series.bytes_received += received
+            if status is not None and (isinstance(status, str) or status >= 400):
+                key = str(status)
+                series.errors[key] = series.errors.get(key, 0) + 1
+
+    def retry(self, kind: str, name: str):
+        """Count a retried call (the attempts themselves are observed too)."""
+        with self._lock:
+            self._get(kind, name).retries += 1
+
+    def snapshot(self) -> dict:
+        """{"uptime_seconds", kind: {name: summary}} for every recorded series."""
+        with self._lock:
+            items = [(kind, name, s.summary()) for (kind, name), s in self._series.items()]
+        result = {"enabled": self.enabled, "uptime_seconds": round(time.time() - self.started, 1)}
+        for kind, name, summary in sorted(items, key=lambda i: (i[0], i[1])):
+            result.setdefault(kind, {})[name] = summary
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    # ─── Export ───────────────────────────────────────────────────────────────
+
+    def prometheus(self) -> str:
+        """Every series in the Prometheus text exposition format."""
+        def labels(kind, name, **extra):
+            pairs = {"kind": kind, "name": name, **extra}
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs.items()) + "}"
+
+        with self._lock:
+            series = sorted(self._series.items())
+            lines = [
+                "# TYPE linkedin_mcp_call_duration_seconds histogram",
+            ]
+            for (kind, name), s in series:
+                cumulative = 0
+                for bound, n in zip(BUCKETS, s.buckets):
+                    cumulative += n
+                    lines.append(
+                        f"linkedin_mcp_call_duration_seconds_bucket"
+                        f"{labels(kind, name, le=f'{bound:.6g}')} {cumulative}"
+                    )
+                lines.append(
+                    f"linkedin_mcp_call_duration_seconds_bucket"
+                    f"{labels(kind, name, le='+Inf')} {s.count}"
+                )
+                lines.append(f"linkedin_mcp_call_duration_seconds_sum{labels(kind, name)} {s.total}")
+                lines.append(f"linkedin_mcp_call_duration_seconds_count{labels(kind, name)} {s.count}")
+            for metric, attr in (("bytes_sent_total", "bytes_sent"),
+                                 ("bytes_received_total", "bytes_received"),
+                                 ("retries_total", "retries")):
+                lines.append(f"# TYPE linkedin_mcp_{metric} counter")
+                for (kind, name), s in series:
+                    lines.append(f"linkedin_mcp_{metric}{labels(kind, name)} {getattr(s, attr)}")
+            lines.append("# TYPE linkedin_mcp_errors_total counter")
+            for (kind, name), s in series:
+                for status, n in sorted(s.errors.items()):
+                    lines.append(f"linkedin_mcp_errors_total{labels(kind, name, status=status)} {n}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str, fmt: str = "json"):
+        """Write the current metrics to path ("json" or "prometheus"), atomically."""
+        path = os.path.expanduser(path)
+        body = self.prometheus() if fmt == "prometheus" else json.dumps(self.snapshot())
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+    def start_exporter(self,
+                       path: str = METRICS_EXPORT_PATH,
+                       fmt: str = METRICS_EXPORT_FORMAT,
+                       interval: float = METRICS_EXPORT_INTERVAL):
+        """
+        Rewrite path every interval seconds from a daemon thread (e.g. for
+        node_exporter's textfile collector). A no-op without a path, when
+        disabled, or if already running.
+        """
+        if not path or not self.enabled or self._exporter is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.export(path, fmt)
+                except OSError:
+                    pass
+
+        self._exporter = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+        self._exporter.start()
+
+
+# Process-wide registry used by the server, clients and HTTP transports
+metrics = Metrics()
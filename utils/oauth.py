@@ -1,4 +1,5 @@
 import os
+import time
 import webbrowser
 import requests
 from http.server import HTTPServer, BaseHTTPRequestHandler
@@ -10,7 +11,9 @@ load_dotenv()
 CLIENT_ID     = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 REDIRECT_URI  = os.getenv("REDIRECT_URI", "http://localhost:8000/callback")
-SCOPE         = "openid profile w_member_social"  # must match exactly your app’s scopes
+# must match exactly your app’s scopes; apps approved for r_member_social
+# can add it through LINKEDIN_SCOPES so the server can read back its posts
+SCOPE         = os.getenv("LINKEDIN_SCOPES", "openid profile w_member_social")
 
 AUTH_URL      = "https://www.linkedin.com/oauth/v2/authorization"
 TOKEN_URL     = "https://www.linkedin.com/oauth/v2/accessToken"
@@ -49,7 +52,12 @@ def fetch_auth_code():
     return getattr(server, "auth_code", None)
 
 # ─── Step 2: Exchange Auth Code for Access Token ─────────────────────────────
-def exchange_token(code: str) -> str:
+def exchange_token(code: str) -> dict:
+    """
+    Returns the token response: access_token and expires_in, plus
+    refresh_token and refresh_token_expires_in when the app is allowed
+    refresh tokens.
+    """
     resp = requests.post(TOKEN_URL, data={
         "grant_type":   "authorization_code",
         "code":         code,
@@ -58,7 +66,7 @@ def exchange_token(code: str) -> str:
         "client_secret":CLIENT_SECRET
     })
     resp.raise_for_status()
-    return resp.json()["access_token"]
+    return resp.json()
 
 # ─── Step 3: Fetch Your Member ID & Build URN ────────────────────────────────
 def fetch_member_urn(token: str) -> str:
@@ -75,27 +83,44 @@ def fetch_member_urn(token: str) -> str:
     return f"urn:li:person:{sub}"
 
 
-# ─── Step 4: Update .env with ACCESS_TOKEN and AUTHOR_URN ────────────────────
-def update_env(token: str, author_urn: str):
+# ─── Step 4: Update .env with the tokens and AUTHOR_URN ──────────────────────
+def env_values(token_response: dict, author_urn: str) -> dict:
+    """The .env entries for a token response, with expiries as epoch seconds."""
+    now = time.time()
+    values = {
+        "ACCESS_TOKEN": token_response["access_token"],
+        "AUTHOR_URN": author_urn,
+    }
+    if "expires_in" in token_response:
+        values["ACCESS_TOKEN_EXPIRES_AT"] = str(int(now + token_response["expires_in"]))
+    if token_response.get("refresh_token"):
+        values["REFRESH_TOKEN"] = token_response["refresh_token"]
+    if "refresh_token_expires_in" in token_response:
+        values["REFRESH_TOKEN_EXPIRES_AT"] = str(
+            int(now + token_response["refresh_token_expires_in"])
+        )
+    return values
+
+
+def update_env(values: dict):
     path = ".env"
     lines = []
-    seen_token = seen_urn = False
+    seen = set()
 
     with open(path, "r") as f:
         for L in f:
-            if L.startswith("ACCESS_TOKEN="):
-                lines.append(f"ACCESS_TOKEN={token}\n")
-                seen_token = True
-            elif L.startswith("AUTHOR_URN="):
-                lines.append(f"AUTHOR_URN={author_urn}\n")
-                seen_urn = True
+            name = L.split("=", 1)[0]
+            if name in values:
+                lines.append(f"{name}={values[name]}\n")
+                seen.add(name)
             else:
                 lines.append(L)
 
-    if not seen_token:
-        lines.append(f"\nACCESS_TOKEN={token}\n")
-    if not seen_urn:
-        lines.append(f"AUTHOR_URN={author_urn}\n")
+    missing = [name for name in values if name not in seen]
+    if missing:
+        lines.append("\n")
+    for name in missing:
+        lines.append(f"{name}={values[name]}\n")
 
     with open(path, "w") as f:
         f.writelines(lines)
@@ -108,10 +133,15 @@ if __name__ == "__main__":
         exit(1)
 
     print("Exchanging code for access token…")
-    token = exchange_token(code)
+    token_response = exchange_token(code)
+    token = token_response["access_token"]
 
     print("Fetching your LinkedIn URN…")
     urn = fetch_member_urn(token)
 
-    update_env(token, urn)
+    update_env(env_values(token_response, urn))
     print(f".env updated:\n  ACCESS_TOKEN={token}\n  AUTHOR_URN={urn}")
+    if token_response.get("refresh_token"):
+        print("  REFRESH_TOKEN saved; the server will renew the access token itself.")
+    else:
+        print("  No refresh token issued; run this again when the token expires.")
@@ -0,0 +1,523 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from utils.client import LinkedInClient, RETRY_STATUSES, video_media_entry
+from utils.db import Database
+from utils.metrics import metrics
+from utils.ratelimit import TokenBucket
+from utils.config import (
+    PUBLISH_RATE_LIMIT,
+    PUBLISH_RATE_BURST,
+    PUBLISH_MAX_ATTEMPTS,
+    PUBLISH_BACKOFF_BASE,
+    PUBLISH_BACKOFF_MAX,
+    PUBLISH_WORKERS,
+    PUBLISH_POLL_INTERVAL,
+    PUBLISH_DEDUPE_WINDOW,
+)
+
+TABLE = "publish_jobs"
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    id              INTEGER PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind            TEXT NOT NULL,
+    payload         TEXT NOT NULL,
+    status          TEXT NOT NULL,
+    phase           TEXT NOT NULL DEFAULT 'upload',
+    assets          TEXT,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    scheduled_at    REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    post_urn        TEXT,
+    last_error      TEXT,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {TABLE}_due ON {TABLE} (status, next_attempt_at);
+"""
+
+# Job lifecycle: queued -> running -> done | failed, with running -> retrying
+# -> running ... after a retryable error. A job whose post may exist but
+# can't be looked up (the token lacks r_member_social) ends as unknown
+# rather than risk posting twice.
+PENDING = ("queued", "retrying")
+
+# Statuses for which LinkedIn certainly did not create the post
+_REJECTED_STATUSES = {429, 503}
+# Statuses for which the token may not read the author's posts
+_FORBIDDEN_STATUSES = {401, 403}
+# Seconds LinkedIn's clock may run behind ours when matching a post to a job
+_CLOCK_SKEW = 60
+
+
+def parse_publish_at(value: str = None) -> float:
+    """
+    Epoch seconds for an ISO 8601 time ("2025-06-01T09:00", "...Z",
+    "...+02:00"); times without an offset are local. None means now.
+    """
+    if not value:
+        return time.time()
+    try:
+        when = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"publish_at is not an ISO 8601 time: {value!r}")
+    return when.timestamp()
+
+
+def _iso(ts):
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+
+
+def retry_after(resp) -> float:
+    """Seconds asked for by a Retry-After header (delta or HTTP date), or 0."""
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RetryableError(Exception):
+    def __init__(self, message, delay=0.0, ambiguous=False):
+        super().__init__(message)
+        # lower bound on the wait before the next attempt
+        self.delay = delay
+        # the post may have been created; check before posting again
+        self.ambiguous = ambiguous
+
+
+class UnverifiableError(Exception):
+    """An earlier attempt may have created the post, and it can't be checked."""
+
+
+def _classify(exc: Exception, posting: bool) -> Exception:
+    """
+    Map an error from one attempt to RetryableError, or return it unchanged
+    if retrying can't help. posting tells whether the ugcPosts request itself
+    failed, where a lost response may still mean the post exists.
+    """
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        if status not in RETRY_STATUSES:
+            return exc
+        ambiguous = posting and status not in _REJECTED_STATUSES
+        return RetryableError(str(exc), retry_after(exc.response), ambiguous)
+    if isinstance(exc, requests.ConnectTimeout):
+        # never reached the server
+        return RetryableError(str(exc))
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return RetryableError(str(exc), ambiguous=posting)
+    return exc
+
+
+class PublishQueue:
+    """
+    Durable queue of posts to publish, kept in a table of the local SQLite
+    database so scheduled and retrying jobs survive restarts.
+
+    enqueue() stores a job and returns at once; worker threads pick up jobs
+    whose time has come, upload their media, then create the post under a
+    token-bucket rate limit. Failed attempts are retried with exponential
+    backoff (at least as long as any Retry-After) up to max_attempts.
+
+    Every job has a unique idempotency key: enqueueing the same key again
+    returns the existing job. Uploaded assets are recorded so a retry only
+    repeats the step that failed, and if the post request failed in a way
+    that may still have created the post (timeout, 5xx after sending), the
+    author's recent posts are checked before posting again.
+    """
+
+    def __init__(self,
+                 db: Database,
+                 client: LinkedInClient,
+                 author_urn: str,
+                 rate: float = PUBLISH_RATE_LIMIT,
+                 burst: float = PUBLISH_RATE_BURST,
+                 max_attempts: int = PUBLISH_MAX_ATTEMPTS,
+                 backoff_base: float = PUBLISH_BACKOFF_BASE,
+                 backoff_max: float = PUBLISH_BACKOFF_MAX,
+                 workers: int = PUBLISH_WORKERS,
+                 poll_interval: float = PUBLISH_POLL_INTERVAL,
+                 dedupe_window: float = PUBLISH_DEDUPE_WINDOW,
+                 on_change=None):
+        self.db = db
+        self.client = client
+        self.author_urn = author_urn
+        self.limiter = TokenBucket(rate, burst)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.dedupe_window = dedupe_window
+        # called after every write to the jobs table (e.g. cache invalidation)
+        self.on_change = on_change
+
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    # ─── Storage ──────────────────────────────────────────────────────────────
+
+    def _ensure_schema(self):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            with self.db.writer() as conn:
+                conn.executescript(SCHEMA)
+                # jobs interrupted by a restart: retry them, but check first
+                # whether an interrupted post request went through
+                now = time.time()
+                conn.execute(
+                    f"UPDATE {TABLE} SET status = 'retrying', phase = 'verify', "
+                    f"next_attempt_at = ?, updated_at = ? "
+                    f"WHERE status = 'running' AND phase IN ('posting', 'verify')",
+                    (now, now)
+                )
+                conn.execute(
+                    f"UPDATE {TABLE} SET status = 'retrying', next_attempt_at = ?, "
+                    f"updated_at = ? WHERE status = 'running'",
+                    (now, now)
+                )
+            self._schema_ready = True
+        self._changed()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def _update(self, job_id: int, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self.db.writer() as conn:
+            conn.execute(
+                f"UPDATE {TABLE} SET {columns} WHERE id = ?",
+                (*fields.values(), job_id)
+            )
+        self._changed()
+
+    @staticmethod
+    def _describe(row) -> dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["assets"] = json.loads(job["assets"]) if job["assets"] else None
+        for name in ("scheduled_at", "next_attempt_at", "created_at", "updated_at"):
+            job[name] = _iso(job[name])
+        if job["status"] not in PENDING:
+            job["next_attempt_at"] = None
+        if job["post_urn"]:
+            job["url"] = f"https://www.linkedin.com/feed/update/{job['post_urn']}"
+        return job
+
+    # ─── Public API ───────────────────────────────────────────────────────────
+
+    def enqueue(self,
+                text: str,
+                image_paths: list = None,
+                video_path: str = None,
+                title: str = None,
+                description: str = None,
+                optimize: bool = False,
+                publish_at: str = None,
+                idempotency_key: str = None) -> dict:
+        """
+        Queue a post for publish_at (ISO 8601, default now).
+        Without an idempotency_key, one is derived from the content and
+        publish_at, so submitting the same post twice yields one job; with
+        no publish_at either, only within dedupe_window seconds of the
+        first, so the same text can be posted again later.
+        Returns the job, with "duplicate": true if the key already existed.
+        """
+        if not text:
+            raise ValueError("Content cannot be empty")
+        if image_paths and video_path:
+            raise ValueError("A post can have images or a video, not both")
+        if image_paths:
+            kind = "image"
+            self.client._resolve_images(image_paths)
+        elif video_path:
+            kind = "video"
+            if not os.path.isfile(os.path.join(self.client.folder_path, video_path)):
+                raise ValueError(f"Video file does not exist: {video_path}")
+        else:
+            kind = "text"
+        scheduled_at = parse_publish_at(publish_at)
+
+        payload = {"text": text}
+        if kind == "image":
+            payload.update(image_paths=list(image_paths), optimize=optimize)
+        elif kind == "video":
+            payload.update(video_path=video_path, title=title, description=description)
+        now = time.time()
+        # keys of an earlier submission that still counts as this one
+        earlier = ()
+        if idempotency_key is None:
+            def derived_key(when):
+                raw = json.dumps([self.author_urn, kind, payload, when], sort_keys=True)
+                return hashlib.sha256(raw.encode()).hexdigest()
+
+            if publish_at or not self.dedupe_window:
+                idempotency_key = derived_key(publish_at)
+            else:
+                # windows of dedupe_window seconds; the key of the previous
+                # one is checked too, so the window is sliding
+                window = int(now // self.dedupe_window)
+                idempotency_key = derived_key(f"window {window}")
+                earlier = (derived_key(f"window {window - 1}"),)
+
+        self._ensure_schema()
+        with self.db.writer() as conn:
+            for key in earlier:
+                row = conn.execute(
+                    f"SELECT * FROM {TABLE} WHERE idempotency_key = ? AND created_at > ?",
+                    (key, now - self.dedupe_window)
+                ).fetchone()
+                if row is not None:
+                    return {**self._describe(row), "duplicate": True}
+            cur = conn.execute(
+                f"INSERT INTO {TABLE} (idempotency_key, kind, payload, status, "
+                f"scheduled_at, next_attempt_at, created_at, updated_at) "
+                f"VALUES (?, ?, ?, 'queued', ?, ?, ?, ?) "
+                f"ON CONFLICT (idempotency_key) DO NOTHING",
+                (idempotency_key, kind, json.dumps(payload),
+                 scheduled_at, scheduled_at, now, now)
+            )
+            duplicate = cur.rowcount == 0
+            row = conn.execute(
+                f"SELECT * FROM {TABLE} WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        if not duplicate:
+            self._changed()
+            self._wake.set()
+        return {**self._describe(row), "duplicate": duplicate}
+
+    def get(self, job_id: int = None, idempotency_key: str = None) -> dict:
+        """One job by id or idempotency key, or None."""
+        self._ensure_schema()
+        with self.db.reader() as conn:
+            if job_id is not None:
+                row = conn.execute(f"SELECT * FROM {TABLE} WHERE id = ?", (job_id,)).fetchone()
+            else:
+                row = conn.execute(
+                    f"SELECT * FROM {TABLE} WHERE idempotency_key = ?", (idempotency_key,)
+                ).fetchone()
+        return self._describe(row) if row is not None else None
+
+    def recent(self, status: str = None, limit: int = 20) -> list:
+        """The most recently created jobs, optionally only those with status."""
+        self._ensure_schema()
+        sql = f"SELECT * FROM {TABLE}"
+        params = []
+        if status:
+            sql += " WHERE status = ?"
+            params.append(status)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self.db.reader() as conn:
+            return [self._describe(r) for r in conn.execute(sql, params)]
+
+    def counts(self) -> dict:
+        """Number of jobs per status."""
+        self._ensure_schema()
+        with self.db.reader() as conn:
+            return dict(conn.execute(
+                f"SELECT status, COUNT(*) FROM {TABLE} GROUP BY status"
+            ).fetchall())
+
+    # ─── Worker ───────────────────────────────────────────────────────────────
+
+    def start(self):
+        """Start the worker threads (daemons); a no-op if already running."""
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(max(1, self.workers)):
+            t = threading.Thread(
+                target=self._run_worker, name=f"publish-worker-{i}", daemon=True
+            )
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = None):
+        """Ask the workers to exit after their current job and wait for them."""
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _run_worker(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self._ensure_schema()
+                job = self._claim()
+                if job is None:
+                    self._wake.wait(self._idle_timeout())
+                    continue
+                self._dispatch(job)
+            except Exception:
+                # e.g. the database is busy; the job stays claimable after restart
+                self._wake.wait(self.poll_interval)
+
+    def _claim(self):
+        """Mark the next due job as running and return it, or None."""
+        now = time.time()
+        with self.db.writer() as conn:
+            row = conn.execute(
+                f"SELECT * FROM {TABLE} WHERE status IN {PENDING} "
+                f"AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                f"UPDATE {TABLE} SET status = 'running', attempts = attempts + 1, "
+                f"updated_at = ? WHERE id = ?",
+                (now, row["id"])
+            )
+        self._changed()
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def _idle_timeout(self) -> float:
+        """Seconds until the next pending job is due, capped at poll_interval."""
+        with self.db.reader() as conn:
+            (due,) = conn.execute(
+                f"SELECT MIN(next_attempt_at) FROM {TABLE} WHERE status IN {PENDING}"
+            ).fetchone()
+        if due is None:
+            return self.poll_interval
+        return min(max(due - time.time(), 0.0), self.poll_interval)
+
+    def _backoff(self, attempts: int, delay: float) -> float:
+        wait = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        # full jitter on the upper half, so retries from a burst spread out
+        wait *= random.uniform(0.5, 1.0)
+        return max(wait, delay)
+
+    def _dispatch(self, job: dict):
+        # _attempt advances job["phase"]: upload -> post -> posting -> done,
+        # or verify first when an earlier post request may have succeeded
+        try:
+            post_urn = self._attempt(job)
+        except UnverifiableError as e:
+            self._update(job["id"], status="unknown", phase="verify", last_error=str(e))
+            return
+        except Exception as e:
+            error = _classify(e, posting=job["phase"] == "posting")
+            if isinstance(error, RetryableError):
+                if error.ambiguous:
+                    phase = "verify"
+                else:
+                    phase = "post" if job["phase"] == "posting" else job["phase"]
+                message = str(e)
+                if phase == "verify":
+                    message = f"post may already exist, will check first: {e}"
+                if job["attempts"] < self.max_attempts:
+                    if metrics.enabled:
+                        metrics.retry("publish", job["kind"])
+                    self._update(
+                        job["id"], status="retrying", phase=phase, last_error=message,
+                        next_attempt_at=time.time() + self._backoff(job["attempts"], error.delay),
+                    )
+                    self._wake.set()
+                    return
+                self._update(job["id"], status="failed", phase=phase, last_error=message)
+                return
+            self._update(job["id"], status="failed", phase=job["phase"], last_error=str(e))
+            return
+        self._update(job["id"], status="done", phase="done", post_urn=post_urn,
+                     last_error=None)
+
+    def _attempt(self, job: dict) -> str:
+        """Run the remaining steps of one job. Returns the post URN."""
+        payload = json.loads(job["payload"])
+        text = payload["text"]
+
+        if job["phase"] == "verify":
+            try:
+                existing = self._find_post(job, text)
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code not in _FORBIDDEN_STATUSES:
+                    raise
+                raise UnverifiableError(
+                    f"post may already exist, but the token can't list posts to check "
+                    f"(needs the r_member_social scope); check the profile and "
+                    f"re-queue if it is missing: {e}"
+                ) from e
+            if existing:
+                return existing
+            job["phase"] = "post"
+
+        # 1) upload media once; later attempts reuse the recorded assets
+        assets = json.loads(job["assets"]) if job["assets"] else None
+        if assets is None:
+            assets = self._upload(job["kind"], payload)
+            job["assets"] = json.dumps(assets)
+            self._update(job["id"], assets=job["assets"], phase="post")
+
+        if job["kind"] == "image":
+            category = "IMAGE"
+            media = [{"status": "READY", "media": urn} for urn in assets]
+        elif job["kind"] == "video":
+            category = "VIDEO"
+            media = [video_media_entry(assets[0], payload.get("title"),
+                                       payload.get("description"))]
+        else:
+            category, media = "NONE", None
+
+        # 2) create the post; mark it first so a crash mid-request is verified
+        self.limiter.acquire()
+        job["phase"] = "posting"
+        self._update(job["id"], phase="posting")
+        return self.client.publish_post(self.author_urn, text, category, media)
+
+    def _upload(self, kind: str, payload: dict) -> list:
+        if kind == "image":
+            paths = payload["image_paths"]
+            if payload.get("optimize"):
+                paths = [r["path"] for r in self.client.preprocess_images(paths)]
+            return self.client.upload_images(self.author_urn, paths)
+        if kind == "video":
+            return [self.client.upload_video(self.author_urn, payload["video_path"])]
+        return []
+
+    def _find_post(self, job: dict, text: str):
+        """
+        URN of a recent post by the author that this job created, or None:
+        same text, created after the job was queued and, for media posts,
+        carrying exactly the assets the job uploaded.
+        """
+        assets = set(json.loads(job["assets"])) if job["assets"] else set()
+        since_ms = (job["created_at"] - _CLOCK_SKEW) * 1000
+        for post in self.client.recent_posts(self.author_urn):
+            content = post.get("specificContent", {}).get("com.linkedin.ugc.ShareContent", {})
+            if content.get("shareCommentary", {}).get("text") != text:
+                continue
+            created = (post.get("created") or {}).get("time") or post.get("firstPublishedAt")
+            if not created or created < since_ms:
+                continue
+            if {m.get("media") for m in content.get("media") or ()} != assets:
+                continue
+            return post.get("id")
+        return None
@@ -0,0 +1,243 @@
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, FrozenSet
+from utils.config import QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+
+# Authorizer actions a read-only statement may trigger
+_READ_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    getattr(sqlite3, "SQLITE_RECURSIVE", 33),
+}
+# Actions that modify a table's rows; the table is in arg1
+_ROW_WRITE_ACTIONS = {
+    sqlite3.SQLITE_INSERT,
+    sqlite3.SQLITE_UPDATE,
+    sqlite3.SQLITE_DELETE,
+}
+# Functions whose result can change between identical calls
+_VOLATILE_FUNCTIONS = {
+    "random", "randomblob", "changes", "total_changes", "last_insert_rowid",
+    "date", "time", "datetime", "julianday", "strftime", "unixepoch",
+    "current_date", "current_time", "current_timestamp",
+}
+# Functions that can change anything (an extension may register or do anything)
+_UNSAFE_FUNCTIONS = {"load_extension"}
+
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])""")
+_WHITESPACE = re.compile(r"\s+")
+# EXPLAIN [QUERY PLAN] prefix, after any leading comments
+_EXPLAIN = re.compile(
+    r"\A(?:\s+|--[^\n]*(?:\n|\Z)|/\*.*?\*/)*EXPLAIN(?:\s+QUERY\s+PLAN)?\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _allow_all(*args):
+    return sqlite3.SQLITE_OK
+
+
+# Python < 3.11 can't remove an authorizer; fall back to one that allows all
+_NO_AUTHORIZER = None if sys.version_info >= (3, 11) else _allow_all
+
+
+class StatementInfo(NamedTuple):
+    readonly: bool
+    # tables the statement reads / modifies
+    reads: FrozenSet[str]
+    writes: FrozenSet[str]
+    # schema changes, pragmas, attaches...: affects anything
+    global_write: bool
+    # same SQL always gives the same result on the same data
+    deterministic: bool
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace outside quoted literals and drop trailing ';'."""
+    parts = _QUOTED.split(sql.strip().rstrip(";").strip())
+    # whitespace next to a literal is kept (as one space): x 'AB' is not x'AB'
+    return "".join(
+        part if i % 2 else _WHITESPACE.sub(" ", part) for i, part in enumerate(parts)
+    )
+
+
+def analyze_sql(conn: sqlite3.Connection, sql: str, params=()) -> StatementInfo:
+    """
+    Classify a statement without running it: SQLite compiles it under
+    EXPLAIN and reports every table/column access (triggers included) to an
+    authorizer. params is one sample parameter set for statements with
+    placeholders. Raises sqlite3.Error for invalid SQL.
+
+    Only a statement seen to SELECT, and to do nothing else, is a read.
+    An EXPLAIN [QUERY PLAN] statement never runs what it explains, so it is
+    a read of the tables that statement reads; not deterministic, since the
+    plan changes with indexes and ANALYZE.
+    """
+    explain = _EXPLAIN.match(sql)
+    if explain:
+        inner = analyze_sql(conn, sql[explain.end():], params)
+        return StatementInfo(
+            readonly=True,
+            reads=inner.reads,
+            writes=frozenset(),
+            global_write=False,
+            deterministic=False,
+        )
+
+    reads, writes = set(), set()
+    state = {"select": False, "global": False, "deterministic": True}
+
+    def authorizer(action, arg1, arg2, db_name, source):
+        if action == sqlite3.SQLITE_SELECT:
+            state["select"] = True
+        elif action == sqlite3.SQLITE_READ:
+            reads.add(arg1.lower())
+        elif action == sqlite3.SQLITE_FUNCTION:
+            name = (arg2 or "").lower()
+            if name in _UNSAFE_FUNCTIONS:
+                state["global"] = True
+            elif name in _VOLATILE_FUNCTIONS:
+                state["deterministic"] = False
+        elif action in _ROW_WRITE_ACTIONS:
+            if arg1.lower().startswith("sqlite_"):
+                state["global"] = True
+            writes.add(arg1.lower())
+        elif action not in _READ_ACTIONS:
+            state["global"] = True
+        return sqlite3.SQLITE_OK
+
+    conn.set_authorizer(authorizer)
+    try:
+        conn.execute(f"EXPLAIN {sql}", params).fetchall()
+    finally:
+        conn.set_authorizer(_NO_AUTHORIZER)
+
+    # statements that report nothing (VACUUM, ...) go to the writer too
+    readonly = state["select"] and not writes and not state["global"]
+    return StatementInfo(
+        readonly=readonly,
+        reads=frozenset(reads),
+        writes=frozenset(writes),
+        global_write=state["global"],
+        deterministic=state["deterministic"],
+    )
+
+
+def table_write(*tables: str) -> StatementInfo:
+    """StatementInfo for a write to tables made outside execute_db_query."""
+    return StatementInfo(
+        readonly=False,
+        reads=frozenset(),
+        writes=frozenset(t.lower() for t in tables),
+        global_write=False,
+        deterministic=True,
+    )
+
+
+class QueryCache:
+    """
+    LRU cache of read-query results, each tagged with the tables it read.
+    invalidate() drops every entry that depends on a written table.
+
+    Only writes made through this server are seen; entries also expire
+    after ttl seconds to bound staleness from outside writers.
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (expires_at, tables, value), oldest first
+        self._entries = OrderedDict()
+        # table -> keys of entries that read it
+        self._by_table = {}
+        # normalized SQL -> StatementInfo, so each text is analysed once
+        self._analysis = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # bumped by every invalidate(); see put()
+        self.generation = 0
+
+    def analyze(self, conn: sqlite3.Connection, sql: str, params=()) -> StatementInfo:
+        key = normalize_sql(sql)
+        with self._lock:
+            info = self._analysis.get(key)
+            if info is not None:
+                self._analysis.move_to_end(key)
+                return info
+        info = analyze_sql(conn, sql, params)
+        with self._lock:
+            self._analysis[key] = info
+            while len(self._analysis) > self.maxsize * 4:
+                self._analysis.popitem(last=False)
+        return info
+
+    def _drop(self, key):
+        _, tables, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, tables, generation: int = None):
+        """
+        Store a result. Pass the generation read before running the query:
+        if a write invalidated the cache meanwhile, the result may predate
+        it and is not stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.time() + self.ttl, frozenset(tables), value)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, info: StatementInfo):
+        """Drop results made stale by a write described by info."""
+        with self._lock:
+            self.generation += 1
+            if info.global_write:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._by_table.clear()
+                # schema may have changed, so re-analyse statements too
+                self._analysis.clear()
+                return
+            for table in info.writes:
+                for key in list(self._by_table.get(table, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
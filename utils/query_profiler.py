@@ -0,0 +1,387 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from utils.db import Database, statement_limit
+from utils.config import (
+    DB_STATEMENT_TIMEOUT,
+    DB_SLOW_QUERY_MS,
+    DB_SLOW_QUERY_LOG_MAX,
+)
+
+LOG_TABLE = "db_query_log"
+
+# One row per slow statement; plan and full_scans are JSON lists
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {LOG_TABLE} (
+    id            INTEGER PRIMARY KEY,
+    fingerprint   TEXT NOT NULL,
+    sql           TEXT NOT NULL,
+    kind          TEXT NOT NULL,
+    wall_ms       REAL NOT NULL,
+    rows_returned INTEGER NOT NULL,
+    rows_scanned  INTEGER,
+    vm_steps      INTEGER NOT NULL,
+    plan          TEXT NOT NULL,
+    full_scans    TEXT NOT NULL,
+    error         TEXT,
+    logged_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {LOG_TABLE}_fingerprint ON {LOG_TABLE} (fingerprint);
+"""
+
+# Widest index db_advise proposes; beyond it only the lookup columns are kept
+MAX_INDEX_COLUMNS = 6
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+# "SCAN t", "SCAN t USING INDEX i", and "SCAN TABLE t AS a" before SQLite 3.36
+_SCAN = re.compile(r"^SCAN (?:TABLE )?(\S+)(?: AS (\S+))?(.*)$")
+_PROBE = "_advise_probe"
+
+# sqlite_stmt (SQLITE_ENABLE_STMTVTAB) reports full-scan steps per
+# statement; without it rows_scanned is left out
+_stmt_vtab = {"available": True}
+
+
+def fingerprint(sql: str) -> str:
+    """sql with string and number literals replaced by ?, for grouping."""
+    return _NUMBER.sub("?", " ".join(_STRING.sub("?", sql.strip().rstrip(";")).split()))
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params=()) -> list:
+    """EXPLAIN QUERY PLAN for sql as lines indented by nesting depth."""
+    # SQLite doesn't re-prepare a cached EXPLAIN when the schema changes, so
+    # the schema version goes into the text to keep stale plans out of the
+    # statement cache
+    version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    depth, lines = {0: -1}, []
+    explain = f"EXPLAIN QUERY PLAN /* schema {version} */ {sql}"
+    for node, parent, _, detail in conn.execute(explain, params):
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+def full_scans(plan: list) -> list:
+    """Names (table or alias) the plan reads with a full table scan."""
+    names = []
+    for line in plan:
+        m = _SCAN.match(line.strip())
+        # "USING [COVERING] INDEX" reads an index; VIRTUAL TABLE is its own code
+        if m and not m.group(3).strip() and not m.group(1).startswith("("):
+            names.append(m.group(1))
+    return names
+
+
+def _resolve(name: str, sql: str, tables: dict):
+    """Table behind a plan name: itself, or the table it aliases in sql."""
+    if name.lower() in tables:
+        return tables[name.lower()]
+    m = re.search(rf"(\w+)\s+(?:AS\s+)?{re.escape(name)}\b", sql, re.IGNORECASE)
+    if m and m.group(1).lower() in tables:
+        return tables[m.group(1).lower()]
+    return None
+
+
+def _tables(conn: sqlite3.Connection) -> dict:
+    return {
+        r[0].lower(): r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )
+    }
+
+
+def _scan_steps(conn: sqlite3.Connection, sql: str):
+    """Full-scan steps so far of the prepared statement(s) for sql, or None."""
+    if not _stmt_vtab["available"]:
+        return None
+    try:
+        row = conn.execute("SELECT sum(nscan) FROM sqlite_stmt WHERE sql = ?", (sql,)).fetchone()
+    except sqlite3.OperationalError:
+        _stmt_vtab["available"] = False
+        return None
+    return row[0] or 0
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class QueryProfiler:
+    """
+    Times statements run by execute_db_query, stops them after timeout
+    seconds and logs those taking slow_ms or more, with their query plan,
+    to a table in data.db. advise() reads the log back to find hot queries
+    that scan whole tables and the indexes that would avoid it.
+
+    Slow runs are kept in memory until flush(), which the caller makes
+    once it no longer holds the writer connection.
+    """
+
+    def __init__(self,
+                 db: Database,
+                 timeout: float = DB_STATEMENT_TIMEOUT,
+                 slow_ms: float = DB_SLOW_QUERY_MS,
+                 max_rows: int = DB_SLOW_QUERY_LOG_MAX,
+                 on_change=None):
+        self.db = db
+        self.timeout = timeout
+        self.slow_ms = slow_ms
+        self.max_rows = max_rows
+        # called after every write to the log, e.g. to invalidate cached reads
+        self.on_change = on_change
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self.logged = 0
+        self.timeouts = 0
+
+    def _ensure_schema(self):
+        if self._schema_ready:
+            return
+        with self.db.writer() as conn:
+            conn.executescript(SCHEMA)
+        self._schema_ready = True
+
+    # ─── Measuring ────────────────────────────────────────────────────────────
+
+    @contextmanager
+    def measure(self, conn: sqlite3.Connection, sql: str, run_sql: str = None,
+                explain: bool = False):
+        """
+        Time the statements run on conn inside the block, under the timeout.
+        sql is the statement as the user wrote it; run_sql the text actually
+        executed, if different. Yields a dict the block sets
+        "rows_returned" on; afterwards it also holds wall_ms, vm_steps,
+        rows_scanned and, if explain or the run was slow, plan and
+        full_scans. Slow runs are queued for the log.
+        """
+        run_sql = run_sql or sql
+        run = {"rows_returned": 0}
+        scanned = _scan_steps(conn, run_sql)
+        started = time.perf_counter()
+        try:
+            with statement_limit(conn, self.timeout) as counter:
+                yield run
+        except TimeoutError as e:
+            self.timeouts += 1
+            run["error"] = str(e)
+            raise
+        finally:
+            run["wall_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            run["vm_steps"] = counter["vm_steps"]
+            if scanned is not None:
+                run["rows_scanned"] = _scan_steps(conn, run_sql) - scanned
+            slow = self.slow_ms and run["wall_ms"] >= self.slow_ms
+            if explain or slow:
+                try:
+                    run["plan"] = query_plan(conn, sql)
+                    run["full_scans"] = full_scans(run["plan"])
+                except sqlite3.Error:
+                    run["plan"], run["full_scans"] = [], []
+            if slow:
+                with self._lock:
+                    self._pending.append((sql, run))
+
+    def flush(self) -> int:
+        """Write queued slow runs to the log. Returns how many were written."""
+        if not self._pending:
+            return 0
+        with self._lock:
+            pending, self._pending = self._pending, []
+        self._ensure_schema()
+        now = time.time()
+        with self.db.writer() as conn:
+            conn.executemany(
+                f"INSERT INTO {LOG_TABLE} (fingerprint, sql, kind, wall_ms, rows_returned, "
+                f"rows_scanned, vm_steps, plan, full_scans, error, logged_at) "
+                f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (fingerprint(sql), sql.strip(), run.get("kind", "read"),
+                     run["wall_ms"], run["rows_returned"], run.get("rows_scanned"),
+                     run["vm_steps"], json.dumps(run["plan"]),
+                     json.dumps(run["full_scans"]), run.get("error"), now)
+                    for sql, run in pending
+                ],
+            )
+            # keep the newest max_rows
+            conn.execute(
+                f"DELETE FROM {LOG_TABLE} WHERE id <= "
+                f"(SELECT max(id) FROM {LOG_TABLE}) - ?", (self.max_rows,)
+            )
+        self.logged += len(pending)
+        if self.on_change is not None:
+            self.on_change()
+        return len(pending)
+
+    # ─── Index advice ─────────────────────────────────────────────────────────
+
+    def advise(self, min_calls: int = 1, limit: int = 10, create: bool = False) -> dict:
+        """
+        The logged queries costing the most total time (at least min_calls
+        runs), each with its current plan, the tables it still scans in full
+        and a proposed index per table. With create=True the proposed
+        indexes are built.
+
+        Returns {"queries": [{"fingerprint", "sql", "calls", "total_ms",
+        "avg_ms", "max_ms", "avg_rows_scanned", "avg_rows_returned",
+        "timeouts", "plan", "full_scans", "indexes"}], "created": [...]}.
+        """
+        self.flush()
+        self._ensure_schema()
+        with self.db.reader() as conn:
+            hot = conn.execute(
+                f"SELECT fingerprint, count(*) AS calls, sum(wall_ms) AS total_ms, "
+                f"avg(wall_ms) AS avg_ms, max(wall_ms) AS max_ms, "
+                f"avg(rows_scanned) AS avg_rows_scanned, "
+                f"avg(rows_returned) AS avg_rows_returned, "
+                f"count(error) AS timeouts, "
+                f"(SELECT sql FROM {LOG_TABLE} l WHERE l.fingerprint = g.fingerprint "
+                f" ORDER BY id DESC LIMIT 1) AS sql "
+                f"FROM {LOG_TABLE} g GROUP BY fingerprint HAVING count(*) >= ? "
+                f"ORDER BY total_ms DESC LIMIT ?", (min_calls, limit)
+            ).fetchall()
+            tables = _tables(conn)
+            schema = self._schema_copy(conn)
+            queries = []
+            for row in hot:
+                entry = {k: round(v, 2) if isinstance(v, float) else v
+                         for k, v in dict(row).items()}
+                try:
+                    entry["plan"] = query_plan(conn, row["sql"])
+                except sqlite3.Error as e:
+                    # e.g. a table dropped since
+                    entry.update(plan=[], full_scans=[], indexes=[], error=str(e))
+                    queries.append(entry)
+                    continue
+                scanned = {_resolve(n, row["sql"], tables) for n in full_scans(entry["plan"])}
+                entry["full_scans"] = sorted(t for t in scanned if t)
+                entry["indexes"] = [
+                    index for index in (
+                        _suggest_index(schema, row["sql"], t) for t in entry["full_scans"]
+                    ) if index
+                ]
+                queries.append(entry)
+        schema.close()
+
+        created = []
+        if create:
+            statements = dict.fromkeys(i["sql"] for q in queries for i in q["indexes"])
+            for statement in statements:
+                with self.db.writer() as conn:
+                    conn.execute(statement)
+                created.append(statement)
+        return {"queries": queries, "created": created}
+
+    @staticmethod
+    def _schema_copy(conn: sqlite3.Connection) -> sqlite3.Connection:
+        """
+        Empty in-memory database with conn's tables, views and indexes, for
+        trying candidate indexes against the planner without touching data.
+        """
+        copy = sqlite3.connect(":memory:")
+        for (sql,) in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL "
+            "AND type IN ('table', 'view', 'index') AND name NOT LIKE 'sqlite_%' "
+            "ORDER BY rowid"
+        ):
+            try:
+                copy.execute(sql)
+            except sqlite3.Error:
+                # shadow tables made by their virtual table, unknown modules
+                pass
+        return copy
+
+    def stats(self) -> dict:
+        return {
+            "timeout_s": self.timeout,
+            "slow_ms": self.slow_ms,
+            "logged": self.logged,
+            "timeouts": self.timeouts,
+            "pending": len(self._pending),
+        }
+
+
+def _suggest_index(schema: sqlite3.Connection, sql: str, table: str):
+    """
+    Index on table that lets the planner avoid scanning it for sql, found by
+    probing each column the query reads with a one-column index: columns
+    compared with = lead, then one range or ORDER BY column, then the rest
+    of the columns read so the index covers the query when it is narrow
+    enough. Returns {"table", "columns", "covering", "sql", "plan"} or None.
+
+    schema is a _schema_copy; accepted indexes stay in it, so a join's
+    second table is judged with the first one's index in place.
+    """
+    tables = _tables(schema)
+    columns = {r[1].lower(): r for r in schema.execute(f"PRAGMA table_info({_quote(table)})")}
+    # an INTEGER PRIMARY KEY is the rowid, which every index carries anyway
+    pks = [r for r in columns.values() if r[5]]
+    rowid = pks[0][1].lower() if len(pks) == 1 and pks[0][2].upper() == "INTEGER" else None
+
+    read = []
+
+    def authorizer(action, arg1, arg2, db_name, source):
+        if action == sqlite3.SQLITE_READ and arg1 and arg1.lower() == table.lower():
+            name = (arg2 or "").lower()
+            if name in columns and name != rowid and name not in read:
+                read.append(name)
+        return sqlite3.SQLITE_OK
+
+    schema.set_authorizer(authorizer)
+    try:
+        baseline = query_plan(schema, sql)
+    except sqlite3.Error:
+        return None
+    finally:
+        # Python < 3.11 can't remove an authorizer
+        schema.set_authorizer(lambda *args: sqlite3.SQLITE_OK)
+    sorted_by_temp = any("USE TEMP B-TREE FOR ORDER BY" in line for line in baseline)
+
+    equal, ranged, ordered = [], [], []
+    for name in read:
+        column = columns[name][1]
+        schema.execute(f"CREATE INDEX {_PROBE} ON {_quote(table)} ({_quote(column)})")
+        try:
+            plan = query_plan(schema, sql)
+        finally:
+            schema.execute(f"DROP INDEX {_PROBE}")
+        using = [line for line in plan if f"INDEX {_PROBE}" in line]
+        if not using:
+            continue
+        detail = using[0].lower()
+        if f"({name}=" in detail:
+            equal.append(column)
+        elif f"({name}>" in detail or f"({name}<" in detail:
+            ranged.append(column)
+        elif sorted_by_temp and not any("FOR ORDER BY" in line for line in plan):
+            ordered.append(column)
+
+    key = equal + (ranged or ordered)[:1]
+    if not key:
+        return None
+    rest = [columns[n][1] for n in read if columns[n][1] not in key]
+    index_columns = key + rest if len(key) + len(rest) <= MAX_INDEX_COLUMNS else key
+
+    name = re.sub(r"\W", "_", f"idx_{table}_{'_'.join(index_columns)}")[:60]
+    statement = (
+        f"CREATE INDEX IF NOT EXISTS {_quote(name)} ON {_quote(table)} "
+        f"({', '.join(map(_quote, index_columns))})"
+    )
+    schema.execute(statement)
+    plan = query_plan(schema, sql)
+    if table in {_resolve(n, sql, tables) for n in full_scans(plan)}:
+        # the planner still prefers the scan
+        schema.execute(f"DROP INDEX {_quote(name)}")
+        return None
+    return {
+        "table": table,
+        "columns": index_columns,
+        "covering": any(f"COVERING INDEX {name}" in line for line in plan),
+        "sql": statement,
+        "plan": plan,
+    }
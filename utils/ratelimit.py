@@ -0,0 +1,44 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter usable from threads and from asyncio.
+
+    Tokens refill at `rate` per second up to `capacity`. Each acquire()
+    reserves one token immediately (the balance may go negative) and then
+    waits until that token would have been available, so callers are served
+    in the order they arrive.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token and return how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
@@ -0,0 +1,309 @@
+import atexit
+import re
+import threading
+import time
+from collections import deque
+from utils.db import Database
+from utils.config import (
+    SEARCH_ARCHIVE_RETENTION_DAYS,
+    SEARCH_ARCHIVE_MAX_ROWS,
+    SEARCH_ARCHIVE_BATCH_SIZE,
+    SEARCH_ARCHIVE_FLUSH_INTERVAL,
+    SEARCH_ARCHIVE_COMPACT_INTERVAL,
+)
+
+TABLE = "search_results"
+FTS_TABLE = "search_results_fts"
+
+# One row per (url, query); the FTS5 index is an external-content table over
+# it, kept in step by triggers, so the text is stored once.
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    id          INTEGER PRIMARY KEY,
+    url         TEXT NOT NULL,
+    query       TEXT NOT NULL,
+    title       TEXT NOT NULL,
+    description TEXT NOT NULL,
+    fetched_at  REAL NOT NULL,
+    UNIQUE (url, query)
+);
+CREATE INDEX IF NOT EXISTS {TABLE}_fetched ON {TABLE} (fetched_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    title, description, url, query,
+    content='{TABLE}', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS {TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+    INSERT INTO {FTS_TABLE} (rowid, title, description, url, query)
+    VALUES (new.id, new.title, new.description, new.url, new.query);
+END;
+CREATE TRIGGER IF NOT EXISTS {TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+    INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, description, url, query)
+    VALUES ('delete', old.id, old.title, old.description, old.url, old.query);
+END;
+CREATE TRIGGER IF NOT EXISTS {TABLE}_au AFTER UPDATE ON {TABLE} BEGIN
+    INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, description, url, query)
+    VALUES ('delete', old.id, old.title, old.description, old.url, old.query);
+    INSERT INTO {FTS_TABLE} (rowid, title, description, url, query)
+    VALUES (new.id, new.title, new.description, new.url, new.query);
+END;
+"""
+
+# Column weights for bm25(): title, description, url, query
+_WEIGHTS = (4.0, 1.0, 0.5, 2.0)
+# Results kept in memory while waiting for the writer; beyond this the
+# oldest are dropped rather than growing without bound
+MAX_PENDING = 50_000
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def match_expression(text: str) -> str:
+    """
+    FTS5 MATCH expression for plain text: every word quoted (so punctuation
+    and FTS5 keywords are taken literally) and OR-ed, leaving BM25 to rank
+    results that contain more of the words higher.
+    """
+    terms = _TERM.findall(text)
+    if not terms:
+        raise ValueError("Query has no searchable words")
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+class SearchArchive:
+    """
+    Full-text archive of web search results in data.db.
+
+    add() only appends to an in-memory buffer; a daemon thread writes the
+    buffer in batches of up to batch_size rows, one transaction each, every
+    flush_interval seconds or as soon as a batch is full. The same thread
+    enforces retention (rows older than retention_days, and beyond max_rows
+    the oldest) and merges the FTS5 index segments every compact_interval.
+    """
+
+    def __init__(self,
+                 db: Database,
+                 retention_days: float = SEARCH_ARCHIVE_RETENTION_DAYS,
+                 max_rows: int = SEARCH_ARCHIVE_MAX_ROWS,
+                 batch_size: int = SEARCH_ARCHIVE_BATCH_SIZE,
+                 flush_interval: float = SEARCH_ARCHIVE_FLUSH_INTERVAL,
+                 compact_interval: float = SEARCH_ARCHIVE_COMPACT_INTERVAL,
+                 on_change=None):
+        self.db = db
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        # called after every write, e.g. to invalidate cached reads
+        self.on_change = on_change
+
+        self._pending = deque(maxlen=MAX_PENDING)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._schema_ready = False
+        self._last_compaction = time.time()
+        self.rows_written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.compactions = 0
+        self.last_error = None
+
+    def _ensure_schema(self):
+        if self._schema_ready:
+            return
+        with self.db.writer() as conn:
+            conn.executescript(SCHEMA)
+        self._schema_ready = True
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    # ─── Writing ──────────────────────────────────────────────────────────────
+
+    def add(self, query: str, results: list, fetched_at: float = None):
+        """
+        Queue extracted results ({"title", "description", "url"}) of one
+        query for the archive. Never blocks on the database.
+        """
+        fetched_at = fetched_at or time.time()
+        query = " ".join(query.split())
+        rows = [
+            (r.get("url", ""), query, r.get("title", ""), r.get("description", ""), fetched_at)
+            for r in results
+        ]
+        if not rows:
+            return
+        with self._lock:
+            overflow = len(self._pending) + len(rows) - MAX_PENDING
+            if overflow > 0:
+                self.dropped += overflow
+            self._pending.extend(rows)
+            full = len(self._pending) >= self.batch_size
+        self.start()
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Write everything buffered so far. Returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._pending.popleft()
+                             for _ in range(min(self.batch_size, len(self._pending)))]
+                if not batch:
+                    break
+                try:
+                    self._write(batch)
+                except Exception:
+                    # keep them for the next attempt
+                    with self._lock:
+                        self._pending.extendleft(reversed(batch))
+                    raise
+                written += len(batch)
+        if written:
+            self._changed()
+        return written
+
+    def _write(self, batch: list):
+        self._ensure_schema()
+        with self.db.writer() as conn:
+            # a result seen again refreshes its text and timestamp
+            conn.executemany(
+                f"INSERT INTO {TABLE} (url, query, title, description, fetched_at) "
+                f"VALUES (?, ?, ?, ?, ?) "
+                f"ON CONFLICT (url, query) DO UPDATE SET title = excluded.title, "
+                f"description = excluded.description, fetched_at = excluded.fetched_at",
+                batch,
+            )
+        self.rows_written += len(batch)
+        self.batches += 1
+
+    # ─── Retention and compaction ─────────────────────────────────────────────
+
+    def compact(self) -> dict:
+        """
+        Delete rows past retention_days and beyond max_rows (oldest first),
+        then merge the FTS5 index into a single segment.
+        Returns {"deleted": n}.
+        """
+        self._ensure_schema()
+        cutoff = time.time() - self.retention_days * 86400
+        with self.db.writer() as conn:
+            deleted = conn.execute(
+                f"DELETE FROM {TABLE} WHERE fetched_at < ?", (cutoff,)
+            ).rowcount
+            excess = conn.execute(f"SELECT count(*) FROM {TABLE}").fetchone()[0] - self.max_rows
+            if excess > 0:
+                deleted += conn.execute(
+                    f"DELETE FROM {TABLE} WHERE id IN "
+                    f"(SELECT id FROM {TABLE} ORDER BY fetched_at LIMIT ?)", (excess,)
+                ).rowcount
+            conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        self._last_compaction = time.time()
+        self.compactions += 1
+        if deleted:
+            self._changed()
+        return {"deleted": deleted}
+
+    # ─── Background writer ────────────────────────────────────────────────────
+
+    def start(self):
+        """Start the writer thread (a daemon); a no-op if already running."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="search-archive", daemon=True)
+            self._thread.start()
+        # the thread is a daemon: write what is still buffered on exit
+        atexit.register(self._flush_quietly)
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def stop(self, timeout: float = None):
+        """Write what is buffered and stop the writer thread."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            stopping = self._stop.is_set()
+            try:
+                self.flush()
+                if time.time() - self._last_compaction >= self.compact_interval:
+                    self.compact()
+                self.last_error = None
+            except Exception as e:
+                # e.g. the database is busy; the rows stay buffered
+                self.last_error = str(e)
+            if stopping:
+                return
+
+    # ─── Reading ──────────────────────────────────────────────────────────────
+
+    def search(self, text: str, limit: int = 10, query: str = None,
+               max_age_days: float = None) -> list:
+        """
+        Archived results best matching text by BM25 (title weighted highest),
+        optionally only those found by a search for `query` or fetched within
+        max_age_days. Buffered results are written first, so a search just
+        made is found.
+
+        Returns [{"title", "description", "url", "query", "fetched_at",
+        "snippet", "score"}], best first (lower score is better).
+        """
+        self.flush()
+        self._ensure_schema()
+        sql = (
+            f"SELECT r.title, r.description, r.url, r.query, r.fetched_at, "
+            f"snippet({FTS_TABLE}, -1, '[', ']', '…', 12) AS snippet, "
+            f"bm25({FTS_TABLE}, {', '.join(map(str, _WEIGHTS))}) AS score "
+            f"FROM {FTS_TABLE} JOIN {TABLE} r ON r.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH ?"
+        )
+        params = [match_expression(text)]
+        if query:
+            sql += " AND r.query = ?"
+            params.append(" ".join(query.split()))
+        if max_age_days is not None:
+            sql += " AND r.fetched_at >= ?"
+            params.append(time.time() - max_age_days * 86400)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        with self.db.reader() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [{**dict(row), "score": round(row["score"], 4)} for row in rows]
+
+    def stats(self) -> dict:
+        self._ensure_schema()
+        with self.db.reader() as conn:
+            rows, oldest, newest = conn.execute(
+                f"SELECT count(*), min(fetched_at), max(fetched_at) FROM {TABLE}"
+            ).fetchone()
+        return {
+            "rows": rows,
+            "oldest": oldest,
+            "newest": newest,
+            "pending": len(self._pending),
+            "rows_written": self.rows_written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "compactions": self.compactions,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import time
+import weakref
+from utils.config import (
+    CLIENT_ID,
+    CLIENT_SECRET,
+    ACCESS_TOKEN,
+    ACCESS_TOKEN_EXPIRES_AT,
+    REFRESH_TOKEN,
+    REFRESH_TOKEN_EXPIRES_AT,
+    STATE_DIR,
+    TOKEN_REFRESH_MARGIN,
+)
+
+TOKEN_URL = "https://www.linkedin.com/oauth/v2/accessToken"
+
+
+def token_record(response: dict, now: float = None) -> dict:
+    """
+    Normalise a LinkedIn token response (expires_in, refresh_token_expires_in
+    in seconds) into {"access_token", "expires_at", "refresh_token",
+    "refresh_token_expires_at"} with absolute epoch times.
+    """
+    now = now or time.time()
+    record = {
+        "access_token": response["access_token"],
+        "expires_at": now + response["expires_in"] if "expires_in" in response else None,
+        "refresh_token": response.get("refresh_token"),
+        "refresh_token_expires_at": None,
+    }
+    if "refresh_token_expires_in" in response:
+        record["refresh_token_expires_at"] = now + response["refresh_token_expires_in"]
+    return record
+
+
+class TokenManager:
+    """
+    Keeps the LinkedIn access token fresh for the lifetime of the server.
+
+    The current token (with its expiry and refresh token) is persisted to
+    STATE_DIR/token.json, seeded from .env on first use. A background thread
+    uses the refresh token margin seconds before expiry and pushes the new
+    token into every registered client, so requests never wait on a refresh
+    and no restart is needed.
+    """
+
+    def __init__(self,
+                 client_id: str = CLIENT_ID,
+                 client_secret: str = CLIENT_SECRET,
+                 path: str = None,
+                 margin: float = TOKEN_REFRESH_MARGIN,
+                 token_url: str = TOKEN_URL):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.path = path or os.path.join(os.path.expanduser(STATE_DIR), "token.json")
+        self.margin = margin
+        self.token_url = token_url
+
+        self._lock = threading.Lock()
+        self._clients = weakref.WeakSet()
+        self._record = self._load()
+        self._stop = threading.Event()
+        self._thread = None
+        self.refreshes = 0
+        self.last_error = None
+
+    def _load(self) -> dict:
+        from_env = {
+            "access_token": ACCESS_TOKEN,
+            "expires_at": ACCESS_TOKEN_EXPIRES_AT,
+            "refresh_token": REFRESH_TOKEN,
+            "refresh_token_expires_at": REFRESH_TOKEN_EXPIRES_AT,
+        }
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return from_env
+        # a fresh OAuth login writes .env; prefer it when it is the newer token
+        if from_env["access_token"] and from_env["access_token"] != stored.get("access_token"):
+            if (from_env["expires_at"] or 0) >= (stored.get("expires_at") or 0):
+                return from_env
+        return stored
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        # holds credentials: readable by the owner only
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._record, f)
+        os.replace(tmp, self.path)
+
+    @property
+    def access_token(self) -> str:
+        return self._record["access_token"]
+
+    def register(self, client):
+        """
+        Give client the current token now and every refreshed one later.
+        client needs a set_access_token(token) method.
+        """
+        with self._lock:
+            self._clients.add(client)
+            token = self._record["access_token"]
+        if token:
+            client.set_access_token(token)
+        return client
+
+    def refresh(self) -> dict:
+        """Exchange the refresh token for a new access token and publish it."""
+        with self._lock:
+            refresh_token = self._record.get("refresh_token")
+        if not refresh_token:
+            raise RuntimeError(
+                "No refresh token; run utils/oauth.py to sign in again"
+            )
+        import requests  # only needed once a refresh is due
+        resp = requests.post(self.token_url, data={
+            "grant_type":    "refresh_token",
+            "refresh_token": refresh_token,
+            "client_id":     self.client_id,
+            "client_secret": self.client_secret,
+        }, timeout=30)
+        resp.raise_for_status()
+        record = token_record(resp.json())
+        with self._lock:
+            # LinkedIn may or may not rotate the refresh token
+            if not record["refresh_token"]:
+                record["refresh_token"] = refresh_token
+                record["refresh_token_expires_at"] = self._record.get("refresh_token_expires_at")
+            self._record = record
+            self._save()
+            clients = list(self._clients)
+            self.refreshes += 1
+            self.last_error = None
+        for client in clients:
+            client.set_access_token(record["access_token"])
+        return record
+
+    def seconds_until_refresh(self) -> float:
+        """How long until the token is due for refresh (None: no known expiry)."""
+        expires_at = self._record.get("expires_at")
+        if expires_at is None:
+            return None
+        return expires_at - self.margin - time.time()
+
+    # ─── Background refresh ───────────────────────────────────────────────────
+
+    def start(self):
+        """Start the refresh thread (a daemon); a no-op if already running."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="token-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        retry_delay = 60
+        while not self._stop.is_set():
+            due = self.seconds_until_refresh()
+            if due is None or not self._record.get("refresh_token"):
+                # nothing to refresh with; check again in case a login saved one
+                self._stop.wait(3600)
+                continue
+            if due > 0:
+                # re-check at least hourly so sleeps and clock changes are noticed
+                self._stop.wait(min(due, 3600))
+                continue
+            try:
+                self.refresh()
+                retry_delay = 60
+            except Exception as e:
+                self.last_error = str(e)
+                self._stop.wait(retry_delay)
+                retry_delay = min(retry_delay * 2, 3600)
+
+    def stats(self) -> dict:
+        with self._lock:
+            record = dict(self._record)
+        return {
+            "expires_at": record.get("expires_at"),
+            "refresh_token": bool(record.get("refresh_token")),
+            "refresh_token_expires_at": record.get("refresh_token_expires_at"),
+            "refreshes": self.refreshes,
+            "last_error": self.last_error,
+        }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_token_manager() -> TokenManager:
+    """Process-wide TokenManager, created on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = TokenManager()
+        return _manager
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from utils.config import STATE_DIR, UPLOAD_JOURNAL_TTL
+
+
+class FileRange:
+    """
+    Read-only, file-like view of bytes [first_byte, last_byte] of a file.
+
+    Handing this to requests streams the range from disk in small blocks,
+    so uploading a part never holds more than one block in memory.
+    """
+
+    def __init__(self, file_path: str, first_byte: int, last_byte: int):
+        self._f = open(file_path, "rb")
+        self._f.seek(first_byte)
+        self._remaining = last_byte - first_byte + 1
+        self._length = self._remaining
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._f.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def aiter_file_range(file_path: str, first_byte: int, last_byte: int,
+                           block_size: int = 1024 * 1024):
+    """
+    Async counterpart of FileRange: yield bytes [first_byte, last_byte] of a
+    file in blocks, reading off the event loop.
+    """
+    with FileRange(file_path, first_byte, last_byte) as body:
+        while True:
+            block = await asyncio.to_thread(body.read, block_size)
+            if not block:
+                break
+            yield block
+
+
+# ─── Upload journal ───────────────────────────────────────────────────────────
+#
+# One small JSON file per (owner, recipe, file hash) under STATE_DIR/uploads,
+# written before the first byte is sent and again after every part, so a
+# retried upload of the same media carries on where it stopped:
+#   "registered"  the asset exists; the bytes (or some parts) are still to send
+#   "uploaded"    every byte is sent (multipart completed); the asset only has
+#                 to be confirmed with LinkedIn before it is reused
+# Entries are dropped once a post using the asset is published, or after
+# UPLOAD_JOURNAL_TTL.
+
+REGISTERED = "registered"
+UPLOADED = "uploaded"
+
+# Saves of one key are serialised on one of these (picked by key hash), so
+# concurrent part uploads can't write an older state over a newer one
+_save_locks = [threading.Lock() for _ in range(64)]
+
+
+def _journal_dir() -> str:
+    return os.path.join(os.path.expanduser(STATE_DIR), "uploads")
+
+
+def _journal_path(key: str) -> str:
+    return os.path.join(_journal_dir(), f"{hashlib.sha1(key.encode()).hexdigest()}.json")
+
+
+def load_journal(key: str, min_ttl: float = 300) -> dict:
+    """
+    Return the journal entry for key, or None when there is nothing usable
+    (no entry, it is older than UPLOAD_JOURNAL_TTL, or its part URLs expire
+    within min_ttl seconds with parts still to upload).
+    """
+    try:
+        with open(_journal_path(key)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    expired = time.time() - entry["created"] > UPLOAD_JOURNAL_TTL
+    if not expired and entry["status"] == REGISTERED and "parts" in entry:
+        expires = [p.get("urlExpiresAt") for p in entry["parts"] if p.get("urlExpiresAt")]
+        expired = bool(expires) and min(expires) / 1000 < time.time() + min_ttl
+    if expired:
+        clear_journal(key)
+        return None
+    return entry
+
+
+def new_journal_entry(key: str, file_path: str, asset_urn: str,
+                      upload_url: str = None, upload_info: dict = None,
+                      multipart: dict = None) -> dict:
+    """
+    Build the entry for a freshly registered upload: a single PUT to
+    upload_url, or the parts of a multipart upload (upload_info/multipart
+    as returned by registerUpload).
+    """
+    entry = {
+        "key": key,
+        "file": os.path.abspath(file_path),
+        "size": os.path.getsize(file_path),
+        "asset": asset_urn,
+        "status": REGISTERED,
+        "bytes_done": 0,
+        "created": time.time(),
+    }
+    if multipart is None:
+        entry["upload_url"] = upload_url
+    else:
+        entry.update({
+            "mediaArtifact": upload_info["mediaArtifact"],
+            "metadata": multipart["metadata"],
+            "parts": multipart["partUploadRequests"],
+            # part index (as str) -> partUploadResponse
+            "done": {},
+        })
+    return entry
+
+
+def record_part(entry: dict, index: int, part_response: dict):
+    """Mark part index of a multipart entry as uploaded."""
+    entry["done"][str(index)] = part_response
+    byte_range = entry["parts"][index]["byteRange"]
+    entry["bytes_done"] += byte_range["lastByte"] - byte_range["firstByte"] + 1
+
+
+def mark_uploaded(entry: dict):
+    entry["status"] = UPLOADED
+    entry["bytes_done"] = entry["size"]
+
+
+def save_journal(entry: dict):
+    """Atomically persist an entry so a crash can resume from it."""
+    path = _journal_path(entry["key"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _save_locks[hash(entry["key"]) % len(_save_locks)]:
+        # a temp file of its own, so no other writer can rename it away
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path),
+                                   prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+
+def clear_journal(key: str):
+    try:
+        os.remove(_journal_path(key))
+    except FileNotFoundError:
+        pass
+
+
+def prune_journal():
+    """Delete entries older than UPLOAD_JOURNAL_TTL (and stray temp files)."""
+    cutoff = time.time() - UPLOAD_JOURNAL_TTL
+    try:
+        names = os.listdir(_journal_dir())
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(_journal_dir(), name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass